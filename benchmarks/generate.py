@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Generate synthetic luz projects for benchmarking.
+
+Projects are wired to the stand-in toolchain in ``benchmarks/toolchain`` through
+``Meta.prefix``, and to a benchmark-local storage directory (used as ``$HOME``)
+that contains fake vendor clones and an empty SDK, so that no network access or
+iOS SDK is needed to build them.
+"""
+
+# module imports
+from argparse import ArgumentParser
+from os import makedirs, symlink
+from pathlib import Path
+from random import Random
+from shutil import rmtree
+
+# fake toolchain
+TOOLCHAIN = Path(__file__).parent.absolute() / "toolchain"
+
+
+def setup_home(home: Path) -> dict:
+    """Create the storage directory luz uses, populated with stand-ins.
+
+    :param Path home: The directory to use as $HOME.
+    :return: Paths to the toolchain and SDK.
+    """
+    storage = home / ".luz"
+    sdk = storage / "sdks" / "iPhoneOS16.5.sdk"
+    # vendor clones, so that luz doesn't reach the network
+    for path in [storage / "vendor/logos/bin", storage / "vendor/lib", storage / "vendor/headers", sdk / "usr/include", sdk / "usr/lib"]:
+        makedirs(path, exist_ok=True)
+    logos = storage / "vendor/logos/bin/logos.pl"
+    if not logos.exists():
+        symlink(TOOLCHAIN / "logos.pl", logos)
+    return {"prefix": TOOLCHAIN, "sdk": sdk}
+
+
+def source(name: str, ext: str, functions: int) -> str:
+    """Generate the contents of a source file.
+
+    :param str name: Name of the file, used to keep symbols unique.
+    :param str ext: Extension of the file.
+    :param int functions: Amount of functions to generate.
+    :return: The source.
+    """
+    symbol = name.replace(".", "_").replace("-", "_")
+    if ext == "swift":
+        return "import Foundation\n\n" + "".join(f"func {symbol}_{i}(_ x: Int) -> Int {{\n    return x * {i} + {len(name)}\n}}\n\n" for i in range(functions))
+    body = '#import <Foundation/Foundation.h>\n#include "Shared.h"\n\n'
+    body += "".join(f"int {symbol}_{i}(int x) {{\n    return SHARED_SCALE * x + {i};\n}}\n\n" for i in range(functions))
+    if ext == "x":
+        body += "%hook SpringBoard\n- (void)applicationDidFinishLaunching:(id)application {\n    %orig;\n}\n%end\n"
+    return body
+
+
+def write_project(
+    path: Path,
+    paths: dict,
+    modules: int,
+    files: int,
+    archs: list,
+    logos: float,
+    swift: float,
+    functions: int,
+    rng: Random,
+    name: str,
+    depth: int,
+    root: bool,
+    meta: dict,
+    unity: int = 0,
+):
+    """Write one project level, recursing into its submodule.
+
+    :param Path path: Directory to write the project to.
+    :param dict paths: Paths to the toolchain and SDK.
+    :param int modules: Amount of modules in this project.
+    :param int files: Amount of files per module.
+    :param list archs: Architectures to build for.
+    :param float logos: Fraction of files that are Logos files.
+    :param float swift: Fraction of files that are Swift files.
+    :param int functions: Amount of functions per file.
+    :param Random rng: Random number generator, seeded so projects are reproducible.
+    :param str name: Name prefix for modules in this project.
+    :param int depth: Amount of nested submodules below this project.
+    :param bool root: Whether this is the root project.
+    :param dict meta: Extra Meta options.
+    :param int unity: Files per group in unity builds, or 0 to disable them.
+    """
+    makedirs(path, exist_ok=True)
+    module_defs = []
+    for m in range(modules):
+        module_name = f"{name}{m}"
+        module_dir = path / module_name
+        makedirs(module_dir, exist_ok=True)
+        with open(module_dir / "Shared.h", "w") as file:
+            file.write("#pragma once\n#define SHARED_SCALE 3\n")
+        for f in range(files):
+            roll = rng.random()
+            ext = "x" if roll < logos else ("swift" if roll < logos + swift else "m")
+            file_name = f"{module_name}File{f}.{ext}"
+            with open(module_dir / file_name, "w") as file:
+                file.write(source(file_name, ext, functions))
+        unity_args = f", unity_build=True, unity_size={unity}" if unity > 0 else ""
+        module_defs.append(f'    Module(name="{module_name}", files=["{module_name}/*.x", "{module_name}/*.m", "{module_name}/*.swift"]{unity_args}),')
+
+    # luzconf
+    lines = ["from luz import Control, Meta, Module, Submodule", ""]
+    if root:
+        meta_args = {"prefix": str(paths["prefix"]), "sdk": str(paths["sdk"]), "archs": archs, **meta}
+        lines.append(f"meta = Meta({', '.join(f'{k}={v!r}' for k, v in meta_args.items())})")
+        lines.append('control = Control(id="dev.luz.bench", name="Bench", version="1.0.0", maintainer="luz", architecture="iphoneos-arm64")')
+    lines.append("modules = [")
+    lines.extend(module_defs)
+    lines.append("]")
+    if depth > 0:
+        lines.append('submodules = [Submodule(path="./sub")]')
+        write_project(path / "sub", paths, modules, files, archs, logos, swift, functions, rng, f"{name}Sub", depth - 1, False, meta, unity)
+    with open(path / "luzconf.py", "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def generate(
+    path: Path,
+    home: Path,
+    modules: int = 2,
+    files: int = 10,
+    archs: list = ["arm64", "arm64e"],
+    logos: float = 0.3,
+    swift: float = 0.0,
+    depth: int = 0,
+    functions: int = 20,
+    seed: int = 0,
+    meta: dict = {},
+    unity: int = 0,
+) -> Path:
+    """Generate a synthetic project.
+
+    Globs are used for module files, and every file is a `.x`, `.swift` or `.m`
+    file depending on the requested mix.
+
+    :param Path path: Directory to write the project to. It is removed first.
+    :param Path home: Directory to use as $HOME when building.
+    :param int modules: Amount of modules per project level.
+    :param int files: Amount of files per module.
+    :param list archs: Architectures to build for.
+    :param float logos: Fraction of files that are Logos files.
+    :param float swift: Fraction of files that are Swift files.
+    :param int depth: Depth of nested submodules, each with `modules` modules.
+    :param int functions: Amount of functions per file.
+    :param int seed: Seed for the file type mix.
+    :param dict meta: Extra Meta options.
+    :param int unity: Files per group in unity builds, or 0 to disable them.
+    :return: Path to the project.
+    """
+    path = Path(path).absolute()
+    rmtree(path, ignore_errors=True)
+    paths = setup_home(Path(home).absolute())
+    write_project(path, paths, modules, files, archs, logos, swift, functions, Random(seed), "Mod", depth, True, meta, unity)
+    return path
+
+
+def add_arguments(parser: ArgumentParser):
+    """Add the project shape arguments to a parser.
+
+    :param ArgumentParser parser: The parser to add to.
+    """
+    parser.add_argument("--modules", type=int, default=2, help="modules per project level")
+    parser.add_argument("--files", type=int, default=10, help="files per module")
+    parser.add_argument("--archs", default="arm64,arm64e", help="comma separated architectures")
+    parser.add_argument("--logos", type=float, default=0.3, help="fraction of Logos files")
+    parser.add_argument("--swift", type=float, default=0.0, help="fraction of Swift files")
+    parser.add_argument("--depth", type=int, default=0, help="depth of nested submodules")
+    parser.add_argument("--functions", type=int, default=20, help="functions per file")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the file type mix")
+    parser.add_argument("--unity", type=int, default=0, help="files per group in unity builds (default: 0, disabled)")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Generate a synthetic luz project.")
+    parser.add_argument("path", help="directory to write the project to")
+    parser.add_argument("--home", default=None, help="directory to use as $HOME when building (default: <path>-home)")
+    add_arguments(parser)
+    args = parser.parse_args()
+    project = generate(
+        args.path,
+        args.home or f"{Path(args.path).absolute()}-home",
+        modules=args.modules,
+        files=args.files,
+        archs=args.archs.split(","),
+        logos=args.logos,
+        swift=args.swift,
+        depth=args.depth,
+        functions=args.functions,
+        seed=args.seed,
+        unity=args.unity,
+    )
+    print(project)
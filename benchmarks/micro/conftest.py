@@ -0,0 +1,68 @@
+"""Fixtures for luz's microbenchmarks.
+
+The benchmarks are written against pytest-benchmark's ``benchmark`` fixture.
+When pytest-benchmark isn't installed, a minimal stand-in is used that times
+each benchmark and prints a summary, without tracking results.
+"""
+
+# module imports
+from statistics import mean
+from time import perf_counter
+
+import pytest
+
+try:
+    import pytest_benchmark  # noqa: F401
+
+    HAS_PLUGIN = True
+except ImportError:
+    HAS_PLUGIN = False
+
+# results recorded by the stand-in fixture
+results = {}
+
+
+class Benchmark:
+    def __init__(self, name: str, rounds: int = 5):
+        """Minimal stand-in for pytest-benchmark's fixture.
+
+        :param str name: Name of the benchmark.
+        :param int rounds: Amount of times to run the function.
+        """
+        self.name = name
+        self.rounds = rounds
+
+    def __call__(self, func, *args, **kwargs):
+        times = []
+        for _ in range(self.rounds):
+            start = perf_counter()
+            result = func(*args, **kwargs)
+            times.append(perf_counter() - start)
+        results[self.name] = times
+        return result
+
+    def pedantic(self, func, args=(), kwargs={}, setup=None, rounds: int = 1, iterations: int = 1, warmup_rounds: int = 0):
+        times = []
+        for _ in range(rounds):
+            if setup is not None:
+                setup()
+            start = perf_counter()
+            for _ in range(iterations):
+                result = func(*args, **kwargs)
+            times.append((perf_counter() - start) / iterations)
+        results[self.name] = times
+        return result
+
+
+if not HAS_PLUGIN:
+
+    @pytest.fixture
+    def benchmark(request):
+        return Benchmark(request.node.name)
+
+    def pytest_terminal_summary(terminalreporter):
+        if results == {}:
+            return
+        terminalreporter.section("luz microbenchmarks (install pytest-benchmark to track results)")
+        for name, times in results.items():
+            terminalreporter.write_line(f"{name:<50} min {min(times) * 1000:10.3f} ms   mean {mean(times) * 1000:10.3f} ms")
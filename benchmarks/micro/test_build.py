@@ -0,0 +1,109 @@
+"""Microbenchmarks for per-file and per-line work during builds."""
+
+# module imports
+from io import StringIO
+from pathlib import Path
+import sys
+
+import pytest
+
+pytest.importorskip("pydeb")
+
+# local imports
+from luz.build.flags import FlagSet
+from luz.build.module import list_outputs
+from luz.common.logger import error, log, log_stdout, logger, remove_log_stdout, warn
+from luz.common.state import BuildState
+from luz.config.components.control import Control
+
+
+@pytest.fixture(scope="module")
+def obj_dir(tmp_path_factory):
+    """An object directory for 1k sources compiled for two architectures."""
+    path = tmp_path_factory.mktemp("obj")
+    for arch in ["arm64", "arm64e"]:
+        (path / arch).mkdir()
+        for i in range(1000):
+            (path / arch / f"File{i}.m-1700000000.0.o").touch()
+        (path / arch / "Tweak.dylib").touch()
+    return path
+
+
+@pytest.fixture(scope="module")
+def state(tmp_path_factory, obj_dir):
+    """A build state with the compile and link jobs of the object directory."""
+    state = BuildState(tmp_path_factory.mktemp("state") / "state.db")
+    for arch in ["arm64", "arm64e"]:
+        for i in range(1000):
+            state.record_job("Tweak", arch, "compile", f"/src/File{i}.m", "hash", f"{obj_dir}/{arch}/File{i}.m-1700000000.0.o", 0.1)
+        state.record_job("Tweak", arch, "link", "Tweak.dylib", None, f"{obj_dir}/{arch}/Tweak.dylib", 0.1)
+    return state
+
+
+@pytest.fixture
+def stdout(monkeypatch):
+    """Discard output written by the logger."""
+    sink = StringIO()
+    monkeypatch.setattr(sys, "stdout", sink)
+    return sink
+
+
+def test_hash_files_manifest(benchmark, obj_dir, state):
+    # the recorded jobs, and the object and linked slice checks, __hash_files performs for 1k unchanged sources
+    def check():
+        manifest = list_outputs(obj_dir, ["arm64", "arm64e"])
+        jobs = state.get_jobs("Tweak")
+        links = state.get_jobs("Tweak", "link")
+        for i in range(1000):
+            for arch in ["arm64", "arm64e"]:
+                output = Path(jobs[(f"/src/File{i}.m", arch)]["output"])
+                assert output.name in manifest[output.parent.name] and ("Tweak.dylib", arch) in links and "Tweak.dylib" in manifest[arch]
+
+    benchmark(check)
+
+
+def test_control_str(benchmark):
+    control = Control(
+        id="dev.luz.bench",
+        version="1.0.0",
+        maintainer="luz",
+        architecture="iphoneos-arm64",
+        name="Bench",
+        description="A package used for benchmarking.",
+        depends=[f"dependency{i} (>= 1.0)" for i in range(50)],
+        conflicts=[f"conflict{i}" for i in range(20)],
+        section="Tweaks",
+    )
+    benchmark(lambda: [str(control) for _ in range(1000)])
+
+
+def test_flag_set(benchmark):
+    # the compile commands of 1k sources for two architectures, sharing a flag set per architecture
+    dirs = [f"/tmp/luz-bench/include/{i}" for i in range(100)]
+
+    def commands():
+        flag_sets = {arch: FlagSet(["-fobjc-arc", "-O0", f"-target {arch}-apple-ios15.0", *[f"-I{dir}" for dir in dirs], "-Wall"]) for arch in ["arm64", "arm64e"]}
+        return [f"clang {flag_sets[arch].command} -o File{i}.o -c File{i}.m" for i in range(1000) for arch in flag_sets]
+
+    benchmark(commands)
+
+
+@pytest.mark.parametrize("func", [log, warn, error], ids=["log", "warn", "error"])
+def test_log(benchmark, stdout, func):
+    # includes writing the queued lines
+    def lines():
+        for i in range(10000):
+            func(f'Compiling "Sources/File{i}.m"...', "🔨", "TWE")
+        logger.flush()
+
+    benchmark(lines)
+
+
+def test_log_stdout(benchmark, stdout):
+    def status():
+        for i in range(100):
+            log_stdout(f"Cloning dependency {i}...")
+            remove_log_stdout(f"Cloning dependency {i}...")
+        logger.flush()
+
+    benchmark(status)
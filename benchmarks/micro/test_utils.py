@@ -0,0 +1,64 @@
+"""Microbenchmarks for the helpers in luz.common.utils."""
+
+# module imports
+from os import environ
+
+import pytest
+
+pytest.importorskip("pydeb")
+
+# local imports
+from luz.common.utils import format_path, get_hash, resolve_path
+
+
+@pytest.fixture(scope="module")
+def paths(tmp_path_factory):
+    """10k relative source paths."""
+    return [f"Sources/Module{i % 20}/File{i}.m" for i in range(10000)]
+
+
+@pytest.fixture(scope="module")
+def env_paths(paths):
+    """10k paths that contain environment variables."""
+    environ.setdefault("LUZ_BENCH_ROOT", "/tmp/luz-bench")
+    return [f"$LUZ_BENCH_ROOT/{path}" for path in paths]
+
+
+@pytest.fixture(scope="module")
+def source_file(tmp_path_factory):
+    """A 1 MB source file."""
+    path = tmp_path_factory.mktemp("hash") / "Large.m"
+    line = b"int function(int x) { return x * 2 + 1; } // padding padding padding\n"
+    with open(path, "wb") as file:
+        file.write(line * (2**20 // len(line)))
+    return path
+
+
+@pytest.fixture(scope="module")
+def source_dir(tmp_path_factory):
+    """A directory with 10k source files."""
+    path = tmp_path_factory.mktemp("sources")
+    for i in range(10000):
+        (path / f"File{i}.m").touch()
+    return path
+
+
+def test_resolve_path(benchmark, paths):
+    benchmark(lambda: [resolve_path(path) for path in paths])
+
+
+def test_resolve_path_env(benchmark, env_paths):
+    benchmark(lambda: [resolve_path(path) for path in env_paths])
+
+
+def test_resolve_path_glob(benchmark, source_dir):
+    result = benchmark(resolve_path, f"{source_dir}/*.m")
+    assert len(result) == 10000
+
+
+def test_format_path(benchmark, env_paths):
+    benchmark(lambda: [format_path(path) for path in env_paths])
+
+
+def test_get_hash(benchmark, source_file):
+    benchmark(get_hash, source_file)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Run end-to-end build benchmarks against a synthetic project.
+
+Three scenarios are timed:
+
+- ``cold``: a clean build (``luz build -c``)
+- ``noop``: a build with nothing changed
+- ``edit``: a build after editing a single source file
+
+Results can be saved as a baseline, and later runs compared against it.
+"""
+
+# module imports
+from argparse import ArgumentParser
+from json import dump, load
+from os import environ
+from pathlib import Path
+from statistics import median
+from subprocess import DEVNULL, run
+from sys import executable, exit
+from tempfile import mkdtemp
+from time import perf_counter
+
+# local imports
+from generate import add_arguments, generate
+
+# repository root, so that the working tree is benchmarked
+ROOT = Path(__file__).parent.parent.absolute()
+
+
+def build(project: Path, home: Path, args: list = []) -> float:
+    """Build a project, and time it.
+
+    :param Path project: The project to build.
+    :param Path home: The directory to use as $HOME.
+    :param list args: Extra arguments to pass to `luz build`.
+    :return: The wall time of the build, in seconds.
+    """
+    env = environ.copy()
+    env["HOME"] = str(home)
+    env["PYTHONPATH"] = f"{ROOT}:{env['PYTHONPATH']}" if "PYTHONPATH" in env else str(ROOT)
+    start = perf_counter()
+    result = run([executable, "-m", "luz", "build", "-p", str(project), *args], env=env, stdout=DEVNULL, stderr=DEVNULL)
+    elapsed = perf_counter() - start
+    if result.returncode != 0:
+        raise Exception(f"Build failed. Run `luz build -p {project}` with HOME={home} to see why.")
+    return elapsed
+
+
+def edit(project: Path, count: int):
+    """Edit a single source file in the project.
+
+    :param Path project: The project to edit.
+    :param int count: A counter, so every edit changes the file's contents.
+    """
+    file = sorted(project.glob("Mod0/*.m"))[0] if list(project.glob("Mod0/*.m")) != [] else sorted(project.glob("Mod0/*.*"))[0]
+    with open(file, "a") as f:
+        f.write(f"\n// edit {count}\n")
+
+
+def bench(project: Path, home: Path, repeat: int, args: list) -> dict:
+    """Run every scenario.
+
+    :param Path project: The project to build.
+    :param Path home: The directory to use as $HOME.
+    :param int repeat: Amount of times to run each scenario.
+    :param list args: Extra arguments to pass to `luz build`.
+    :return: The timings of each scenario.
+    """
+    timings = {"cold": [], "noop": [], "edit": []}
+    for i in range(repeat):
+        timings["cold"].append(build(project, home, ["-c", *args]))
+        timings["noop"].append(build(project, home, args))
+        edit(project, i)
+        timings["edit"].append(build(project, home, args))
+    return {name: {"median": median(times), "min": min(times), "runs": times} for name, times in timings.items()}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> bool:
+    """Compare results against a baseline, and print the difference.
+
+    :param dict results: The results of this run.
+    :param dict baseline: The stored baseline.
+    :param float threshold: Allowed slowdown, as a fraction. (ex: 0.1 for 10%)
+    :return: Whether any scenario regressed.
+    """
+    regressed = False
+    for name, result in results["scenarios"].items():
+        if name not in baseline["scenarios"]:
+            continue
+        before = baseline["scenarios"][name]["median"]
+        change = (result["median"] - before) / before
+        status = "REGRESSED" if change > threshold else "ok"
+        regressed = regressed or change > threshold
+        print(f"  {name:<6} {before:8.3f}s -> {result['median']:8.3f}s  ({change:+.1%})  {status}")
+    return regressed
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark luz builds of a synthetic project.")
+    add_arguments(parser)
+    parser.add_argument("--latency", type=float, default=0.02, help="latency of every fake tool, in seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="amount of times to run each scenario")
+    parser.add_argument("--meta", action="append", default=[], help="extra meta configuration passed to the project (key=value)")
+    parser.add_argument("--workdir", default=None, help="directory to generate the project in (default: a temporary directory)")
+    parser.add_argument("--output", default=None, help="write results to this JSON file")
+    parser.add_argument("--baseline", default=str(Path(__file__).parent / "baseline.json"), help="baseline to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown against the baseline (default: 0.1)")
+    args = parser.parse_args()
+
+    environ["LUZ_BENCH_LATENCY"] = str(args.latency)
+    workdir = Path(args.workdir or mkdtemp(prefix="luz-bench-")).absolute()
+    project = generate(
+        workdir / "project",
+        workdir / "home",
+        modules=args.modules,
+        files=args.files,
+        archs=args.archs.split(","),
+        logos=args.logos,
+        swift=args.swift,
+        depth=args.depth,
+        functions=args.functions,
+        seed=args.seed,
+        unity=args.unity,
+    )
+    luz_args = [arg for meta in args.meta for arg in ["-m", meta]]
+
+    # run
+    config = {k: v for k, v in vars(args).items() if k in ["modules", "files", "archs", "logos", "swift", "depth", "functions", "seed", "unity", "latency", "meta"]}
+    print(f"Benchmarking {project} ({', '.join(f'{k}={v}' for k, v in config.items())})")
+    results = {"config": config, "scenarios": bench(project, workdir / "home", args.repeat, luz_args)}
+    for name, result in results["scenarios"].items():
+        print(f"  {name:<6} median {result['median']:.3f}s  min {result['min']:.3f}s")
+
+    # output
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            dump(results, file, indent=2)
+
+    # baseline
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        with open(baseline_path, "w") as file:
+            dump(results, file, indent=2)
+        print(f"Saved baseline to {baseline_path}.")
+    elif baseline_path.exists():
+        with open(baseline_path, "r") as file:
+            baseline = load(file)
+        if baseline["config"] != config:
+            print("Baseline was recorded with a different configuration, not comparing.")
+        else:
+            print(f"Compared to {baseline_path}:")
+            if compare(results, baseline, args.threshold):
+                exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Stand-in for clang, swift, lipo, ldid, strip and logos.pl.
+
+The tool to emulate is picked from the name the script was invoked as. Every
+tool sleeps for a configurable latency before producing its artifact, so that
+builds can be benchmarked without an iOS SDK or toolchain.
+
+Latency is read from ``LUZ_BENCH_LATENCY_<TOOL>`` (ex: ``LUZ_BENCH_LATENCY_CLANG``),
+falling back to ``LUZ_BENCH_LATENCY``, in seconds.
+"""
+
+# module imports
+from os import environ, makedirs
+from os.path import abspath, basename, dirname, exists, join
+from re import MULTILINE, findall, sub
+from shlex import split
+from sys import argv, exit, stderr, stdout
+from time import sleep
+
+# sources the compilers accept, including preprocessed ones
+SOURCE_SUFFIXES = (".c", ".m", ".mm", ".cpp", ".swift", ".i", ".mi", ".mii", ".ii")
+
+
+def expand_response_files(args: list) -> list:
+    """Expand @file arguments, like clang and swift do.
+
+    :param list args: The arguments to expand.
+    :return: The expanded arguments.
+    """
+    expanded = []
+    for arg in args:
+        if arg.startswith("@") and exists(arg[1:]):
+            with open(arg[1:], "r") as file:
+                expanded.extend(split(file.read()))
+        else:
+            expanded.append(arg)
+    return expanded
+
+
+def get_output(args: list, flag: str = "-o") -> str:
+    """Get the output path from the arguments.
+
+    :param list args: The arguments to look in.
+    :param str flag: The flag that precedes the output path.
+    :return: The output path, or None.
+    """
+    if flag in args and args.index(flag) + 1 < len(args):
+        return args[args.index(flag) + 1]
+    return None
+
+
+def write_artifact(path: str, tool: str, args: list):
+    """Write a fake artifact.
+
+    :param str path: Path to write to.
+    :param str tool: Name of the tool producing it.
+    :param list args: The arguments the tool was called with.
+    """
+    if dirname(path) != "":
+        makedirs(dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(f"{tool} {' '.join(args)}\n")
+
+
+def find_includes(source: str, args: list) -> list:
+    """Find the source and the project files it includes.
+
+    Quoted includes are looked up next to the including file, then in -I directories.
+
+    :param str source: The source.
+    :param list args: The arguments the tool was called with.
+    :return: The paths of the source and the files it includes.
+    """
+    include_dirs = [arg[2:] for arg in args if arg.startswith("-I") and len(arg) > 2]
+    deps = [abspath(source)]
+    for dep in deps:
+        with open(dep, "r") as file:
+            includes = findall(r'#\s*(?:include|import)\s+"([^"]+)"', file.read())
+        for include in includes:
+            for dir in [dirname(dep), *include_dirs]:
+                candidate = abspath(join(dir, include))
+                if exists(candidate):
+                    if candidate not in deps:
+                        deps.append(candidate)
+                    break
+    return deps
+
+
+def find_redefinition(files: list) -> str:
+    """Find a static function that a translation unit defines more than once, like a compiler would reject.
+
+    :param list files: The files of the translation unit.
+    :return: The name of the function, or None.
+    """
+    defined = set()
+    for path in files:
+        with open(path, "r") as file:
+            names = findall(r"^static\b[^;{=]*?\b(\w+)\s*\([^;{]*\)\s*\{", file.read(), MULTILINE)
+        for name in names:
+            if name in defined:
+                return name
+            defined.add(name)
+    return None
+
+
+def write_depfile(path: str, target: str, source: str, args: list):
+    """Write a Makefile-style depfile of the source and the project headers it includes.
+
+    :param str path: Path to write to.
+    :param str target: The target the dependencies are for.
+    :param str source: The source.
+    :param list args: The arguments the tool was called with.
+    """
+    deps = find_includes(source, args)
+    if dirname(path) != "":
+        makedirs(dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(f"{target}: " + " \\\n  ".join(dep.replace(" ", "\\ ") for dep in deps) + "\n")
+
+
+def main():
+    tool = basename(argv[0]).split(".")[0]
+    args = expand_response_files(argv[1:])
+    if args == ["--version"]:
+        stdout.write(f"fake {tool} version 1.0\n")
+        return
+    # latency, once per architecture, like the compiler's per-architecture work
+    sleep(float(environ.get(f"LUZ_BENCH_LATENCY_{tool.upper()}", environ.get("LUZ_BENCH_LATENCY", "0.02"))) * max(args.count("-arch"), 1))
+
+    # logos: print the processed source
+    # (like logos, hooks become static functions, registered by a constructor that every processed file defines)
+    if tool == "logos":
+        with open(args[-1], "r") as file:
+            contents = file.read()
+        hooks = findall(r"%hook (\w+)\n- \(\w+\)(\w+)", contents)
+        stdout.write(f'#line 1 "{args[-1]}"\n' + sub(r"%hook \w+|%end|%orig;?", "", contents))
+        stdout.write("".join(f"static void _logos_method$_ungrouped${cls}${method}$(id self, SEL _cmd, id arg) {{\n}}\n" for cls, method in hooks))
+        stdout.write("static __attribute__((constructor)) void _logosLocalInit() {\n}\n")
+        return
+
+    # dependencies
+    sources = [arg for arg in args if arg.endswith(SOURCE_SUFFIXES) and exists(arg)]
+    depfile = get_output(args, "-MF") or get_output(args, "-emit-dependencies-path")
+    if depfile is not None and sources != []:
+        write_depfile(depfile, get_output(args) or "-", get_output(args, "-primary-file") or sources[-1], args)
+
+    # preprocessor
+    if tool == "clang" and "-E" in args:
+        source = sources[-1]
+        with open(source, "r") as file:
+            contents = file.read()
+        output = get_output(args)
+        if output is None:
+            stdout.write(contents)
+        else:
+            with open(output, "w") as file:
+                file.write(contents)
+        return
+
+    # simulate redefinitions, such as ones from unity builds
+    if tool == "clang" and sources != []:
+        name = find_redefinition(find_includes(sources[-1], args))
+        if name is not None:
+            stderr.write(f"{sources[-1]}:1:1: error: redefinition of '{name}'\n")
+            exit(1)
+
+    # simulate diagnostics
+    for arg in args:
+        if arg.endswith(SOURCE_SUFFIXES) and exists(arg):
+            with open(arg, "r") as file:
+                contents = file.read()
+            if "LUZ_BENCH_ERROR" in contents:
+                stderr.write(f"{arg}:1:1: error: simulated error\n")
+                exit(1)
+            if "LUZ_BENCH_WARNING" in contents:
+                stderr.write(f"{arg}:1:1: warning: simulated warning\n")
+
+    # outputs
+    if tool == "lipo":
+        output = get_output(args, "-output")
+    elif tool in ["ldid", "strip"]:
+        output = args[-1] if args != [] and exists(args[-1]) else None
+    else:
+        output = get_output(args)
+        # swift also emits a module
+        module_path = get_output(args, "-emit-module-path")
+        if module_path is not None:
+            write_artifact(module_path, tool, args)
+    if output is not None:
+        write_artifact(output, tool, args)
+
+
+if __name__ == "__main__":
+    main()
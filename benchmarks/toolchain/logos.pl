@@ -0,0 +1 @@
+fake.py
\ No newline at end of file
@@ -1,3 +1,12 @@
 """Interface with the Luz API."""
 
-from .config import Control, Meta, Module, Script, Submodule
+# components, imported on first use so that the CLI client starts quickly
+__all__ = ["Control", "Meta", "Module", "Script", "Submodule"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        from . import config
+
+        return getattr(config, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,14 +2,14 @@
 
 # module imports
 from argparse import ArgumentParser, SUPPRESS
+from os import environ, getcwd
 import sys
 
 # local imports
-from .config.luz import Luz
-from .config.verify import Verify
+# (the rest are imported when needed, so that builds sent to the daemon start quickly)
+from .common.client import send_request
 from .common.logger import ask, error
 from .common.utils import get_version, resolve_path
-from .luzgen.assign import assign_module
 
 
 def main():
@@ -38,12 +38,33 @@ def main():
     parser_build.add_argument("-m", "--meta", action="append", nargs="+", help="meta configuration (-m {key}={value})")
     parser_build.add_argument("-p", "--path", action="store", help="path to the project to build")
     parser_build.add_argument("-i", "--install", action="store_true", help="install the project after building it")
+    parser_build.add_argument("-w", "--watch", action="store_true", help="rebuild the project whenever its files change")
+    parser_build.add_argument("-t", "--trace", action="store", help="write a Chrome trace of the build to the specified path")
+    parser_build.add_argument(
+        "-e", "--explain", action="store", nargs="?", const="", metavar="PATH", help="explain why each action ran or was skipped, and optionally write the reasons to the specified path as JSON"
+    )
+    parser_build.add_argument("-q", "--quiet", action="store_true", help="only show warnings, errors and the output of failed commands")
+    parser_build.add_argument("--log-format", action="store", choices=["text", "json"], default="text", help="format of the output, json writes one event per line (default: text)")
+    parser_build.add_argument("-n", "--no-daemon", action="store_true", help="build in this process, even if the daemon is running")
     parser_build.add_argument("-f", "--funny-time", action="store_true", help=SUPPRESS)
 
+    # daemon
+    parser_daemon = sub_parsers.add_parser("daemon", help="keep projects loaded between builds")
+    parser_daemon.add_argument("-s", "--stop", action="store_true", help="stop the running daemon")
+    parser_daemon.add_argument("--status", action="store_true", help="check whether the daemon is running")
+
+    # worker
+    parser_worker = sub_parsers.add_parser("worker", help="compile jobs sent by other machines")
+    parser_worker.add_argument("-H", "--host", action="store", default="127.0.0.1", help="address to listen on, which only trusted machines should reach (default: 127.0.0.1)")
+    parser_worker.add_argument("-P", "--port", action="store", type=int, default=7777, help="port to listen on (default: 7777)")
+    parser_worker.add_argument("-j", "--jobs", action="store", type=int, help="amount of jobs to run at once (default: amount of CPUs)")
+    parser_worker.add_argument("--cc", action="store", help="compiler to use (default: the luz toolchain, or clang)")
+
     # verify
     parser_verify = sub_parsers.add_parser("verify", help="verify the format of luz.py")
 
-    parser_verify.add_argument("-p", "--path", action="store", help="path to the project to verify")
+    parser_verify.add_argument("-p", "--path", action="append", help="path to a project to verify, can be passed more than once")
+    parser_verify.add_argument("-j", "--jobs", action="store", type=int, help="amount of projects to verify at once (default: amount of CPUs)")
 
     # gen
     parser_gen = sub_parsers.add_parser("gen", help="generate a luz project using LuzGen")
@@ -81,30 +102,81 @@ def main():
                 else:
                     error("Could not find build file.")
                     sys.exit(1)
-            luz = Luz(luzbuild_path, args=args)
-            luz.build_project()
-        elif args.command == "verify":
-            if args.path is not None:
-                args.path = resolve_path(args.path)
-            else:
-                args.path = resolve_path("./")
-            luzbuild_path = f"{args.path}/luzconf.py"
-            if not resolve_path(luzbuild_path).exists():
-                if resolve_path(f"{args.path}/LuzBuild").exists():
-                    error("LuzBuild has been removed. Luz now uses a Python file to build projects. See the docs for more information. (https://luz.jaidan.dev/en/latest/format.html)")
-                    sys.exit(1)
-                elif resolve_path(f"{args.path}/luz.py").exists():
-                    error("Luz.py has been renamed to luzconf.py due to a conflict with the Python package.")
-                    sys.exit(1)
+            # send the build to the daemon, if it's running
+            if not args.no_daemon and not args.watch:
+                request = {k: v for k, v in vars(args).items() if k not in ["command", "no_daemon", "watch"]}
+                request["path"] = str(args.path.absolute())
+                request["trace"] = str(resolve_path(args.trace).absolute()) if args.trace is not None else None
+                request["explain"] = str(resolve_path(args.explain).absolute()) if args.explain else args.explain
+                request["tty"] = sys.stdout.isatty()
+                status = send_request({"command": "build", "args": request, "env": dict(environ), "cwd": getcwd()})
+                if status is not None:
+                    sys.exit(status)
+            from .common.explain import explainer
+            from .common.logger import logger
+            from .common.trace import tracer
+
+            logger.configure(args.log_format, args.quiet)
+            if args.trace is not None:
+                tracer.enable()
+            if args.explain is not None:
+                explainer.enable()
+            try:
+                if args.watch:
+                    from .config.watch import Watch
+
+                    Watch(luzbuild_path, args=args).run()
                 else:
-                    error("Could not find build file.")
+                    from .config.luz import Luz
+
+                    luz = Luz(luzbuild_path, args=args)
+                    luz.build_project()
+            finally:
+                if args.trace is not None:
+                    tracer.save(args.trace)
+                if args.explain:
+                    explainer.save(args.explain)
+        elif args.command == "verify":
+            luzbuild_paths = []
+            for path in args.path or ["./"]:
+                path = resolve_path(path)
+                luzbuild_path = f"{path}/luzconf.py"
+                if not resolve_path(luzbuild_path).exists():
+                    if resolve_path(f"{path}/LuzBuild").exists():
+                        error("LuzBuild has been removed. Luz now uses a Python file to build projects. See the docs for more information. (https://luz.jaidan.dev/en/latest/format.html)")
+                        sys.exit(1)
+                    elif resolve_path(f"{path}/luz.py").exists():
+                        error("Luz.py has been renamed to luzconf.py due to a conflict with the Python package.")
+                        sys.exit(1)
+                    else:
+                        error(f"Could not find build file in '{path}'.")
+                        sys.exit(1)
+                luzbuild_paths.append(luzbuild_path)
+            from .config.verify import verify_projects
+
+            if verify_projects(luzbuild_paths, args.jobs) > 0:
+                sys.exit(1)
+        elif args.command == "daemon":
+            if args.stop or args.status:
+                status = send_request({"command": "stop" if args.stop else "status"})
+                if status is None:
+                    error("The daemon is not running.")
                     sys.exit(1)
-            luz = Verify(luzbuild_path)
+                sys.exit(status)
+            from .config.daemon import Daemon
+
+            Daemon().serve()
+        elif args.command == "worker":
+            from .common.worker import Worker
+
+            Worker(args.host, args.port, args.cc, args.jobs).serve()
         elif args.command == "gen":
             if args.type is None:
                 args.type = ask('What type of project would you like to generate? (tool/tweak/preferences) (enter for "tweak")')
                 if args.type == "":
                     args.type = "tweak"
+            from .luzgen.assign import assign_module
+
             assign_module(args.type)
         else:
             error(f'Unknown command "{args.command}".')
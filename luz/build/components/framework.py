@@ -1,11 +1,12 @@
 # module imports
-from os import makedirs
-from shutil import copyfile, copytree
+from os import makedirs, walk
+from pathlib import Path
+from shutil import copyfile
 
 # local imports
 from ..module import ModuleBuilder
 from ...common.logger import log
-from ...common.utils import resolve_path
+from ...common.utils import copy_tree, resolve_path
 
 
 class Framework(ModuleBuilder):
@@ -14,6 +15,14 @@ class Framework(ModuleBuilder):
         # kwargs parsing
         super().__init__(kwargs.get("module"), kwargs.get("luz"))
 
+    def staged(self) -> set:
+        """Get the files the module stages, including its resources and public headers."""
+        dirtocopy = self.meta.root_dir / self.module.install_dir
+        resources_path = resolve_path(self.module.resources_dir)
+        resources = {dirtocopy / Path(dir).relative_to(resources_path) / file for dir, _, files in walk(resources_path) for file in files}
+        headers = {dirtocopy / resolve_path(header).name for header in self.module.public_headers}
+        return super().staged() | resources | headers
+
     def stage(self):
         """Stage a deb to be packaged."""
         # log
@@ -26,13 +35,13 @@ class Framework(ModuleBuilder):
         # make proper dirs
         if not dirtocopy.parent.exists():
             makedirs(dirtocopy.parent, exist_ok=True)
-        copytree(self.dylib_dir, dirtocopy, dirs_exist_ok=True)
+        copy_tree(self.dylib_dir, dirtocopy)
         # copy resources
         resources_path = resolve_path(self.module.resources_dir)
         if not resources_path.exists():
             return f'Resources/ folder for "{self.module.name}" does not exist. (path: {resources_path}))'
         # copy resources
-        copytree(resources_path, dirtocopy, dirs_exist_ok=True)
+        copy_tree(resources_path, dirtocopy)
         # copy headers
         for header in self.module.public_headers:
             header_path = resolve_path(header)
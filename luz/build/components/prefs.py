@@ -1,11 +1,11 @@
 # module imports
-from os import makedirs
-from shutil import copytree
+from os import makedirs, walk
+from pathlib import Path
 
 # local imports
 from ..module import ModuleBuilder
 from ...common.logger import log
-from ...common.utils import resolve_path
+from ...common.utils import copy_tree, resolve_path
 
 
 class Preferences(ModuleBuilder):
@@ -14,6 +14,13 @@ class Preferences(ModuleBuilder):
         # kwargs parsing
         super().__init__(kwargs.get("module"), kwargs.get("luz"))
 
+    def staged(self) -> set:
+        """Get the files the module stages, including its resources."""
+        dirtocopy = self.meta.root_dir / self.module.install_dir
+        resources_path = resolve_path(self.module.resources_dir)
+        resources = {dirtocopy / Path(dir).relative_to(resources_path) / file for dir, _, files in walk(resources_path) for file in files}
+        return super().staged() | resources
+
     def stage(self):
         """Stage a deb to be packaged."""
         # log
@@ -26,13 +33,13 @@ class Preferences(ModuleBuilder):
         # make proper dirs
         if not dirtocopy.parent.exists():
             makedirs(dirtocopy.parent, exist_ok=True)
-        copytree(self.dylib_dir, dirtocopy, dirs_exist_ok=True)
+        copy_tree(self.dylib_dir, dirtocopy)
         # copy resources
         resources_path = resolve_path(self.module.resources_dir)
         if not resources_path.exists():
             return f'Resources/ folder for "{self.module.name}" does not exist. (path: {resources_path}))'
         # copy resources
-        copytree(resources_path, dirtocopy, dirs_exist_ok=True)
+        copy_tree(resources_path, dirtocopy)
         # after stage
         if self.module.after_stage:
             self.module.after_stage()
@@ -1,10 +1,10 @@
 # module imports
 from os import makedirs
-from shutil import copytree
 
 # local imports
 from ..module import ModuleBuilder
 from ...common.logger import log
+from ...common.utils import copy_tree
 
 
 class Tweak(ModuleBuilder):
@@ -13,6 +13,11 @@ class Tweak(ModuleBuilder):
         # kwargs parsing
         super().__init__(kwargs.get("module"), kwargs.get("luz"))
 
+    def staged(self) -> set:
+        """Get the files the module stages, including its filter plist."""
+        dirtocopy = self.meta.root_dir / self.module.install_dir
+        return super().staged() | {dirtocopy / f"{''.join(self.module.install_name.split('.')[:-1])}.plist"}
+
     def stage(self):
         """Stage a deb to be packaged."""
         # log
@@ -25,7 +30,7 @@ class Tweak(ModuleBuilder):
         # make proper dirs
         if not dirtocopy.parent.exists():
             makedirs(dirtocopy.parent, exist_ok=True)
-        copytree(self.dylib_dir, dirtocopy, dirs_exist_ok=True)
+        copy_tree(self.dylib_dir, dirtocopy)
 
         # plist
         with open(f"{dirtocopy}/{''.join(self.module.install_name.split('.')[:-1])}.plist", "w") as file:
@@ -0,0 +1,69 @@
+# module imports
+from os import makedirs, replace
+from pathlib import Path
+from shlex import quote, split
+from threading import get_ident
+
+
+def unique(items: list) -> list:
+    """Remove duplicates from a list, keeping the first occurrence of each item.
+
+    :param list items: The list.
+    :return: The list without duplicates.
+    """
+    return list(dict.fromkeys(items))
+
+
+def quote_response(arg: str) -> str:
+    """Quote an argument for a response file, the way clang and swift read them.
+
+    :param str arg: The argument.
+    :return: The quoted argument.
+    """
+    if arg != "" and not any(c in arg for c in " \t\n\"'\\"):
+        return arg
+    return '"' + arg.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def write_response_file(path: Path, arguments: str) -> str:
+    """Write arguments to a response file, keeping the file as is if they didn't change.
+
+    :param Path path: Path to the response file.
+    :param str arguments: The arguments, as they would be passed to the shell.
+    :return: The argument that passes the response file.
+    """
+    content = "".join(f"{quote_response(arg)}\n" for arg in split(arguments))
+    try:
+        with open(path, "r") as file:
+            if file.read() == content:
+                return quote(f"@{path}")
+    except OSError:
+        pass
+    makedirs(path.parent, exist_ok=True)
+    # jobs can write the same response file at once
+    tmp = path.with_name(f"{path.name}.{get_ident()}.tmp")
+    with open(tmp, "w") as file:
+        file.write(content)
+    replace(tmp, path)
+    return quote(f"@{path}")
+
+
+class FlagSet:
+    __slots__ = ("flags", "command", "fingerprint")
+
+    def __init__(self, flags: list):
+        """Flags of a module for one kind of job and architecture, computed once and shared by every job.
+
+        :param list flags: The flags. Empty flags are left out.
+        """
+        self.flags = tuple(flag for flag in flags if flag != "")
+        # the flags as they're passed on the command line
+        self.command = " ".join(self.flags)
+        # the flags that decide the job's output, as single arguments
+        # (the package version is left out, as debug builds bump it every time)
+        self.fingerprint = tuple(flag for flag in split(self.command) if not flag.startswith("-DLUZ_PACKAGE_VERSION="))
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError("FlagSet is immutable")
+        super().__setattr__(name, value)
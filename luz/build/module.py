@@ -1,13 +1,46 @@
 # module imports
 from concurrent.futures import ThreadPoolExecutor, wait
-from os import makedirs
-from shutil import copytree, rmtree
-from subprocess import check_output
+from hashlib import md5
+from json import dumps, loads
+from math import ceil
+from os import makedirs, scandir, unlink
+from pathlib import Path
+from shlex import split
+from shutil import rmtree
+from time import perf_counter
 
 # local imports
 from ..common.deps import clone_headers, clone_libraries, logos
-from ..common.logger import log
-from ..common.utils import get_hash, resolve_path
+from ..common.explain import diff_flags, explainer
+from ..common.gc import remove_stale
+from ..common.logger import log, log_job, progress
+from ..common.remote import PREPROCESSED_SUFFIXES
+from ..common.trace import tracer
+from ..common.utils import copy_tree, get_hash, link_file, read_depfile, resolve_path
+from .flags import FlagSet, unique, write_response_file
+
+# directory of objects compiled for every architecture at once
+UNIVERSAL = "universal"
+# languages of sources that can be compiled in unity builds, by suffix
+# (logos files are always compiled on their own, as every processed file defines the same constructor)
+UNITY_LANGUAGES = {".c": "c", ".m": "m", ".mm": "mm", ".cpp": "cpp", ".cc": "cpp", ".cxx": "cpp"}
+
+
+def list_outputs(obj_dir: Path, archs: list) -> dict:
+    """List the files in the object directory of each architecture.
+
+    :param Path obj_dir: The object directory.
+    :param list archs: The architectures.
+    :return: A dict of architecture to the set of file names.
+    """
+    manifest = {}
+    for arch in archs:
+        try:
+            with scandir(obj_dir / arch) as entries:
+                manifest[arch] = {entry.name for entry in entries}
+        except OSError:
+            manifest[arch] = set()
+    return manifest
 
 
 class ModuleBuilder:
@@ -54,17 +87,41 @@ class ModuleBuilder:
             else:
                 raise Exception(f"Private frameworks are not available on the SDK being used. ({self.meta.sdk})")
 
+        # key the module's jobs are recorded with, as variants of a project share its state
+        self.key = self.module.name if self.luz.variant is None else f"{self.module.name}@{self.luz.variant}"
+
         # directories
+        # (logos output is shared by every variant, as it doesn't depend on the meta)
         self.logos_dir = resolve_path(f"{self.luz.build_dir}/logos-processed")
-        self.obj_dir = resolve_path(f"{self.luz.build_dir}/obj/{self.module.name}")
-        self.dylib_dir = resolve_path(f"{self.luz.build_dir}/dylib/{self.module.name}")
-        self.bin_dir = resolve_path(f"{self.luz.build_dir}/bin/{self.module.name}")
+        self.obj_dir = resolve_path(f"{self.luz.output_dir}/obj/{self.module.name}")
+        self.dylib_dir = resolve_path(f"{self.luz.output_dir}/dylib/{self.module.name}")
+        self.bin_dir = resolve_path(f"{self.luz.output_dir}/bin/{self.module.name}")
+        self.lto_dir = resolve_path(f"{self.luz.output_dir}/lto/{self.module.name}")
+        self.rsp_dir = resolve_path(f"{self.luz.output_dir}/rsp/{self.module.name}")
+
+        # compile every arch of c files with one compiler invocation
+        self.single_driver = self.meta.single_driver and len(self.meta.archs) > 1
+
+        # link-time optimization, only used for release builds
+        self.lto = (self.meta.lto if self.module.lto is None else self.module.lto) if self.meta.release else ""
 
         # fix install dir
         self.module.install_dir = self.module.install_dir.relative_to(self.module.install_dir.anchor)
 
+        # flags of each kind of job, by kind and arch, and the arguments that pass them
+        self.flag_sets = {}
+        self.flag_arguments = {}
+
         # files
-        self.files = self.__hash_files(self.module.files, "executable" if self.module.type == "tool" else "dylib")
+        self.refresh()
+
+    def refresh(self):
+        """Find the files that need to be compiled."""
+        # include dirs and the package version can change between builds
+        self.flag_sets = {}
+        self.flag_arguments = {}
+        with tracer.span("hash files", "hash", module=self.module.name):
+            self.files = self.__hash_files(self.module.files, "executable" if self.module.type == "tool" else "dylib")
 
     def __hash_files(self, files, compile_type: str = "dylib"):
         """Hash source files, and check if their objects exist.
@@ -80,10 +137,10 @@ class ModuleBuilder:
 
         # changed files
         changed = []
-        # new hashes
-        new_hashes = {}
         # arch count
         arch_count = len(self.meta.archs)
+        # output manifest
+        manifest = self.__manifest()
         # file path formatting
         for file in files:
             if not str(file).startswith("/"):
@@ -100,31 +157,64 @@ class ModuleBuilder:
             if not self.bin_dir.exists():
                 makedirs(self.bin_dir, exist_ok=True)
 
+        # sources of the module
+        self.sources = files_to_compile
+        # what each compile job compiles, by the job's source
+        self.units = self.__units(files_to_compile)
+
+        # logos'd files are compiled from another directory, so they need their source's directory to be included
+        # (this is done for every logos source, so that flags don't depend on which files changed)
+        for file in files_to_compile:
+            if file.suffix in [".x", ".xm"] and str(file.parent) not in self.module.include_dirs:
+                self.module.include_dirs.append(str(file.parent))
+
+        # recorded jobs
+        jobs = self.luz.state.get_jobs(self.key)
+        links = self.luz.state.get_jobs(self.key, "link")
+        # flags files would be compiled with now
+        flags = {arch: {"c": self.flag_set("c", UNIVERSAL if self.single_driver else arch).fingerprint, "swift": self.flag_set("swift", arch).fingerprint} for arch in self.meta.archs}
+        # new hashes
+        self.hashes = {}
+        # why each file needs to be compiled
+        reasons = {}
+
         # loop files
         for file in files_to_compile:
-            # get file hash
-            if "hashlist" not in self.luz.build_info:
-                self.luz.build_info["hashlist"] = {}
-            fhash = self.luz.build_info["hashlist"].get(str(file))
-            new_hash = get_hash(file)
-            if fhash is None:
-                changed.append(file)
-            elif fhash == new_hash:
-                # variables
-                object_paths = resolve_path(f"{self.obj_dir}/*/{file.name}*-*.o")
-                lipod_paths = resolve_path(f"{self.obj_dir}/*/{self.module.install_name}")
-                if len(object_paths) < arch_count or len(lipod_paths) < arch_count:
+            # get file hash, once per build for every variant
+            hash = self.luz.file_hashes.get(str(file))
+            if hash is None:
+                hash = get_hash(file)
+                self.luz.file_hashes[str(file)] = hash
+            self.hashes[str(file)] = hash
+        for unit, members in self.units.items():
+            # groups change with any of their files
+            if members != [unit]:
+                self.hashes[str(unit)] = md5("".join(f"{member}\0{self.hashes[str(member)]}\0" for member in members).encode()).hexdigest()
+            reasons[unit] = self.__compile_reason(unit, self.hashes[str(unit)], jobs, links, flags, manifest)
+            if reasons[unit] is not None:
+                changed.append(unit)
+
+        # swift files are compiled against each other
+        self.swift_files = [file for file in files_to_compile if file.suffix == ".swift"]
+        changed_swift = [file for file in changed if file.suffix == ".swift"]
+        if changed_swift != []:
+            for file in self.swift_files:
+                if file not in changed:
+                    reasons[file] = f'the swift file "{changed_swift[0].name}" changed'
                     changed.append(file)
-            elif fhash != new_hash:
-                changed.append(file)
-            # add to new hashes
-            new_hashes[str(file)] = new_hash
-
-        # hashes
-        self.luz.update_hashlist(new_hashes)
 
         # files list
-        files = changed if self.module.only_compile_changed else files_to_compile
+        files = changed if self.module.only_compile_changed else list(self.units)
+
+        # explain
+        for unit, members in self.units.items():
+            target = self.__display(unit) if members == [unit] else f"{unit.name} ({len(members)} file{'s' if len(members) != 1 else ''})"
+            if unit in changed:
+                explainer.record("compile", target, True, reasons[unit], self.module.abbreviated_name, module=self.module.name)
+            elif unit in files:
+                explainer.record("compile", target, True, "only_compile_changed is off", self.module.abbreviated_name, module=self.module.name)
+            else:
+                explainer.record("compile", target, False, "it's up to date", self.module.abbreviated_name, module=self.module.name)
 
         # handle files not needing compilation
         if len(files) == 0:
@@ -133,15 +223,27 @@ class ModuleBuilder:
                 "🔨",
                 self.module.abbreviated_name,
                 self.luz.lock,
+                module=self.module.name,
+                phase="compile",
             )
             return []
 
-        files = files_to_compile
+        # sources to compile, including the files of groups
+        sources = [member for unit in files for member in self.units[unit]]
 
         # use logos on files
-        if not self.logos_dir.exists() and list(filter(lambda x: ".x" in x, [str(f) for f in files])) != []:
+        if not self.logos_dir.exists() and list(filter(lambda x: ".x" in x, [str(f) for f in sources])) != []:
             makedirs(self.logos_dir, exist_ok=True)
-        files = logos(self.luz, self.module, files)
+        processed = logos(self.luz, self.module, sources)
+
+        # groups are compiled through a generated source that includes their files
+        compiled = [entry for entry in processed if (entry.get("old_path") or entry.get("path")) in files]
+        paths = {entry.get("old_path") or entry.get("path"): entry.get("new_path") or entry.get("path") for entry in processed}
+        for unit in files:
+            if self.units[unit] != [unit]:
+                self.__write_unity_source(unit, [paths[member] for member in self.units[unit]])
+                compiled.append({"logos": False, "path": unit})
+        files = compiled
 
         # pool
         self.pool = ThreadPoolExecutor(max_workers=(len(files) * arch_count))
@@ -149,6 +251,239 @@ class ModuleBuilder:
         # return files
         return files
 
+    def __units(self, files: list) -> dict:
+        """Get what each compile job compiles.
+
+        Every file is compiled on its own, unless unity builds are enabled. Then, C, C++ and
+        Objective-C files are compiled in groups of the same language. Files are assigned to
+        groups by a hash of their path, and the amount of groups is a power of two, so that
+        adding a file only changes its own group, until the amount of groups doubles.
+
+        :param list files: The module's files.
+        :return: A dict of the job's source to the files it compiles.
+        """
+        units = {}
+        groups = {}
+        for file in files:
+            language = UNITY_LANGUAGES.get(file.suffix)
+            if not self.module.unity_build or language is None or file in self.module.unity_exclude:
+                units[file] = [file]
+            else:
+                groups.setdefault(language, []).append(file)
+        for language, members in groups.items():
+            count = 1 << (ceil(len(members) / self.module.unity_size) - 1).bit_length()
+            buckets = {}
+            for file in members:
+                buckets.setdefault(int(md5(self.__display(file).encode()).hexdigest(), 16) % count, []).append(file)
+            for index, bucket in sorted(buckets.items()):
+                units[self.obj_dir / "unity" / f"luz-unity-{index}.{language}"] = sorted(bucket)
+        return units
+
+    def __write_unity_source(self, unit: Path, files: list):
+        """Write the source that compiles a group of files.
+
+        Defines such as LUZ_PACKAGE_VERSION are passed on the command line rather than
+        written here, so that the source only changes with the group's files.
+
+        :param Path unit: Path to write the source to.
+        :param list files: The files of the group.
+        """
+        makedirs(unit.parent, exist_ok=True)
+        with open(unit, "w") as file:
+            file.write("".join(f'#include "{Path(member).absolute()}"\n' for member in files))
+
+    def __compile_reason(self, file: Path, new_hash: str, jobs: dict, links: dict, flags: dict, manifest: dict) -> str:
+        """Check why a file needs to be compiled.
+
+        :param Path file: The file to check.
+        :param str new_hash: The file's current hash.
+        :param dict jobs: The module's recorded compile jobs.
+        :param dict links: The module's recorded link jobs.
+        :param dict flags: The flags files would be compiled with now, by arch and language.
+        :param dict manifest: The output manifest.
+        :return: The reason, or None if the file is up to date.
+        """
+        language = "swift" if file.suffix == ".swift" else "c"
+        for arch in self.meta.archs:
+            job = jobs.get((str(file), arch))
+            if job is None:
+                return f"it hasn't been compiled for {arch} yet"
+            if job["hash"] != new_hash:
+                return "the source changed" if self.units.get(file, [file]) == [file] else "its files changed"
+            for path, hash in loads(job["deps"] or "{}").items():
+                if self.__dep_hash(path) != hash:
+                    return f'"{self.__display(Path(path))}", which it includes, changed'
+            if job["command"] is not None and tuple(loads(job["command"])) != flags[arch][language]:
+                return f"its flags for {arch} changed ({diff_flags(loads(job['command']), flags[arch][language])})"
+            if Path(job["output"] or "").name not in manifest.get(Path(job["output"] or "").parent.name, set()):
+                return f'its object for {arch} is missing ("{Path(job["output"] or "").name}")'
+            if (self.module.install_name, arch) not in links or self.module.install_name not in manifest[arch]:
+                return f"the linked slice for {arch} is missing"
+        return None
+
+    def __dep_hash(self, path: str) -> str:
+        """Get the hash of a file a job depends on, once per build for every module and variant.
+
+        :param str path: Path to the file.
+        :return: The hash, or an empty string if the file doesn't exist anymore.
+        """
+        hash = self.luz.file_hashes.get(path)
+        if hash is None:
+            try:
+                hash = get_hash(path)
+            except OSError:
+                hash = ""
+            self.luz.file_hashes[path] = hash
+        return hash
+
+    def __deps(self, depfile: str):
+        """Read the files a job included from its depfile, and remove it.
+
+        Files of the SDK and the toolchain are left out, as they only change along with the flags.
+
+        :param str depfile: Path to the depfile.
+        :return: The files' hashes as a JSON dict of path to hash, or None if the compiler didn't write a depfile.
+        """
+        try:
+            deps = read_depfile(depfile)
+            unlink(depfile)
+        except OSError:
+            return None
+        system = tuple(f"{dir}/" for dir in [self.meta.sdk, Path(self.meta.cc).parent.parent, Path(self.meta.swift).parent.parent])
+        paths = [str(self.luz.path.absolute() / dep) for dep in deps]
+        return dumps({path: self.__dep_hash(path) for path in paths if not path.startswith(system)})
+
+    def flag_set(self, kind: str, arch: str) -> FlagSet:
+        """Get the flags of a kind of job, computed once per build and shared by every job.
+
+        :param str kind: The kind of job. (c, swift, link)
+        :param str arch: The architecture, or "universal" for c jobs compiling every architecture.
+        :return: The flag set.
+        """
+        flag_set = self.flag_sets.get((kind, arch))
+        if flag_set is None:
+            if kind == "c":
+                flag_set = FlagSet(self.__c_flags(arch))
+            elif kind == "swift":
+                flag_set = FlagSet(self.__swift_flags(arch))
+            else:
+                flag_set = FlagSet(self.__link_flags(arch))
+            self.flag_sets[(kind, arch)] = flag_set
+        return flag_set
+
+    def __flag_arguments(self, kind: str, arch: str) -> str:
+        """Get the arguments that pass a flag set to a job, shared by every job.
+
+        :param str kind: The kind of job. (c, swift, link)
+        :param str arch: The architecture.
+        :return: The flags, or a response file with them if they're too long.
+        """
+        arguments = self.flag_arguments.get((kind, arch))
+        if arguments is None:
+            arguments = self.__response(f"{kind}-{arch}", self.flag_set(kind, arch).command)
+            self.flag_arguments[(kind, arch)] = arguments
+        return arguments
+
+    def __response(self, name: str, arguments: str) -> str:
+        """Pass arguments through a response file if they're too long for a command line.
+
+        :param str name: Name of the response file.
+        :param str arguments: The arguments.
+        :return: The arguments, or the argument that passes the response file.
+        """
+        if self.meta.response_file_threshold <= 0 or len(arguments) <= self.meta.response_file_threshold:
+            return arguments
+        return write_response_file(self.rsp_dir / f"{name}.rsp", arguments)
+
+    def __display(self, file: Path) -> str:
+        """Get the path of a file to show in messages, relative to the project if it's in it.
+
+        :param Path file: The file.
+        :return: The path to show.
+        """
+        prefix = f"{self.luz.path.absolute()}/"
+        return str(file)[len(prefix) :] if str(file).startswith(prefix) else str(file)
+
+    def __job(self, kind: str, arch: str, file: Path) -> str:
+        """Get the name of a job on a source, used for its log file.
+
+        :param str kind: Kind of job. (compile)
+        :param str arch: The architecture.
+        :param Path file: The source.
+        :return: The name, with the source's path in the project, so that sources with the same name in different directories don't share a log.
+        """
+        path = self.__display(file)
+        # sources outside of the project are named by a hash of their path
+        if Path(path).is_absolute() or ".." in Path(path).parts:
+            path = f"{file.name}-{md5(str(file).encode()).hexdigest()[:8]}"
+        return f"{kind}/{self.module.name}/{arch}/{path}"
+
+    def __manifest(self) -> dict:
+        """Get the files that exist in each object directory.
+
+        Recorded outputs are checked against this, so a build lists each directory once
+        instead of globbing it for every source.
+
+        :return: A dict of architecture (or "universal") to the set of file names.
+        """
+        return list_outputs(self.obj_dir, [*self.meta.archs, UNIVERSAL])
+
+    def objects(self, arch: str) -> list:
+        """Get the objects to link for an architecture, as recorded by the compile jobs.
+
+        :param str arch: The architecture.
+        :return: The list of object paths, in the order of the module's sources.
+        """
+        jobs = self.luz.state.get_jobs(self.key)
+        return [jobs[(str(unit), arch)]["output"] for unit in self.units if (str(unit), arch) in jobs]
+
+    def outputs(self) -> tuple:
+        """Get the outputs of the module that the current build produces.
+
+        Records of sources that are no longer part of the module are dropped.
+
+        :return: The set of output paths.
+        """
+        outputs = set()
+        sources = {str(unit) for unit in self.units}
+        # object stems (ex: "Tweak.x.m-1700000000.0"), by file name
+        stems = {}
+        for (source, arch), job in self.luz.state.get_jobs(self.key).items():
+            if source not in sources or arch not in self.meta.archs:
+                self.luz.state.forget_job(self.key, arch, "compile", source)
+            elif job["output"] is not None:
+                stem = Path(job["output"]).stem
+                stems.setdefault(stem.rsplit("-", 1)[0], set()).add(stem)
+        for arch in [*self.meta.archs, UNIVERSAL]:
+            arch_dir = self.obj_dir / arch
+            if arch != UNIVERSAL:
+                outputs.add(arch_dir / self.module.install_name)
+            if not arch_dir.exists():
+                continue
+            # objects, and swift modules next to them
+            for entry in scandir(arch_dir):
+                if any(entry.name.startswith(f"{stem}.") for stem in stems.get(entry.name.rsplit("-", 1)[0], [])):
+                    outputs.add(Path(entry.path))
+        # logos
+        for file in self.sources:
+            if file.suffix in [".x", ".xm"]:
+                outputs.add(self.logos_dir / f"{file.name}.{'m' if file.suffix == '.x' else 'mm'}")
+        # unity sources
+        for unit, members in self.units.items():
+            if members != [unit]:
+                outputs.add(unit)
+        # linked file
+        linked = self.bin_dir if self.module.type == "tool" else self.dylib_dir
+        outputs.add(linked / self.module.install_name)
+        return outputs
+
+    def staged(self) -> set:
+        """Get the files the module stages.
+
+        :return: The set of staged paths.
+        """
+        return {self.meta.root_dir / self.module.install_dir / self.module.install_name}
+
     def __linker(self, compile_type: str = "dylib"):
         """Use a linker on the compiled files.
 
@@ -159,9 +494,17 @@ class ModuleBuilder:
         else:
             out_name = resolve_path(f"{self.bin_dir}/{self.module.install_name}")
 
+        # thinlto cache, shared by every arch's link so that relinks reuse unchanged code
+        if self.lto == "thin":
+            makedirs(self.lto_dir, exist_ok=True)
+        # flags, and sources, each slice would be linked with now
+        commands = {arch: [*self.flag_set("link", arch).fingerprint, *[str(file) for file in self.sources]] for arch in self.meta.archs}
         # check if linked files exist
-        if len(self.files) == 0 and out_name.exists():
+        reason = self.__link_reason(out_name, commands)
+        if reason is None:
+            explainer.record("link", self.module.install_name, False, "no sources were compiled, and its flags didn't change", self.module.abbreviated_name, module=self.module.name)
             return
+        explainer.record("link", self.module.install_name, True, reason, self.module.abbreviated_name, module=self.module.name)
 
         # log
         log(
@@ -169,62 +512,106 @@ class ModuleBuilder:
             "🔗",
             self.module.abbreviated_name,
             self.luz.lock,
+            module=self.module.name,
+            phase="link",
         )
 
-        # build args
-        build_flags = [
-            "-fobjc-arc" if self.module.use_arc else "",
-            f"-isysroot {self.meta.sdk}",
-            f"-O{self.module.optimization}",
-            ("-I" + " -I".join(self.module.include_dirs)) if self.module.include_dirs != [] else "",
-            ("-L" + " -L".join(self.module.library_dirs)) if self.module.library_dirs != [] else "",
-            ("-F" + " -F".join(self.module.framework_dirs)) if self.module.framework_dirs != [] else "",
-            ("-l" + " -l".join(self.module.libraries)) if self.module.libraries != [] else "",
-            ("-framework " + " -framework ".join(self.module.frameworks)) if self.module.frameworks != [] else "",
-            ("-framework " + " -framework ".join(self.module.private_frameworks)) if self.module.private_frameworks != [] else "",
-            f"-m{self.meta.platform}-version-min={self.meta.min_vers}",
-            "-g" if self.meta.debug else "",
-            f"-Wl,-install_name,{'/var/jb' if self.meta.rootless else ''}/{self.module.install_dir}/{self.module.install_name},-rpath,{'/var/jb' if self.meta.rootless else ''}/usr/lib/,-rpath,{'/var/jb' if self.meta.rootless else ''}/Library/Frameworks/",
-        ]
-        build_flags.extend(self.module.warnings)
-        build_flags.extend(self.module.linker_flags)
-        # add dynamic lib to args
-        if compile_type == "dylib":
-            build_flags.append("-dynamiclib")
         # compile for each arch
-        # format platform
-        platform = "ios" if self.meta.platform == "iphoneos" else self.meta.platform
         for arch in self.meta.archs:
             try:
                 # strings
-                strings = []
-                for file in resolve_path(f"{self.obj_dir}/{arch}/*.o"):
-                    strings.append(str(file))
-                # arch
-                arch_formatted = f"-target {arch}-apple-{platform}{self.meta.min_vers}"
-                self.luz.cmd.exec_output(f"{self.meta.cc} {' '.join(strings)} -o {self.obj_dir}/{arch}/{self.module.install_name} {' '.join(build_flags)} {arch_formatted}")
+                strings = self.objects(arch)
+                # objects and flags, which can be too long for a command line on modules with many objects
+                arguments = self.__response(f"link-{arch}", f"{' '.join(strings)} -o {self.obj_dir}/{arch}/{self.module.install_name} {self.flag_set('link', arch).command}")
+                start = perf_counter()
+                with tracer.span("link", "link", module=self.module.name, arch=arch, file=self.module.install_name):
+                    self.luz.cmd.exec_output(
+                        f"{self.meta.cc} {arguments}",
+                        cwd=self.luz.path,
+                        job=f"link/{self.module.name}/{arch}",
+                    )
+                duration = perf_counter() - start
+                self.luz.state.record_job(self.key, arch, "link", self.module.install_name, None, f"{self.obj_dir}/{arch}/{self.module.install_name}", duration, dumps(commands[arch]))
+                log_job("link", duration, self.module.abbreviated_name, module=self.module.name, arch=arch, file=self.module.install_name)
             except Exception as e:
-                print(e)
-                return f'An error occured when trying to link files for module "{self.module.name}" for architecture "{arch}".'
+                return f'An error occured when trying to link files for module "{self.module.name}" for architecture "{arch}". {e}'
 
         # link
+        explainer.record("lipo", self.module.install_name, True, "its slices were linked", self.module.abbreviated_name, module=self.module.name)
         try:
             compiled = [f"{self.obj_dir}/{arch}/{self.module.install_name}" for arch in self.meta.archs]
-            self.luz.cmd.exec_no_output(f"{self.meta.lipo} -create -output {out_name} {' '.join(compiled)}")
-        except:
-            return f'An error occured when trying to lipo files for module "{self.module.name}".'
+            with tracer.span("lipo", "link", module=self.module.name, file=self.module.install_name):
+                self.luz.cmd.exec_output(f"{self.meta.lipo} -create -output {out_name} {' '.join(compiled)}", cwd=self.luz.path, job=f"lipo/{self.module.name}")
+        except Exception as e:
+            return f'An error occured when trying to lipo files for module "{self.module.name}". {e}'
 
         if compile_type == "executable" and self.meta.release:
             try:
-                self.luz.cmd.exec_no_output(f"{self.meta.strip} {out_name}")
-            except:
-                return f'An error occured when trying to strip "{out_name}" for module "{self.module.name}".'
+                with tracer.span("strip", "link", module=self.module.name, file=self.module.install_name):
+                    self.luz.cmd.exec_output(f"{self.meta.strip} {out_name}", cwd=self.luz.path, job=f"strip/{self.module.name}")
+            except Exception as e:
+                return f'An error occured when trying to strip "{out_name}" for module "{self.module.name}". {e}'
 
+        explainer.record("sign", self.module.install_name, True, "it was linked", self.module.abbreviated_name, module=self.module.name)
         try:
             # run ldid
-            self.luz.cmd.exec_no_output(f"{self.meta.ldid} {' '.join(self.module.codesign_flags)} {out_name}")
-        except:
-            return f'An error occured when trying codesign "{out_name}" for module "{self.module.name}".'
+            with tracer.span("ldid", "sign", module=self.module.name, file=self.module.install_name):
+                self.luz.cmd.exec_output(f"{self.meta.ldid} {' '.join(self.module.codesign_flags)} {out_name}", cwd=self.luz.path, job=f"sign/{self.module.name}")
+        except Exception as e:
+            return f'An error occured when trying codesign "{out_name}" for module "{self.module.name}". {e}'
+
+    def __link_flags(self, arch: str) -> list:
+        """Get the flags to link the module's slice for an architecture with.
+
+        :param str arch: The architecture to link.
+        :return: The list of flags, without the objects and output.
+        """
+        # format platform
+        platform = "ios" if self.meta.platform == "iphoneos" else self.meta.platform
+        build_flags = [
+            "-fobjc-arc" if self.module.use_arc else "",
+            f"-isysroot {self.meta.sdk}",
+            f"-O{self.module.optimization}",
+            *[f"-I{dir}" for dir in unique(self.module.include_dirs)],
+            *[f"-L{dir}" for dir in unique(self.module.library_dirs)],
+            *[f"-F{dir}" for dir in unique(self.module.framework_dirs)],
+            *[f"-l{library}" for library in unique(self.module.libraries)],
+            *[f"-framework {framework}" for framework in unique([*self.module.frameworks, *self.module.private_frameworks])],
+            f"-m{self.meta.platform}-version-min={self.meta.min_vers}",
+            "-g" if self.meta.debug else "",
+            f"-flto={self.lto}" if self.lto != "" else "",
+            f"-Wl,-install_name,{'/var/jb' if self.meta.rootless else ''}/{self.module.install_dir}/{self.module.install_name},-rpath,{'/var/jb' if self.meta.rootless else ''}/usr/lib/,-rpath,{'/var/jb' if self.meta.rootless else ''}/Library/Frameworks/",
+        ]
+        # thinlto cache
+        if self.lto == "thin":
+            build_flags.append(f"-Wl,-cache_path_lto,{self.lto_dir},-prune_after_lto,{self.meta.lto_prune_after * 3600}")
+            if self.meta.lto_cache_size > 0:
+                build_flags.append(f"-Wl,-max_relative_cache_size_lto,{self.meta.lto_cache_size}")
+        build_flags.extend(self.module.warnings)
+        build_flags.extend(self.module.linker_flags)
+        # add dynamic lib to args
+        if self.module.type != "tool":
+            build_flags.append("-dynamiclib")
+        build_flags.append(f"-target {arch}-apple-{platform}{self.meta.min_vers}")
+        return build_flags
+
+    def __link_reason(self, out_name: Path, commands: dict) -> str:
+        """Check why the module needs to be linked.
+
+        :param Path out_name: Path to the linked file.
+        :param dict commands: The flags and sources each slice would be linked with now, by arch.
+        :return: The reason, or None if the linked file is up to date.
+        """
+        if len(self.files) != 0:
+            return f"{len(self.files)} source{'s were' if len(self.files) != 1 else ' was'} compiled"
+        if not out_name.exists():
+            return f'"{out_name.name}" is missing'
+        links = self.luz.state.get_jobs(self.key, "link")
+        for arch in self.meta.archs:
+            job = links.get((self.module.install_name, arch))
+            if job is not None and job["command"] is not None and loads(job["command"]) != commands[arch]:
+                return f"its flags or sources for {arch} changed ({diff_flags(loads(job['command']), commands[arch])})"
+        return None
 
     def __handle_logos(self):
         """Handle files that have had Logos ran on them."""
@@ -235,13 +622,6 @@ class ModuleBuilder:
             if file.get("logos") == True:
                 # new path
                 new_path = file.get("new_path")
-                # set original path
-                orig_path = file.get("old_path")
-                # include path
-                include_path = "/".join(str(orig_path).split("/")[:-1])
-                # add it to include if it's not already there
-                if include_path not in self.module.include_dirs:
-                    self.module.include_dirs.append(include_path)
             # handle normal files
             else:
                 new_path = file.get("path")
@@ -262,7 +642,10 @@ class ModuleBuilder:
                 file_formatted = "/".join(file_formatted.split("/")[1:])
             msg = f'Compiling "{file_formatted}"...'
 
-        log(msg, "🔨", self.module.abbreviated_name, self.luz.lock)
+        progress(msg, "🔨", self.module.abbreviated_name, module=self.module.name, file=file_formatted, phase="compile")
+
+        # source the state is recorded for
+        source = str(file.get("old_path") or file.get("path"))
 
         file = list(
             filter(
@@ -274,95 +657,192 @@ class ModuleBuilder:
         # compile file
         try:
             if str(file).endswith(".swift"):
-                files_minus_to_compile = list(
-                    filter(
-                        lambda x: x != file and str(x).endswith(".swift"),
-                        self.files_paths,
-                    )
-                )
-                fmtc = [str(x) for x in files_minus_to_compile]
-                futures = [self.pool.submit(self.__compile_swift_arch, file, fmtc, x) for x in self.meta.archs]
+                fmtc = [str(x) for x in self.swift_files if x != file]
+                futures = [self.pool.submit(self.__compile_swift_arch, file, source, fmtc, x) for x in self.meta.archs]
+            elif self.single_driver:
+                futures = [self.pool.submit(self.__compile_c_arch, file, source, UNIVERSAL)]
             else:
-                futures = [self.pool.submit(self.__compile_c_arch, file, x) for x in self.meta.archs]
+                futures = [self.pool.submit(self.__compile_c_arch, file, source, x) for x in self.meta.archs]
             self.wait(futures)
 
             # check results
             for future in futures:
                 if future.result() is not None:
-                    return f'An error occured when attempting to compile for module "{self.module.name}".'
+                    return future.result()
+
+        except Exception as e:
+            return f'An error occured when attempting to compile for module "{self.module.name}". {e}'
 
-        except:
-            return f'An error occured when attempting to compile for module "{self.module.name}".'
+    def __swift_flags(self, arch: str) -> list:
+        """Get the flags to compile Swift sources with.
 
-    def __compile_swift_arch(self, file, fmtc: list, arch: str):
+        :param str arch: The architecture to compile for.
+        :return: The list of flags, without the sources and outputs.
+        """
         # format platform
         platform = "ios" if self.meta.platform == "iphoneos" else self.meta.platform
-        # arch
-        arch_formatted = f"-target {arch}-apple-{platform}{self.meta.min_vers}"
-        # outname
-        out_name = f"{self.obj_dir}/{arch}/{file.name}-{self.luz.now}"
         # define build flags
         build_flags = [
             "-frontend",
             "-c",
             f"-module-name {self.module.name}",
             f'-sdk "{self.meta.sdk}"',
-            ("-I" + " -I".join(self.module.include_dirs)) if self.module.include_dirs != [] else "",
+            *[f"-I{dir}" for dir in unique(self.module.include_dirs)],
             ("-import-objc-header" + " -import-objc-header".join(self.module.bridging_headers)) if self.module.bridging_headers != [] else "",
-            arch_formatted,
-            f"-emit-module-path {out_name}.swiftmodule",
-            f"-o {out_name}.o",
+            f"-target {arch}-apple-{platform}{self.meta.min_vers}",
             "-g" if self.meta.debug else "",
-            "-primary-file",
+            f"-lto=llvm-{self.lto}" if self.lto != "" else "",
         ]
         build_flags.extend(self.module.swift_flags)
-        rmtree(
-            f"{self.obj_dir}/{arch}/{file.name}-*",
-            ignore_errors=True,
-        )
+        return build_flags
+
+    def __compile_swift_arch(self, file, source: str, fmtc: list, arch: str):
+        # outname
+        out_name = f"{self.obj_dir}/{arch}/{file.name}-{self.luz.now}"
+        # build flags
+        flag_set = self.flag_set("swift", arch)
         # compile with swift using build flags
         try:
-            self.luz.cmd.exec_output(f"{self.meta.swift} {' '.join(build_flags)} {file} {' '.join(fmtc)}")
-        except:
-            return f'An error occured when trying to compile "{file}" for module "{self.module.name}".'
-
-    def __compile_c_arch(self, file, arch: str):
+            start = perf_counter()
+            with tracer.span("compile swift", "compile", module=self.module.name, arch=arch, file=file.name):
+                reused = self.__reuse(source, arch, flag_set, f"{out_name}.o")
+                if reused is None:
+                    self.luz.cmd.exec_output(
+                        f"{self.meta.swift} {self.__flag_arguments('swift', arch)} -emit-module-path {out_name}.swiftmodule -emit-dependencies-path {out_name}.d -o {out_name}.o -primary-file {file} "
+                        f"{self.__response(f'sources-{file.name}-{md5(str(file).encode()).hexdigest()[:8]}', ' '.join(fmtc))}",
+                        cwd=self.luz.path,
+                        job=self.__job("compile", arch, file),
+                        kind="swift",
+                    )
+            duration = perf_counter() - start
+            deps = reused["deps"] if reused is not None else self.__deps(f"{out_name}.d")
+            self.luz.state.record_job(self.key, arch, "compile", source, self.hashes.get(source), f"{out_name}.o", duration, dumps(flag_set.fingerprint), deps)
+            log_job("compile", duration, self.module.abbreviated_name, module=self.module.name, arch=arch, file=self.__display(Path(source)))
+        except Exception as e:
+            self.luz.state.forget_job(self.key, arch, "compile", source)
+            return f'An error occured when trying to compile "{file}" for module "{self.module.name}". {e}'
+
+    def __c_flags(self, arch: str) -> list:
+        """Get the flags to compile C, C++ and Objective-C sources with.
+
+        :param str arch: The architecture to compile for, or "universal" for every architecture.
+        :return: The list of flags, without the source and output.
+        """
         # format platform
         platform = "ios" if self.meta.platform == "iphoneos" else self.meta.platform
-        # arch
-        arch_formatted = f"-target {arch}-apple-{platform}{self.meta.min_vers}"
-        # outname
-        out_name = f"{self.obj_dir}/{arch}/{file.name}-{self.luz.now}.o"
+        # target
+        if arch == UNIVERSAL:
+            target = f"-target {self.meta.archs[0]}-apple-{platform}{self.meta.min_vers} " + " ".join(f"-arch {x}" for x in self.meta.archs)
+        else:
+            target = f"-target {arch}-apple-{platform}{self.meta.min_vers}"
         build_flags = [
             "-fobjc-arc" if self.module.use_arc else "",
             f"-isysroot {self.meta.sdk}",
             f"-O{self.module.optimization}",
-            arch_formatted,
-            ("-I" + " -I".join(self.module.include_dirs)) if self.module.include_dirs != [] else "",
-            ("-F" + " -F".join(self.module.framework_dirs)) if self.module.framework_dirs != [] else "",
+            target,
+            *[f"-I{dir}" for dir in unique(self.module.include_dirs)],
+            *[f"-F{dir}" for dir in unique(self.module.framework_dirs)],
             f"-m{self.meta.platform}-version-min={self.meta.min_vers}",
             "-g" if self.meta.debug else "",
-            f"-o {out_name}",
+            f"-flto={self.lto}" if self.lto != "" else "",
             f'-DLUZ_PACKAGE_VERSION=\\"{self.control.version}\\"' if self.control else "",
             f'-DLUZ_INSTALL_PREFIX=\\"/var/jb\\"' if self.meta.rootless else f'-DLUZ_INSTALL_PREFIX=\\"\\"',
-            "-c",
         ]
         build_flags.extend(self.module.c_flags)
         build_flags.extend(self.module.warnings)
-        rmtree(
-            f"{self.obj_dir}/{arch}/{file.name}-*",
-            ignore_errors=True,
-        )
+        return build_flags
+
+    def __compile_c_arch(self, file, source: str, arch: str):
+        # outname
+        out_name = f"{self.obj_dir}/{arch}/{file.name}-{self.luz.now}.o"
+        flag_set = self.flag_set("c", arch)
+        # where the compiler writes the files the source includes
+        depfile = f"{out_name[:-2]}.d"
+        # job name
+        job = self.__job("compile", arch, file)
+        # architectures the object is for
+        archs = self.meta.archs if arch == UNIVERSAL else [arch]
+        # slot to compile in, when using workers
+        # (universal objects are compiled locally, as they can't be preprocessed once for every architecture,
+        # and so are files with flags that workers don't accept)
+        distributor = self.luz.distributor if arch != UNIVERSAL and self.luz.distributor is not None and self.luz.distributor.accepts(list(flag_set.fingerprint)) else None
+        worker = distributor.acquire() if distributor is not None else None
         # compile with clang using build flags
         try:
-            self.luz.cmd.exec_output(f"{self.meta.cc} {' '.join(build_flags)} {file}")
-        except:
-            return f'An error occured when attempting to compile "{file}" for module "{self.module.name}".'
+            start = perf_counter()
+            with tracer.span("compile", "compile", module=self.module.name, arch=arch, file=file.name, worker=worker):
+                reused = self.__reuse(source, archs[0], flag_set, out_name)
+                if reused is None and (worker is None or not self.__compile_remote(worker, file, arch, out_name, depfile, job)):
+                    self.luz.cmd.exec_output(f"{self.meta.cc} {self.__flag_arguments('c', arch)} -MMD -MF {depfile} -o {out_name} -c {file}", cwd=self.luz.path, job=job)
+            duration = perf_counter() - start
+            deps = reused["deps"] if reused is not None else self.__deps(depfile)
+            for x in archs:
+                self.luz.state.record_job(self.key, x, "compile", source, self.hashes.get(source), out_name, duration, dumps(flag_set.fingerprint), deps)
+            log_job("compile", duration, self.module.abbreviated_name, module=self.module.name, arch=arch, file=self.__display(Path(source)), worker=str(worker) if worker is not None else None)
+        except Exception as e:
+            for x in archs:
+                self.luz.state.forget_job(self.key, x, "compile", source)
+            return f'An error occured when attempting to compile "{file}" for module "{self.module.name}". {e}'
+        finally:
+            if distributor is not None:
+                distributor.release(worker)
+
+    def __reuse(self, source: str, arch: str, flag_set: FlagSet, out_name: str):
+        """Reuse the object of another variant of the module, compiled from the same source with the same flags.
+
+        :param str source: The source the state is recorded for.
+        :param str arch: The architecture the object is for.
+        :param FlagSet flag_set: The flags the object would be compiled with.
+        :param str out_name: Path to the object.
+        :return: The reused job's output and dependencies, or None if the object should be compiled.
+        """
+        found = self.luz.state.find_output(self.module.name, arch, "compile", source, self.hashes.get(source), dumps(flag_set.fingerprint), exclude=self.key)
+        # objects are only reused if the files their source included didn't change since
+        if found is None or any(self.__dep_hash(path) != hash for path, hash in loads(found["deps"] or "{}").items()):
+            return None
+        output = found["output"]
+        # the object, and files next to it such as swift modules
+        stem = Path(output).stem
+        new_stem = Path(out_name).stem
+        try:
+            with scandir(Path(output).parent) as entries:
+                names = [entry.name for entry in entries if entry.name.startswith(f"{stem}.") and entry.is_file()]
+            if f"{stem}.o" not in names:
+                return None
+            for name in names:
+                link_file(Path(output).parent / name, Path(out_name).parent / f"{new_stem}{name[len(stem):]}")
+        except OSError:
+            return None
+        return found
+
+    def __compile_remote(self, worker, file, arch: str, out_name: str, depfile: str, job: str) -> bool:
+        """Preprocess a file locally, and compile it on a worker.
+
+        :param RemoteWorker worker: The worker to compile on.
+        :param Path file: The file to compile.
+        :param str arch: The architecture to compile for.
+        :param str out_name: Path to the object.
+        :param str depfile: Path to write the files the source includes to.
+        :param str job: Name of the job.
+        :return: Whether the file was compiled on the worker. If not, it should be compiled locally.
+        """
+        if file.suffix not in PREPROCESSED_SUFFIXES:
+            return False
+        preprocessed = f"{out_name[:-2]}{PREPROCESSED_SUFFIXES[file.suffix]}"
+        try:
+            with tracer.span("preprocess", "compile", module=self.module.name, file=file.name):
+                self.luz.cmd.exec_output(
+                    f"{self.meta.cc} {self.__flag_arguments('c', arch)} -MMD -MF {depfile} -E {file} -o {preprocessed}", cwd=self.luz.path, job=job.replace("compile/", "preprocess/", 1)
+                )
+            return self.luz.distributor.compile(worker, preprocessed, split(self.flag_set("c", arch).command), out_name, self.luz.cmd, job)
+        finally:
+            if Path(preprocessed).exists():
+                unlink(preprocessed)
 
     def __stage(self):
         """Stage a generic deb to be packaged."""
         # log
-        log(f"Staging...", "📦", self.module.abbreviated_name, self.luz.lock)
+        log(f"Staging...", "📦", self.module.abbreviated_name, self.luz.lock, module=self.module.name, phase="stage")
         # before stage
         if self.module.before_stage:
             self.module.before_stage()
@@ -374,7 +854,7 @@ class ModuleBuilder:
         # dir of linked file
         if self.module.type == "tool": linked = self.bin_dir
         else: linked = self.dylib_dir
-        copytree(linked, dirtocopy, dirs_exist_ok=True)
+        copy_tree(linked, dirtocopy)
         # after stage
         if self.module.after_stage:
             self.module.after_stage()
@@ -384,9 +864,16 @@ class ModuleBuilder:
         # handle logos
         self.__handle_logos()
         # clean arch dirs
-        for arch in self.meta.archs:
-            for x in self.files_paths:
-                check_output(f"rm -rf {self.obj_dir}/{arch}/{x.name}-*", shell=True)
+        manifest = self.__manifest()
+        prefixes = tuple(f"{x.name}-" for x in self.files_paths)
+        for arch in manifest:
+            for name in manifest[arch]:
+                if name.startswith(prefixes):
+                    path = self.obj_dir / arch / name
+                    if path.is_dir():
+                        rmtree(path)
+                    else:
+                        unlink(path)
             makedirs(f"{self.obj_dir}/{arch}", exist_ok=True)
         # compile files
         futures = [self.luz.pool.submit(self.__compile_file, file) for file in self.files]
@@ -394,6 +881,8 @@ class ModuleBuilder:
         for result in futures:
             if result.result() is not None:
                 return result.result()
+        # drop objects of sources that are no longer part of the module, so they aren't linked
+        remove_stale([self.obj_dir], self.outputs())
         # link files
         # get compile type
         compile_type = "executable" if self.module.type == "tool" else "dylib"
@@ -401,12 +890,14 @@ class ModuleBuilder:
         if linker_results is not None:
             return linker_results
         # stage deb
+        explainer.record("stage", self.module.name, self.meta.pack, "pack is enabled" if self.meta.pack else "pack is disabled", self.module.abbreviated_name, module=self.module.name)
         if self.meta.pack:
             try:
                 stage = self.__getattribute__("stage")
             except:
                 stage = self.__stage
-            stage_result = stage()
+            with tracer.span("stage", "stage", module=self.module.name):
+                stage_result = stage()
             if stage_result is not None:
                 return stage_result
 
@@ -1,3 +1,19 @@
-inherit = None
-luzconf_path = None
+# module imports
+from threading import local
+
+
+class LoadState(local):
+    def __init__(self):
+        """State of the luzconf being loaded, kept per thread so that projects can be loaded in parallel."""
+        # project to inherit from
+        self.inherit = None
+        # luzconf whose build directory is used
+        self.luzconf_path = None
+        # whether components are only checked, without creating directories or discovering the toolchain
+        self.static = False
+
+
+# loading state of the current thread
+state = LoadState()
+# meta configuration passed on the command line
 passed = {}
@@ -0,0 +1,47 @@
+# module imports
+from json import dumps, loads
+from pathlib import Path
+import socket
+import sys
+from typing import Union
+
+# local imports
+from .utils import get_luz_storage
+
+
+def get_socket_path() -> Path:
+    """Get the path of the daemon's socket."""
+    return get_luz_storage() / "daemon.sock"
+
+
+def send_request(message: dict, socket_path: Path = None) -> Union[None, int]:
+    """Send a request to the daemon, and stream back its output.
+
+    :param dict message: The request to send.
+    :param Path socket_path: Path to the daemon's socket. (default: ~/.luz/daemon.sock)
+    :return: The exit status of the request, or None if the daemon isn't running.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    socket_path = socket_path or get_socket_path()
+    if not socket_path.exists():
+        return None
+    # connect
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(socket_path))
+    except OSError:
+        sock.close()
+        return None
+    with sock:
+        sock.sendall((dumps(message) + "\n").encode())
+        for line in sock.makefile("r", encoding="utf-8"):
+            response = loads(line)
+            if response["type"] == "output":
+                sys.stdout.write(response["data"])
+                sys.stdout.flush()
+            elif response["type"] == "exit":
+                return response["status"]
+    # the daemon went away
+    sys.stdout.write("Lost connection to the luz daemon.\n")
+    return 1
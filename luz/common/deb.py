@@ -0,0 +1,102 @@
+# module imports
+from hashlib import md5
+from io import BytesIO
+from os import readlink
+from pathlib import Path
+import tarfile
+from time import time
+
+# local imports
+from .gc import walk_files
+
+# tarfile modes of control archives, by extension
+CONTROL_MODES = {"xz": "w:xz", "gz": "w:gz", "bz2": "w:bz2", "tar": "w"}
+
+
+def hash_staged(staging_dir: Path) -> dict:
+    """Hash every file of a staging directory.
+
+    The version in the control file is left out, as debug builds bump it on every build.
+
+    :param Path staging_dir: The staging directory.
+    :return: A dict of paths, relative to the staging directory, to their hashes.
+    """
+    hashes = {}
+    for entry in walk_files(staging_dir):
+        path = Path(entry.path)
+        name = path.relative_to(staging_dir).as_posix()
+        if entry.is_symlink():
+            hashes[name] = md5(f"link:{readlink(path)}".encode()).hexdigest()
+            continue
+        with open(path, "rb") as file:
+            data = file.read()
+        if name == "DEBIAN/control":
+            data = b"\n".join(line for line in data.splitlines() if not line.startswith(b"Version:"))
+        hashes[name] = md5(data).hexdigest()
+    return hashes
+
+
+def read_ar(path: Path) -> list:
+    """Read the members of an ar archive, such as a deb.
+
+    :param Path path: Path to the archive.
+    :return: A list of tuples of each member's name and data.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if not data.startswith(b"!<arch>\n"):
+        raise ValueError(f'"{path}" is not an ar archive.')
+    members = []
+    offset = 8
+    while offset + 60 <= len(data):
+        header = data[offset : offset + 60]
+        name = header[:16].decode().strip().rstrip("/")
+        size = int(header[48:58].decode().strip())
+        offset += 60
+        members.append((name, data[offset : offset + size]))
+        # members are aligned to 2 bytes
+        offset += size + size % 2
+    return members
+
+
+def write_ar(path: Path, members: list):
+    """Write an ar archive.
+
+    :param Path path: Path to write to.
+    :param list members: A list of tuples of each member's name and data.
+    """
+    with open(path, "wb") as file:
+        file.write(b"!<arch>\n")
+        for name, data in members:
+            file.write(f"{name:<16}{int(time()):<12}{0:<6}{0:<6}{'100644':<8}{len(data):<10}`\n".encode())
+            file.write(data)
+            if len(data) % 2:
+                file.write(b"\n")
+
+
+def replace_control(old_path: Path, new_path: Path, debian_dir: Path) -> bool:
+    """Write a copy of a deb with a new control archive, keeping its data archive.
+
+    :param Path old_path: Path to the deb.
+    :param Path new_path: Path to write the copy to.
+    :param Path debian_dir: The DEBIAN directory to make the control archive from.
+    :return: Whether the copy was written. It isn't if the control archive's compression isn't supported.
+    """
+    members = read_ar(old_path)
+    names = [name for name, _ in members if name.startswith("control.tar")]
+    if names == []:
+        return False
+    ext = names[0].rpartition(".")[2]
+    if ext not in CONTROL_MODES:
+        return False
+
+    def root(info):
+        info.uid = info.gid = 0
+        info.uname = info.gname = "root"
+        return info
+
+    control = BytesIO()
+    with tarfile.open(fileobj=control, mode=CONTROL_MODES[ext]) as tar:
+        tar.add(debian_dir, arcname=".", filter=root)
+    write_ar(new_path, [(name, control.getvalue() if name == names[0] else data) for name, data in members])
+    return True
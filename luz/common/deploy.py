@@ -0,0 +1,132 @@
+# module imports
+from json import dumps, loads
+from os import makedirs, unlink
+from pathlib import Path
+from re import sub
+from shlex import quote
+from shutil import copy2
+
+# local imports
+from .deb import hash_staged
+from .utils import get_luz_storage
+
+# time an idle SSH connection is kept open for the next install, in seconds
+CONTROL_PERSIST = 600
+
+
+def parse_target(target: str, user: str, port: int) -> tuple:
+    """Parse an install target.
+
+    :param str target: The target. (ex: mobile@192.168.1.2:2222, 192.168.1.2 for the default user and port, or file:///path/to/dir)
+    :param str user: User to use if the target doesn't have one.
+    :param int port: Port to use if the target doesn't have one.
+    :return: A tuple of the IP, port and user.
+    """
+    target = str(target)
+    if target.startswith("file://"):
+        return target, port, user
+    if "@" in target:
+        user, _, target = target.rpartition("@")
+    host, _, target_port = target.rpartition(":")
+    if host == "":
+        return target, port, user
+    return host, int(target_port), user
+
+
+class Deployer:
+    def __init__(self, ip: str, port: int, user: str, cmd, state):
+        """Installs packages to a device, remembering what was installed so later installs can only send what changed.
+
+        :param str ip: IP of the device, or a file:// URL of a directory to use as the device's root.
+        :param int port: SSH port of the device.
+        :param str user: User to install as.
+        :param CMD cmd: Used to run commands.
+        :param BuildState state: Where to remember what was installed.
+        """
+        self.cmd = cmd
+        self.state = state
+        self.local = Path(ip[len("file://") :]) if ip.startswith("file://") else None
+        self.target = str(self.local) if self.local is not None else f"{user}@{ip}:{port}"
+        # used for log and temporary file names
+        self.name = sub(r"[^\w.@-]+", "_", self.target).strip("_")
+        # one connection is shared by every command, and kept open between installs
+        control_dir = get_luz_storage() / "ssh"
+        makedirs(control_dir, mode=0o700, exist_ok=True)
+        self.ssh = f"ssh -p {port} -o ControlMaster=auto -o ControlPath={control_dir}/%C -o ControlPersist={CONTROL_PERSIST} {user}@{ip}"
+
+    def __str__(self) -> str:
+        return self.target
+
+    def deploy(self, package_path: Path, staging_dir: Path, sync: bool = False) -> str:
+        """Install a package.
+
+        :param Path package_path: Path to the package.
+        :param Path staging_dir: The directory the package was packed from.
+        :param bool sync: Whether to only copy changed files, if the package's control and scripts didn't change.
+        :return: A description of what was done.
+        """
+        key = f"deployed/{self.target}"
+        hashes = hash_staged(staging_dir)
+        previous = loads(self.state.get_info(key, "null"))
+        # don't trust the record if this install fails halfway
+        self.state.set_info(key, "null")
+        # control and scripts need dpkg
+        if not sync or previous is None or any(hashes.get(x) != previous.get(x) for x in {*hashes, *previous} if x.startswith("DEBIAN/")):
+            self.__install(package_path, [x for x in hashes if not x.startswith("DEBIAN/")], [x for x in previous or {} if x not in hashes], staging_dir)
+            result = "Installed!"
+        else:
+            changed = [x for x in hashes if previous.get(x) != hashes[x]]
+            removed = [x for x in previous if x not in hashes]
+            if changed != [] or removed != []:
+                self.__sync(changed, removed, staging_dir)
+            result = f"Synced {len(changed)} changed and {len(removed)} removed files."
+        self.state.set_info(key, dumps(hashes))
+        return result
+
+    def __install(self, package_path: Path, files: list, removed: list, staging_dir: Path):
+        """Install a package with dpkg.
+
+        :param Path package_path: Path to the package.
+        :param list files: Files of the package, used by directory targets.
+        :param list removed: Files of the previous install that aren't part of the package, used by directory targets.
+        :param Path staging_dir: The directory the package was packed from.
+        """
+        if self.local is not None:
+            # directories have no dpkg, so the package's files are copied in its place
+            makedirs(self.local / "tmp", exist_ok=True)
+            copy2(package_path, self.local / "tmp" / "luz.deb")
+            self.__sync(files, removed, staging_dir)
+            return
+        # the package is streamed over the same connection that installs it
+        self.cmd.exec_output(f"{self.ssh} 'cat > /tmp/luz.deb && dpkg -i /tmp/luz.deb; status=$?; rm -f /tmp/luz.deb; exit $status' < {quote(str(package_path))}", job=f"install/{self.name}")
+
+    def __sync(self, files: list, removed: list, staging_dir: Path):
+        """Copy files to the device, and remove others from it.
+
+        :param list files: Paths to copy, relative to the staging directory.
+        :param list removed: Paths to remove, relative to the staging directory.
+        :param Path staging_dir: The staging directory.
+        """
+        if self.local is not None:
+            for name in removed:
+                try:
+                    unlink(self.local / name)
+                except OSError:
+                    pass
+            for name in files:
+                makedirs((self.local / name).parent, exist_ok=True)
+                if (self.local / name).is_symlink():
+                    unlink(self.local / name)
+                copy2(staging_dir / name, self.local / name, follow_symlinks=False)
+            return
+        remove = f" && rm -f {' '.join(quote(f'/{x}') for x in removed)}" if removed != [] else ""
+        if files == []:
+            self.cmd.exec_output(f"{self.ssh} {quote(f'true{remove}')}", job=f"install/{self.name}")
+            return
+        file_list = staging_dir.parent / f"deploy-{self.name}.txt"
+        with open(file_list, "w") as file:
+            file.write("".join(f"{x}\n" for x in files))
+        try:
+            self.cmd.exec_output(f"tar -C {quote(str(staging_dir))} -cf - -T {quote(str(file_list))} | {self.ssh} {quote(f'tar -C / --no-same-owner -xpf -{remove}')}", job=f"install/{self.name}")
+        finally:
+            unlink(file_list)
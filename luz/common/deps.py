@@ -4,6 +4,7 @@ from pathlib import Path
 
 # local imports
 from .logger import error, log_stdout, remove_log_stdout
+from .trace import tracer
 from .utils import resolve_path
 
 
@@ -22,12 +23,14 @@ def clone_logos(module, update: bool = False) -> Path:
     if not logos_path.exists():
         log_stdout("Cloning logos...")
         makedirs(logos_path.parent, exist_ok=True)
-        module.cmd.exec_no_output(f"{module.meta.git} clone {logos_url} {logos_path} --recursive")
+        with tracer.span("clone logos", "vendor"):
+            module.cmd.exec_output(f"{module.meta.git} clone {logos_url} {logos_path} --recursive", job="vendor/logos")
         remove_log_stdout("Cloning logos...")
     # update
     if update:
         log_stdout("Updating logos...")
-        module.cmd.exec_no_output(f"cd {logos_path} && {module.meta.git} pull")
+        with tracer.span("update logos", "vendor"):
+            module.cmd.exec_output(f"{module.meta.git} pull", cwd=logos_path, job="vendor/logos")
         remove_log_stdout("Updating logos...")
     # return path
     return logos_path
@@ -48,12 +51,14 @@ def clone_libraries(module, update: bool = False) -> Path:
     if not libraries_path.exists():
         log_stdout("Cloning libraries...")
         makedirs(libraries_path.parent, exist_ok=True)
-        module.cmd.exec_no_output(f"{module.meta.git} clone {libraries_url} {libraries_path} --recursive")
+        with tracer.span("clone libraries", "vendor"):
+            module.cmd.exec_output(f"{module.meta.git} clone {libraries_url} {libraries_path} --recursive", job="vendor/libraries")
         remove_log_stdout("Cloning libraries...")
     # update
     if update:
         log_stdout("Updating libraries...")
-        module.cmd.exec_no_output(f"cd {libraries_path} && {module.meta.git} pull")
+        with tracer.span("update libraries", "vendor"):
+            module.cmd.exec_output(f"{module.meta.git} pull", cwd=libraries_path, job="vendor/libraries")
         remove_log_stdout("Updating libraries...")
     # return path
     return libraries_path
@@ -74,12 +79,14 @@ def clone_headers(module, update: bool = False) -> Path:
     if not headers_path.exists():
         log_stdout("Cloning headers...")
         makedirs(headers_path.parent, exist_ok=True)
-        module.cmd.exec_no_output(f"{module.meta.git} clone {headers_url} {headers_path} --recursive")
+        with tracer.span("clone headers", "vendor"):
+            module.cmd.exec_output(f"{module.meta.git} clone {headers_url} {headers_path} --recursive", job="vendor/headers")
         remove_log_stdout("Cloning headers...")
     # update
     if update:
         log_stdout("Updating headers...")
-        module.cmd.exec_no_output(f"cd {headers_path} && {module.meta.git} pull")
+        with tracer.span("update headers", "vendor"):
+            module.cmd.exec_output(f"{module.meta.git} pull", cwd=headers_path, job="vendor/headers")
         remove_log_stdout("Updating headers...")
     # return path
     return headers_path
@@ -106,14 +113,25 @@ def logos(luz, module, files: list) -> list:
         # match to case
         file_formatted = str(file).split("/")[-1].split(".")[-1]
         if file_formatted == "x" or file_formatted == "xm":
-            output_value = luz.cmd.exec_no_output(f"{logos_exec} {file}")
             output_file = resolve_path(f"{output}.{'m' if file_formatted == 'x' else 'mm'}")
+            # variants share logos output, so each file is only processed once per build
+            hash = luz.file_hashes.get(str(file))
+            if hash is not None and luz.logos_hashes.get(str(output_file)) == hash and output_file.exists():
+                new_files.append({"logos": True, "new_path": output_file, "old_path": resolve_path(file)})
+                continue
+            # named by the file's path in the project, like compile jobs
+            prefix = f"{luz.path.absolute()}/"
+            job = f"logos/{module.name}/{str(file)[len(prefix) :] if str(file).startswith(prefix) else Path(file).name}"
+            with tracer.span("logos", "logos", module=module.name, file=file):
+                output_value = luz.cmd.exec_no_output(f"{logos_exec} {file}", job=job, kind="logos")
             spl = output_value.splitlines()
             if not spl[0].startswith("#"):
                 error(f"Logos Error: {spl[0]}", f"{module.abbreviated_name}")
                 exit(1)
             with open(output_file, "w") as f:
                 f.write(output_value)
+            if hash is not None:
+                luz.logos_hashes[str(output_file)] = hash
             new_files.append(
                 {
                     "logos": True,
@@ -0,0 +1,71 @@
+# module imports
+from collections import Counter
+from json import dump
+from threading import Lock
+
+# local imports
+from .logger import log
+
+
+def diff_flags(old: list, new: list) -> str:
+    """Describe how a job's flags changed.
+
+    :param list old: The flags the job last ran with.
+    :param list new: The flags the job would run with now.
+    :return: A description of the added and removed flags.
+    """
+    # flags can be repeated, so they're counted
+    added = list((Counter(new) - Counter(old)).elements())
+    removed = list((Counter(old) - Counter(new)).elements())
+    parts = []
+    if added != []:
+        parts.append(f"added {' '.join(added)}")
+    if removed != []:
+        parts.append(f"removed {' '.join(removed)}")
+    return ", ".join(parts) if parts != [] else "reordered"
+
+
+class Explainer:
+    def __init__(self):
+        """Records why each build action ran, or was skipped."""
+        self.enabled = False
+        self.actions = []
+        self.lock = Lock()
+
+    def enable(self):
+        """Start recording actions."""
+        self.enabled = True
+
+    def reset(self):
+        """Stop recording actions, and discard recorded ones."""
+        with self.lock:
+            self.enabled = False
+            self.actions = []
+
+    def record(self, action: str, target: str, ran: bool, reason: str, abbreviation: str = "LUZ", **args):
+        """Record an action, and print why it ran or was skipped.
+
+        :param str action: The action. (compile, link, lipo, sign, stage, pack)
+        :param str target: What the action is for, such as a source or a module.
+        :param bool ran: Whether the action ran.
+        :param str reason: Why the action ran, or was skipped.
+        :param str abbreviation: Abbreviation to log the action with.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.actions.append({"action": action, "target": str(target), "ran": ran, "reason": reason, **{k: str(v) for k, v in args.items() if v is not None}})
+            log(f"{action} \"{target}\" {'ran' if ran else 'skipped'}: {reason}", "🔍", abbreviation)
+
+    def save(self, path: str):
+        """Write the recorded actions to a file.
+
+        :param str path: Path to write the actions to.
+        """
+        with self.lock:
+            with open(path, "w") as file:
+                dump({"actions": self.actions}, file, indent=4)
+
+
+# the explainer used by the current process
+explainer = Explainer()
@@ -0,0 +1,136 @@
+# module imports
+from os import listdir, makedirs, rename, rmdir, scandir, unlink
+from pathlib import Path
+from subprocess import DEVNULL, Popen
+from time import time
+
+
+def walk_files(root: Path):
+    """Walk every file below a directory.
+
+    :param Path root: The directory to walk.
+    :return: A generator of os.DirEntry objects.
+    """
+    try:
+        entries = list(scandir(root))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from walk_files(Path(entry.path))
+        else:
+            yield entry
+
+
+def remove_empty_dirs(root: Path):
+    """Remove empty directories below a directory, keeping the directory itself.
+
+    :param Path root: The directory to clean up.
+    """
+    try:
+        entries = list(scandir(root))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            remove_empty_dirs(Path(entry.path))
+            try:
+                rmdir(entry.path)
+            except OSError:
+                pass
+
+
+def remove_stale(roots: list, expected: set) -> int:
+    """Remove every file below a list of directories that isn't expected.
+
+    :param list roots: The directories to clean up.
+    :param set expected: Paths of the files to keep.
+    :return: The amount of bytes freed.
+    """
+    freed = 0
+    expected = {str(path) for path in expected}
+    for root in roots:
+        for entry in walk_files(root):
+            if entry.path not in expected:
+                try:
+                    freed += entry.stat(follow_symlinks=False).st_size
+                    unlink(entry.path)
+                except OSError:
+                    pass
+        remove_empty_dirs(root)
+    return freed
+
+
+def dir_size(root: Path) -> int:
+    """Get the size of a directory.
+
+    :param Path root: The directory to measure.
+    :return: The size, in bytes.
+    """
+    return sum(entry.stat(follow_symlinks=False).st_size for entry in walk_files(root))
+
+
+def trim(root: Path, limit: int, evictable: list, exclude: list = []) -> int:
+    """Remove the least recently used files until a directory fits in a size limit.
+
+    :param Path root: The directory to limit.
+    :param int limit: The size limit, in bytes.
+    :param list evictable: Directories below the root that files can be removed from.
+    :param list exclude: Directories below the root that don't count towards the limit.
+    :return: The amount of bytes freed.
+    """
+    exclude = [str(path) for path in exclude]
+    size = sum(entry.stat(follow_symlinks=False).st_size for entry in walk_files(root) if not entry.path.startswith(tuple(exclude)))
+    if size <= limit:
+        return 0
+    # least recently used first
+    files = []
+    for path in evictable:
+        for entry in walk_files(path):
+            stat = entry.stat(follow_symlinks=False)
+            files.append((max(stat.st_atime, stat.st_mtime), stat.st_size, entry.path))
+    files.sort()
+    freed = 0
+    for _, file_size, file in files:
+        if size - freed <= limit:
+            break
+        try:
+            unlink(file)
+            freed += file_size
+        except OSError:
+            pass
+    for path in evictable:
+        remove_empty_dirs(path)
+    return freed
+
+
+def empty_trash(trash_dir: Path):
+    """Delete everything in a trash directory, in the background.
+
+    The deletion outlives the current process, so leftovers of an interrupted
+    deletion are picked up by the next call.
+
+    :param Path trash_dir: The trash directory.
+    """
+    try:
+        entries = [str(trash_dir / name) for name in listdir(trash_dir)]
+    except OSError:
+        return
+    if entries != []:
+        Popen(["rm", "-rf", *entries], stdin=DEVNULL, stdout=DEVNULL, stderr=DEVNULL, start_new_session=True)
+
+
+def move_to_trash(root: Path, trash_dir: Path):
+    """Empty a directory by moving its contents to a trash directory, which is then emptied in the background.
+
+    :param Path root: The directory to empty.
+    :param Path trash_dir: The trash directory, which must be on the same filesystem.
+    """
+    if not root.exists():
+        return
+    dest = trash_dir / str(int(time() * 1000))
+    makedirs(dest, exist_ok=True)
+    for name in listdir(root):
+        if root / name != trash_dir:
+            rename(root / name, dest / name)
+    empty_trash(trash_dir)
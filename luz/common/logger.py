@@ -1,6 +1,11 @@
 # module imports
-from sys import stdout
-
+from atexit import register
+from json import dumps
+from queue import Queue
+from shutil import get_terminal_size
+import sys
+from threading import Lock, Thread
+from time import time
 
 colors = {
     "red": "\033[31m",
@@ -12,62 +17,182 @@ colors = {
     "bold": "\033[01m",
 }
 
+# log levels, from least to most important
+# (jobs are only written as JSON, and progress is shown on the status line of TTYs)
+LEVELS = ["job", "progress", "info", "warn", "error"]
+# colors of each level
+LEVEL_COLORS = {"progress": "green", "info": "green", "warn": "yellow", "error": "red"}
+
+
+class Logger:
+    def __init__(self):
+        """Writes log events from its own thread, so that jobs never wait on the console.
+
+        Events queued while writing are written at once. On TTYs, progress events (like
+        each compiled file) update a single status line instead of printing a line each.
+        """
+        self.format = "text"
+        self.quiet = False
+        self.tty = False
+        # where events are written, None for stdout
+        self.stream = None
+        self.queue = Queue()
+        self.thread = None
+        self.lock = Lock()
+        # current status line, and whether it's shown
+        self.status = ""
+        self.shown = False
+        # progress events since the logger was configured
+        self.count = 0
+
+    def configure(self, format: str = "text", quiet: bool = False, tty: bool = None, stream=None):
+        """Set how events are written.
+
+        :param str format: Format of the events. (text, json)
+        :param bool quiet: Whether to only write warnings, errors and command output.
+        :param bool tty: Whether output goes to a terminal. (default: whether the stream is one)
+        :param stream: File-like object to write events to. (default: stdout)
+        """
+        self.flush()
+        self.format = format
+        self.quiet = quiet
+        self.stream = stream
+        self.tty = tty if tty is not None else getattr(stream or sys.stdout, "isatty", lambda: False)()
+        self.count = 0
+
+    def emit(self, event: dict):
+        """Queue an event to be written.
+
+        :param dict event: The event.
+        """
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = Thread(target=self.__run, daemon=True)
+                    self.thread.start()
+                    # write what's left before exiting
+                    register(self.flush)
+        self.queue.put(event)
+
+    def flush(self):
+        """Wait for every queued event to be written, and clear the status line."""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.queue.join()
+
+    def __run(self):
+        """Write queued events until the process exits."""
+        while True:
+            events = [self.queue.get()]
+            while not self.queue.empty():
+                events.append(self.queue.get_nowait())
+            try:
+                self.__write(events)
+            except Exception:
+                pass
+            finally:
+                for _ in events:
+                    self.queue.task_done()
+
+    def __write(self, events: list):
+        """Write events.
+
+        :param list events: The events, or None to clear the status line.
+        """
+        status = self.status
+        lines = []
+        for event in events:
+            if event is None:
+                status = ""
+            elif event["type"] == "status":
+                status = event["message"]
+            elif event["type"] == "output":
+                lines.append(dumps(event) + "\n" if self.format == "json" else event["text"])
+            elif self.quiet and LEVELS.index(event["level"]) < LEVELS.index("warn"):
+                continue
+            elif self.format == "json":
+                lines.append(dumps(event) + "\n")
+            elif event["level"] == "job":
+                continue
+            elif event["level"] == "progress" and self.tty:
+                self.count += 1
+                status = f"{event['emoji']} {event['source']}: [{self.count}] {event['message']}"
+            else:
+                color = colors[LEVEL_COLORS[event["level"]]]
+                lines.append(colors["bold"] + color + f"{event['emoji']} {event['source']}" + colors["bold"] + colors["darkgrey"] + ": " + colors["reset"] + f"{event['message']}\n")
+        if not self.tty or self.format == "json":
+            status = ""
+        if lines == [] and status == self.status:
+            return
+        # the status line is redrawn below new lines
+        text = "\r\033[K" if self.shown else ""
+        text += "".join(lines)
+        if status != "":
+            text += status[: get_terminal_size().columns - 1]
+        self.status = status
+        self.shown = status != ""
+        stream = self.stream or sys.stdout
+        stream.write(text)
+        stream.flush()
+
+
+# the logger used by the current process
+logger = Logger()
+
+
+def emit(level: str, message, emoji: str, msg: str, **fields):
+    """Queue a log event.
+
+    :param str level: Level of the event. (job, progress, info, warn, error)
+    :param message: The message.
+    :param str emoji: Emoji to show the message with.
+    :param str msg: Abbreviation of what the message is from.
+    """
+    logger.emit({"type": "log", "time": time(), "level": level, "source": msg, "emoji": emoji, "message": str(message), **{k: v for k, v in fields.items() if v is not None}})
+
+
+def write(text: str):
+    """Queue output of a command.
+
+    :param str text: The output.
+    """
+    logger.emit({"type": "output", "time": time(), "text": text})
+
 
 def log_stdout(message, lock=None):
-    colorway = colors["bold"] + colors["darkgrey"] + "[" + colors["reset"] + colors["bold"] + colors["green"] + "*" + colors["bold"] + colors["darkgrey"] + "] " + colors["reset"]
-    if lock is not None:
-        with lock:
-            stdout.write(f"{colorway}{message}")
-            stdout.flush()
-    else:
-        stdout.write(f"{colorway}{message}")
-        stdout.flush()
+    logger.emit({"type": "status", "message": f"[*] {message}"})
 
 
 def remove_log_stdout(message, lock=None):
-    colorway = colors["bold"] + colors["darkgrey"] + "[" + colors["reset"] + colors["bold"] + colors["green"] + "*" + colors["bold"] + colors["darkgrey"] + "] " + colors["reset"]
-    if lock is not None:
-        with lock:
-            for _ in range(len(f"{colorway}{message}")):
-                stdout.write("\033[D \033[D")
-                stdout.flush()
-    else:
-        for _ in range(len(f"{colorway}{message}")):
-            stdout.write("\033[D \033[D")
-            stdout.flush()
-
-
-def log(message, emoji: str = "💡", msg: str = "LUZ", lock=None):
-    char = emoji + " " + msg
-    if lock is not None:
-        with lock:
-            print(colors["bold"] + colors["green"] + char + colors["bold"] + colors["darkgrey"] + ": " + colors["reset"] + f"{message}")
-    else:
-        print(colors["bold"] + colors["green"] + char + colors["bold"] + colors["darkgrey"] + ": " + colors["reset"] + f"{message}")
+    logger.emit({"type": "status", "message": ""})
+
+
+def log(message, emoji: str = "💡", msg: str = "LUZ", lock=None, **fields):
+    emit("info", message, emoji, msg, **fields)
+
+
+def progress(message, emoji: str = "💡", msg: str = "LUZ", **fields):
+    emit("progress", message, emoji, msg, **fields)
+
+
+def log_job(phase: str, duration: float, msg: str = "LUZ", **fields):
+    emit("job", f"{phase} finished in {round(duration, 3)} seconds", "⏱️", msg, phase=phase, duration=duration, **fields)
 
 
 def debug(message, dbg):
     if dbg:
-        print(colors["bold"] + colors["darkgrey"] + "[" + colors["reset"] + colors["bold"] + colors["yellow"] + "#" + colors["bold"] + colors["darkgrey"] + "] " + colors["reset"] + f"{message}")
+        write(colors["bold"] + colors["darkgrey"] + "[" + colors["reset"] + colors["bold"] + colors["yellow"] + "#" + colors["bold"] + colors["darkgrey"] + "] " + colors["reset"] + f"{message}\n")
 
 
-def warn(message, emoji: str = "⚠️", msg: str = "LUZ", lock=None):
-    char = emoji + " " + msg
-    if lock is not None:
-        with lock:
-            print(colors["bold"] + colors["yellow"] + char + colors["bold"] + colors["darkgrey"] + ": " + colors["reset"] + f"{message}")
-    else:
-        print(colors["bold"] + colors["yellow"] + char + colors["bold"] + colors["darkgrey"] + ": " + colors["reset"] + f"{message}")
+def warn(message, emoji: str = "⚠️", msg: str = "LUZ", lock=None, **fields):
+    emit("warn", message, emoji, msg, **fields)
 
 
-def error(message, emoji: str = "❌", msg: str = "LUZ", lock=None):
-    char = emoji + " " + msg
-    if lock is not None:
-        with lock:
-            print(colors["bold"] + colors["red"] + char + colors["bold"] + colors["darkgrey"] + ": " + colors["reset"] + f"{message}")
-    else:
-        print(colors["bold"] + colors["red"] + char + colors["bold"] + colors["darkgrey"] + ": " + colors["reset"] + f"{message}")
+def error(message, emoji: str = "❌", msg: str = "LUZ", lock=None, **fields):
+    emit("error", message, emoji, msg, **fields)
 
 
 def ask(message, char="❓"):
+    logger.flush()
     return input(colors["bold"] + colors["orange"] + char + colors["bold"] + colors["darkgrey"] + ": " + colors["reset"] + f"{message} -> ")
@@ -0,0 +1,121 @@
+# module imports
+from collections import deque
+from os import makedirs
+from pathlib import Path
+from shutil import rmtree
+
+
+class OutputBuffer:
+    def __init__(self, limit: int = 2**16):
+        """A buffer that only keeps the last `limit` bytes written to it.
+
+        :param int limit: Maximum amount of bytes to keep.
+        """
+        self.limit = limit
+        self.chunks = deque()
+        self.size = 0
+        self.dropped = 0
+
+    def write(self, data: bytes):
+        """Write data to the buffer, dropping the oldest data if it's full.
+
+        :param bytes data: The data to write.
+        """
+        self.chunks.append(data)
+        self.size += len(data)
+        # drop from the front until we're within the limit
+        while self.size > self.limit:
+            excess = self.size - self.limit
+            head = self.chunks[0]
+            if len(head) <= excess:
+                self.chunks.popleft()
+                self.size -= len(head)
+                self.dropped += len(head)
+            else:
+                self.chunks[0] = head[excess:]
+                self.size -= excess
+                self.dropped += excess
+
+    def getvalue(self) -> str:
+        """Get the buffered output.
+
+        :return: The buffered output.
+        """
+        text = b"".join(self.chunks).decode(errors="replace")
+        if self.dropped:
+            text = f"... ({self.dropped} bytes truncated)\n{text}"
+        return text
+
+
+class JobOutput:
+    def __init__(self, log_path: Path = None, limit: int = 2**16, max_warnings: int = 50):
+        """Captures a single job's output as it is produced.
+
+        :param Path log_path: Path to write the job's full output to.
+        :param int limit: Maximum amount of bytes to keep in memory per stream.
+        :param int max_warnings: Maximum amount of warning lines to keep.
+        """
+        self.log_path = log_path
+        self.stdout = OutputBuffer(limit)
+        self.stderr = OutputBuffer(limit)
+        self.max_warnings = max_warnings
+        self.warnings = []
+        self.__partial = b""
+        self.__log = None
+
+    def write(self, data: bytes, is_stderr: bool = False):
+        """Write a chunk of output.
+
+        :param bytes data: The chunk to write.
+        :param bool is_stderr: Whether the chunk came from stderr.
+        """
+        if self.log_path is not None:
+            if self.__log is None:
+                makedirs(self.log_path.parent, exist_ok=True)
+                self.__log = open(self.log_path, "wb")
+            self.__log.write(data)
+        if is_stderr:
+            self.stderr.write(data)
+            # scan complete lines for warnings
+            lines = (self.__partial + data).split(b"\n")
+            self.__partial = lines.pop()
+            for line in lines:
+                if b"warning:" in line and len(self.warnings) < self.max_warnings:
+                    self.warnings.append(line.decode(errors="replace"))
+        else:
+            self.stdout.write(data)
+
+    def close(self):
+        """Finish capturing output."""
+        # scan the last unterminated line
+        if b"warning:" in self.__partial and len(self.warnings) < self.max_warnings:
+            self.warnings.append(self.__partial.decode(errors="replace"))
+        self.__partial = b""
+        if self.__log is not None:
+            self.__log.close()
+            self.__log = None
+
+    def getvalue(self) -> str:
+        """Get the combined buffered output.
+
+        :return: The buffered stdout followed by the buffered stderr.
+        """
+        return "".join(filter(None, [self.stdout.getvalue(), self.stderr.getvalue()]))
+
+
+def setup_log_dir(build_dir: Path, now: float, keep: int = 10) -> Path:
+    """Create the log directory for a build, and remove old ones.
+
+    :param Path build_dir: The project's build directory.
+    :param float now: The time the build started.
+    :param int keep: The amount of build logs to keep.
+    :return: Path to the log directory.
+    """
+    logs_dir = Path(build_dir) / "logs"
+    log_dir = logs_dir / str(int(now * 1000))
+    makedirs(log_dir, exist_ok=True)
+    # remove old logs
+    old = sorted(logs_dir.iterdir(), key=lambda x: x.name)[:-keep]
+    for path in old:
+        rmtree(path, ignore_errors=True)
+    return log_dir
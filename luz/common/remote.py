@@ -0,0 +1,326 @@
+# module imports
+from base64 import b64decode, b64encode
+from json import dumps, loads
+from os import cpu_count
+from pathlib import Path
+from re import fullmatch
+import socket
+from subprocess import getoutput
+from threading import Condition, Thread
+from time import monotonic
+from zlib import compress, decompressobj, error as ZlibError
+
+# local imports
+from .logger import warn
+
+# default port of `luz worker`
+DEFAULT_PORT = 7777
+# suffixes of preprocessed sources, by source suffix
+PREPROCESSED_SUFFIXES = {".c": ".i", ".m": ".mi", ".mm": ".mii", ".cpp": ".ii", ".cc": ".ii", ".cxx": ".ii"}
+# flags that only affect preprocessing, and the ones that take a separate value
+PREPROCESSOR_FLAGS = ["-I", "-F", "-D", "-U", "-isysroot", "-include", "-imacros", "-isystem", "-iquote", "-idirafter", "-iframework"]
+PREPROCESSOR_FLAGS_WITH_VALUE = ["-isysroot", "-include", "-imacros", "-isystem", "-iquote", "-idirafter", "-iframework"]
+# flags workers compile with, as patterns of the whole argument
+# (anything else, such as plugins, -mllvm, or flags that write files, is refused)
+ALLOWED_FLAGS = [
+    r"-O([0-3sz]|fast)?",
+    r"-g[\w-]*",
+    r"-w",
+    r"-W[\w=+-]+",
+    r"-pedantic(-errors)?",
+    r"-std=[\w+]+",
+    r"-stdlib=[\w+]+",
+    r"-m\w+-version-min=[\d.]+",
+    r"-flto(=(thin|full))?",
+    r"-fvisibility=(hidden|default)",
+    r"-f(no-)?(objc-arc|objc-weak|objc-arc-exceptions|objc-exceptions|blocks|exceptions|cxx-exceptions|rtti|pic|PIC|pie|PIE|common|strict-aliasing|omit-frame-pointer)",
+    r"-f(no-)?(stack-protector|stack-protector-strong|stack-protector-all|function-sections|data-sections|fast-math|signed-char|unsigned-char|short-enums|inline|builtin)",
+    r"-f(no-)?(color-diagnostics|diagnostics-color|embed-bitcode|embed-bitcode-marker)",
+]
+# flags workers compile with that take a separate value, and patterns of the value
+ALLOWED_FLAGS_WITH_VALUE = {"-target": r"[\w.-]+", "-arch": r"\w+"}
+# time to stop sending jobs to a worker after it fails, in seconds
+COOLDOWN = 30
+# size limits of messages, in bytes (headers carry the output of compile jobs)
+MAX_HEADER_SIZE = 16 * 2**20
+MAX_PAYLOAD_SIZE = 256 * 2**20
+# size limit of decompressed sources and objects, in bytes
+MAX_FILE_SIZE = 1024 * 2**20
+
+
+def send_message(conn, header: dict, payload: bytes = b""):
+    """Send a message, made of a JSON header and an optional payload.
+
+    :param socket conn: The connection to send to.
+    :param dict header: The header.
+    :param bytes payload: The payload.
+    """
+    conn.sendall((dumps({**header, "size": len(payload)}) + "\n").encode() + payload)
+
+
+def recv_message(file) -> tuple:
+    """Receive a message sent with send_message.
+
+    :param file: A binary file object of the connection.
+    :return: A tuple of the header and the payload.
+    """
+    line = file.readline(MAX_HEADER_SIZE + 1)
+    if not line:
+        raise ConnectionError("Connection closed.")
+    if len(line) > MAX_HEADER_SIZE:
+        raise ValueError("Header too large.")
+    header = loads(line)
+    size = header.get("size") if isinstance(header, dict) else None
+    if not isinstance(size, int) or size < 0 or size > MAX_PAYLOAD_SIZE:
+        raise ValueError("Invalid payload size.")
+    payload = file.read(size)
+    if len(payload) != size:
+        raise ConnectionError("Connection closed.")
+    return header, payload
+
+
+def decompress_limited(data: bytes, limit: int = MAX_FILE_SIZE) -> bytes:
+    """Decompress a payload, without letting it grow past a size limit.
+
+    :param bytes data: The compressed data.
+    :param int limit: Size limit of the decompressed data, in bytes.
+    :return: The decompressed data.
+    """
+    decompressor = decompressobj()
+    try:
+        output = decompressor.decompress(data, limit)
+    except ZlibError as err:
+        raise ValueError(f"Invalid payload. ({err})")
+    if decompressor.unconsumed_tail != b"":
+        raise ValueError("Payload too large.")
+    if not decompressor.eof:
+        raise ValueError("Payload is truncated.")
+    return output
+
+
+def encode_output(data: bytes) -> str:
+    """Encode command output so it can be sent in a header.
+
+    :param bytes data: The output.
+    :return: The encoded output.
+    """
+    return b64encode(data).decode()
+
+
+def compiler_version(cc: str) -> str:
+    """Get the version of a compiler, which workers must match.
+
+    :param str cc: The compiler.
+    :return: The first line of `cc --version`.
+    """
+    output = getoutput(f"{cc} --version").splitlines()
+    return output[0] if output != [] else ""
+
+
+def parse_address(address: str) -> tuple:
+    """Parse a worker address.
+
+    :param str address: The address. (ex: 192.168.1.2:7777, or 192.168.1.2 for the default port)
+    :return: A tuple of the host and port.
+    """
+    host, _, port = str(address).rpartition(":")
+    if host == "":
+        return str(address), DEFAULT_PORT
+    return host, int(port)
+
+
+def strip_preprocessor_flags(args: list) -> list:
+    """Remove flags that only affect preprocessing.
+
+    :param list args: The arguments.
+    :return: The arguments to compile a preprocessed source with.
+    """
+    stripped = []
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in PREPROCESSOR_FLAGS_WITH_VALUE:
+            skip = True
+        elif not arg.startswith(tuple(PREPROCESSOR_FLAGS)):
+            stripped.append(arg)
+    return stripped
+
+
+def allowed_args(args: list) -> bool:
+    """Check whether workers compile with a list of arguments.
+
+    Only code generation and target flags are allowed, so that jobs can't make a worker load code or write files.
+
+    :param list args: The arguments, without preprocessor flags.
+    :return: Whether every argument is allowed.
+    """
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg in ALLOWED_FLAGS_WITH_VALUE:
+            if index + 1 >= len(args) or not fullmatch(ALLOWED_FLAGS_WITH_VALUE[arg], args[index + 1]):
+                return False
+            index += 2
+        elif any(fullmatch(pattern, arg) for pattern in ALLOWED_FLAGS):
+            index += 1
+        else:
+            return False
+    return True
+
+
+class RemoteWorker:
+    def __init__(self, address: str):
+        """A worker that compiles jobs sent to it.
+
+        :param str address: The worker's address.
+        """
+        self.address = address
+        self.host, self.port = parse_address(address)
+        self.slots = 0
+        self.active = 0
+        self.down_until = 0
+
+    def __str__(self) -> str:
+        return self.address
+
+    def request(self, header: dict, payload: bytes = b"", timeout: float = None) -> tuple:
+        """Send a request, and wait for its response.
+
+        :param dict header: The request's header.
+        :param bytes payload: The request's payload.
+        :param float timeout: Time to wait for the response, in seconds. (default: forever)
+        :return: A tuple of the response's header and payload.
+        """
+        with socket.create_connection((self.host, self.port), timeout=5) as conn:
+            conn.settimeout(timeout)
+            send_message(conn, header, payload)
+            return recv_message(conn.makefile("rb"))
+
+    def connect(self, version: str):
+        """Check that the worker is reachable and uses the same compiler.
+
+        :param str version: The local compiler's version.
+        """
+        try:
+            header, _ = self.request({"command": "hello"}, timeout=5)
+        except (OSError, ValueError) as err:
+            warn(f'Worker "{self}" is unreachable, compiling locally instead. ({err})')
+            return
+        if header.get("version") != version:
+            warn(f'Worker "{self}" uses a different compiler ({header.get("version")}), not using it.')
+            return
+        self.slots = int(header.get("slots", 0))
+
+    def available(self) -> bool:
+        """Check whether the worker can take a job."""
+        return self.active < self.slots and monotonic() >= self.down_until
+
+
+class Distributor:
+    def __init__(self, workers: list, cc: str, local_jobs: int = None):
+        """Hands compile jobs out to workers, keeping as many as possible on this machine.
+
+        :param list workers: Addresses of the workers.
+        :param str cc: The local compiler.
+        :param int local_jobs: Amount of jobs to run locally at once. (default: amount of CPUs)
+        """
+        self.version = compiler_version(cc)
+        self.workers = [RemoteWorker(address) for address in workers]
+        self.local = local_jobs if local_jobs is not None else (cpu_count() or 1)
+        self.cond = Condition()
+        self.reconnect()
+
+    def reconnect(self):
+        """Check every worker that isn't usable, such as ones that were unreachable when the build started."""
+        threads = [Thread(target=worker.connect, args=(self.version,)) for worker in self.workers if worker.slots == 0]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def close(self):
+        """Stop handing jobs out to workers, once the project using them is replaced."""
+        with self.cond:
+            for worker in self.workers:
+                worker.slots = 0
+            self.cond.notify_all()
+
+    def acquire(self):
+        """Wait for a slot to run a job in.
+
+        Local slots are used first, as local jobs don't pay for preprocessing and transfer.
+
+        :return: The worker to run the job on, or None to run it locally.
+        """
+        with self.cond:
+            while True:
+                if self.local > 0:
+                    self.local -= 1
+                    return None
+                available = [worker for worker in self.workers if worker.available()]
+                if available != []:
+                    worker = min(available, key=lambda x: x.active / x.slots)
+                    worker.active += 1
+                    return worker
+                # every worker is unusable, so don't wait for them
+                if not any(worker.slots > 0 and monotonic() >= worker.down_until for worker in self.workers):
+                    self.local -= 1
+                    return None
+                self.cond.wait(1)
+
+    def release(self, worker: RemoteWorker):
+        """Release a slot.
+
+        :param RemoteWorker worker: The worker the job ran on, or None if it ran locally.
+        """
+        with self.cond:
+            if worker is None:
+                self.local += 1
+            else:
+                worker.active -= 1
+            self.cond.notify()
+
+    def accepts(self, args: list) -> bool:
+        """Check whether workers compile with a module's flags, so that jobs they'd refuse are kept on this machine.
+
+        :param list args: The compiler arguments, without the source and output.
+        :return: Whether workers accept them.
+        """
+        return allowed_args(strip_preprocessor_flags(args))
+
+    def compile(self, worker: RemoteWorker, source: Path, args: list, out_name: str, cmd, job: str = None) -> bool:
+        """Compile a preprocessed source on a worker.
+
+        :param RemoteWorker worker: The worker to compile on.
+        :param Path source: The preprocessed source.
+        :param list args: The compiler arguments, without the source and output.
+        :param str out_name: Path to write the object to.
+        :param CMD cmd: Used to report the job's output.
+        :param str job: Name of the job.
+        :return: Whether the job ran on the worker. If not, it should be compiled locally.
+        """
+        args = strip_preprocessor_flags(args)
+        with open(source, "rb") as file:
+            payload = compress(file.read(), 1)
+        try:
+            header, obj = worker.request({"command": "compile", "version": self.version, "name": Path(source).name, "args": args}, payload)
+        except (OSError, ValueError) as err:
+            warn(f'Worker "{worker}" failed, compiling locally instead. ({err})')
+            worker.down_until = monotonic() + COOLDOWN
+            return False
+        if "error" in header:
+            warn(f'Worker "{worker}" refused a job, compiling locally instead. ({header["error"]})')
+            worker.down_until = monotonic() + COOLDOWN
+            return False
+        if header["returncode"] == 0:
+            with open(out_name, "wb") as file:
+                file.write(decompress_limited(obj))
+        cmd.report(
+            f"[{worker}] cc {' '.join(args)} -c {Path(source).name} -o {out_name}",
+            header["returncode"],
+            b64decode(header["stdout"]),
+            b64decode(header["stderr"]),
+            job,
+        )
+        return True
@@ -0,0 +1,187 @@
+# module imports
+from os import getloadavg
+from threading import Condition
+
+# slots each kind of job takes, unless the meta says otherwise
+# (installs and vendor clones wait on the network, so they aren't limited)
+WEIGHTS = {"swift": 2, "link": 2, "install": 0, "vendor": 0}
+# memory each kind of job is assumed to use until one has been recorded, in megabytes
+MEMORY = {"swift": 1024, "link": 512, "compile": 256, "preprocess": 256, "logos": 64}
+# memory of other kinds of jobs, in megabytes
+DEFAULT_MEMORY = 32
+# how often jobs waiting on the load average or available memory check them again, in seconds
+THROTTLE_INTERVAL = 0.25
+
+
+def available_memory():
+    """Get the memory available to new processes.
+
+    :return: The memory in megabytes, or None if it can't be read on this platform.
+    """
+    try:
+        with open("/proc/meminfo", "r") as file:
+            for line in file:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class Slot:
+    def __init__(self, scheduler, weight: int, memory: float):
+        """Room for a job to run in, held while the job runs.
+
+        :param Scheduler scheduler: The scheduler to take the room from.
+        :param int weight: Slots the job takes.
+        :param float memory: Memory the job is expected to use, in megabytes.
+        """
+        self.scheduler = scheduler
+        self.weight = weight
+        self.memory = memory
+
+    def __enter__(self):
+        self.scheduler.acquire(self)
+        return self
+
+    def __exit__(self, *_):
+        self.scheduler.release(self)
+
+
+class NullSlot:
+    """A slot for jobs that aren't limited."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+class Scheduler:
+    def __init__(self):
+        """Limits the jobs that run at once by the slots and memory they take.
+
+        Every kind of job (compile, swift, link, logos, sign, ...) takes a weighted amount of
+        slots, and is expected to use as much memory as it did last time, as recorded in the
+        build state. Without limits, jobs start as soon as they're submitted.
+        """
+        self.condition = Condition()
+        self.null = NullSlot()
+        # jobs running, and the slots and memory they took
+        self.running = 0
+        self.slots = 0
+        self.used_memory = 0
+        self.configure()
+
+    def configure(self, jobs: int = 0, memory: int = 0, max_load: float = 0, min_free_memory: int = 0, weights: dict = None, state=None):
+        """Set the limits of jobs.
+
+        Jobs that are still running (like ones of a build in another thread) keep the
+        room they took, and release it when they finish.
+
+        :param int jobs: Amount of slots, 0 for no limit.
+        :param int memory: Memory that running jobs can use in total, in megabytes, 0 for no limit.
+        :param float max_load: Load average above which no jobs are started, 0 for no limit.
+        :param int min_free_memory: Memory to keep available to the system, in megabytes, 0 for no limit.
+        :param dict weights: Slots each kind of job takes, in addition to the defaults.
+        :param BuildState state: Where to read and record what jobs used.
+        """
+        with self.condition:
+            self.jobs = jobs
+            self.memory = memory
+            self.max_load = max_load
+            self.min_free_memory = min_free_memory
+            self.weights = {**WEIGHTS, **(weights or {})}
+            self.state = state
+            # peak memory of each job, in megabytes
+            self.costs = state.get_resources() if state is not None else {}
+            self.condition.notify_all()
+
+    def estimate(self, kind: str, job: str = None) -> float:
+        """Estimate the memory a job will use.
+
+        :param str kind: Kind of the job.
+        :param str job: Name of the job.
+        :return: The peak memory the job used last time, or the average of its kind, or a default for its kind, in megabytes.
+        """
+        cost = self.costs.get(job)
+        if cost is not None:
+            return cost["peak_rss"]
+        recorded = [x["peak_rss"] for x in list(self.costs.values()) if x["kind"] == kind]
+        if recorded != []:
+            return sum(recorded) / len(recorded)
+        return MEMORY.get(kind, DEFAULT_MEMORY)
+
+    def slot(self, kind: str, job: str = None):
+        """Get room for a job to run in.
+
+        :param str kind: Kind of the job.
+        :param str job: Name of the job.
+        :return: A context manager that waits for room when entered, and frees it on exit.
+        """
+        weight = self.weights.get(kind, 1)
+        if weight == 0 or (self.jobs <= 0 and self.memory <= 0 and self.max_load <= 0 and self.min_free_memory <= 0):
+            return self.null
+        return Slot(self, weight, self.estimate(kind, job) if self.memory > 0 or self.min_free_memory > 0 else 0)
+
+    def acquire(self, slot: Slot):
+        """Wait until there's room for a job, and take it.
+
+        :param Slot slot: The room the job needs.
+        """
+        with self.condition:
+            while not self.__fits(slot):
+                # the load and available memory change without jobs finishing
+                self.condition.wait(THROTTLE_INTERVAL if self.max_load > 0 or self.min_free_memory > 0 else None)
+            self.running += 1
+            self.slots += slot.weight
+            self.used_memory += slot.memory
+
+    def release(self, slot: Slot):
+        """Free the room of a finished job.
+
+        :param Slot slot: The room the job took.
+        """
+        with self.condition:
+            self.running -= 1
+            self.slots -= slot.weight
+            self.used_memory -= slot.memory
+            self.condition.notify_all()
+
+    def __fits(self, slot: Slot) -> bool:
+        """Check whether a job can start now.
+
+        :param Slot slot: The room the job needs.
+        :return: Whether it can start.
+        """
+        # a job always starts if no other is running, so that jobs larger than the limits still run
+        if self.running == 0:
+            return True
+        if self.jobs > 0 and self.slots + slot.weight > self.jobs:
+            return False
+        if self.memory > 0 and self.used_memory + slot.memory > self.memory:
+            return False
+        if self.max_load > 0 and getloadavg()[0] > self.max_load:
+            return False
+        if self.min_free_memory > 0:
+            available = available_memory()
+            if available is not None and available - slot.memory < self.min_free_memory:
+                return False
+        return True
+
+    def record(self, kind: str, job: str, peak_rss: int, duration: float):
+        """Record what a finished job used, so that later builds can estimate it.
+
+        :param str kind: Kind of the job.
+        :param str job: Name of the job.
+        :param int peak_rss: Peak resident memory of the job, in bytes.
+        :param float duration: Time the job took, in seconds.
+        """
+        self.costs[job] = {"kind": kind, "peak_rss": peak_rss / 2**20}
+        if self.state is not None:
+            self.state.record_resources(job, kind, peak_rss, duration)
+
+
+# the scheduler of the current process
+scheduler = Scheduler()
@@ -0,0 +1,181 @@
+# module imports
+from json import loads
+from os import unlink
+from pathlib import Path
+import sqlite3
+from threading import Lock
+from time import time
+
+# schema of the state database
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS info (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    module TEXT NOT NULL,
+    arch TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    hash TEXT,
+    output TEXT,
+    duration REAL,
+    finished REAL,
+    command TEXT,
+    deps TEXT,
+    PRIMARY KEY (module, arch, kind, source)
+);
+CREATE TABLE IF NOT EXISTS resources (
+    job TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    peak_rss INTEGER,
+    duration REAL,
+    finished REAL
+);
+"""
+
+
+class BuildState:
+    def __init__(self, path: Path):
+        """Incremental build state, stored in a SQLite database.
+
+        Every finished job is committed on its own, so a build that fails or is
+        interrupted keeps the results of the jobs that did finish.
+
+        :param Path path: Path to the database.
+        """
+        self.path = Path(path)
+        self.lock = Lock()
+        # autocommit, every statement is its own transaction
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        # databases from before commands were recorded
+        if "command" not in [row[1] for row in self.db.execute("PRAGMA table_info(jobs)")]:
+            self.db.execute("ALTER TABLE jobs ADD COLUMN command TEXT")
+
+    def get_info(self, key: str, default=None):
+        """Get a value stored for the whole project.
+
+        :param str key: The key to get.
+        :param default: Value to return if the key isn't set.
+        :return: The value.
+        """
+        with self.lock:
+            row = self.db.execute("SELECT value FROM info WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_info(self, key: str, value):
+        """Store a value for the whole project.
+
+        :param str key: The key to set.
+        :param value: The value to store.
+        """
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def get_jobs(self, module: str, kind: str = "compile") -> dict:
+        """Get the recorded jobs of a module.
+
+        :param str module: Name of the module.
+        :param str kind: Kind of job. (compile, link)
+        :return: A dict of (source, arch) to the job's hash, output, duration, finish time, command and dependencies.
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT source, arch, hash, output, duration, finished, command, deps FROM jobs WHERE module = ? AND kind = ?", (module, kind)).fetchall()
+        return {(row[0], row[1]): {"hash": row[2], "output": row[3], "duration": row[4], "finished": row[5], "command": row[6], "deps": row[7]} for row in rows}
+
+    def record_job(self, module: str, arch: str, kind: str, source: str, hash: str, output: str, duration: float, command: str = None, deps: str = None):
+        """Commit the result of a finished job.
+
+        :param str module: Name of the module.
+        :param str arch: Architecture the job was for.
+        :param str kind: Kind of job. (compile, link)
+        :param str source: The job's input.
+        :param str hash: Hash of the job's input.
+        :param str output: Path to the job's output.
+        :param float duration: Time the job took, in seconds.
+        :param str command: Fingerprint of the job's flags, as a JSON list.
+        :param str deps: Hashes of the files the job's input included, as a JSON dict of path to hash.
+        """
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO jobs (module, arch, kind, source, hash, output, duration, finished, command, deps) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (module, arch, kind, source, hash, output, duration, time(), command, deps),
+            )
+
+    def find_output(self, module: str, arch: str, kind: str, source: str, hash: str, command: str, exclude: str = None):
+        """Find the output of a job with the same input and flags, such as one of another variant of a module.
+
+        :param str module: Name of the module. Jobs of its variants ("module@variant") are included.
+        :param str arch: Architecture the job was for.
+        :param str kind: Kind of job. (compile, link)
+        :param str source: The job's input.
+        :param str hash: Hash of the job's input.
+        :param str command: Fingerprint of the job's flags, as a JSON list.
+        :param str exclude: Module, or variant of it, whose jobs are left out.
+        :return: A dict of the output and dependencies of the latest such job, or None if there's none.
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT output, deps FROM jobs WHERE (module = ? OR substr(module, 1, ?) = ?) AND module != ? AND arch = ? AND kind = ? "
+                "AND source = ? AND hash = ? AND command = ? AND output IS NOT NULL ORDER BY finished DESC",
+                (module, len(module) + 1, f"{module}@", exclude or "", arch, kind, source, hash, command),
+            ).fetchone()
+        return None if row is None else {"output": row[0], "deps": row[1]}
+
+    def forget_job(self, module: str, arch: str, kind: str, source: str):
+        """Remove the record of a job, so that it runs again next build.
+
+        :param str module: Name of the module.
+        :param str arch: Architecture the job was for.
+        :param str kind: Kind of job. (compile, link)
+        :param str source: The job's input.
+        """
+        with self.lock:
+            self.db.execute("DELETE FROM jobs WHERE module = ? AND arch = ? AND kind = ? AND source = ?", (module, arch, kind, source))
+
+    def get_resources(self) -> dict:
+        """Get what recorded commands used.
+
+        :return: A dict of job name to the job's kind, and its peak resident memory in megabytes.
+        """
+        with self.lock:
+            rows = self.db.execute("SELECT job, kind, peak_rss FROM resources WHERE peak_rss IS NOT NULL").fetchall()
+        return {row[0]: {"kind": row[1], "peak_rss": row[2] / 2**20} for row in rows}
+
+    def record_resources(self, job: str, kind: str, peak_rss: int, duration: float):
+        """Commit what a finished command used.
+
+        :param str job: Name of the job. (ex: compile/Tweak/arm64/Tweak.x.m)
+        :param str kind: Kind of job. (compile, swift, link, logos, sign, ...)
+        :param int peak_rss: Peak resident memory of the command, in bytes.
+        :param float duration: Time the command took, in seconds.
+        """
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO resources (job, kind, peak_rss, duration, finished) VALUES (?, ?, ?, ?, ?)", (job, kind, peak_rss, duration, time()))
+
+    def import_build_info(self, path: Path):
+        """Import the build number from a legacy build_info.json, and remove it.
+
+        Its hashlist isn't imported, as it doesn't record outputs per architecture.
+
+        :param Path path: Path to build_info.json.
+        """
+        path = Path(path)
+        if not path.exists():
+            return
+        try:
+            with open(path, "r") as file:
+                build_info = loads(file.read())
+            if "build_number" in build_info and self.get_info("build_number") is None:
+                self.set_info("build_number", build_info["build_number"])
+        except ValueError:
+            pass
+        unlink(path)
+
+    def close(self):
+        """Close the database."""
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,111 @@
+# module imports
+from json import dump
+from os import getpid
+from threading import Lock, current_thread, get_ident
+from time import perf_counter_ns
+
+
+class Span:
+    def __init__(self, tracer, name: str, cat: str, args: dict):
+        """A timed region of the build.
+
+        :param Tracer tracer: The tracer to record to.
+        :param str name: Name of the span.
+        :param str cat: Category of the span.
+        :param dict args: Extra values to attach to the span. (module, arch, file, ...)
+        """
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *_):
+        self.tracer.record(self.name, self.cat, self.start, perf_counter_ns(), self.args)
+
+
+class NullSpan:
+    """A span that records nothing, used while tracing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+class Tracer:
+    def __init__(self):
+        """Records build phases as Chrome trace events."""
+        self.enabled = False
+        self.events = []
+        self.lanes = {}
+        self.lock = Lock()
+        self.pid = getpid()
+        self.null = NullSpan()
+
+    def enable(self):
+        """Start recording spans."""
+        self.enabled = True
+
+    def reset(self):
+        """Stop recording spans, and discard recorded events."""
+        with self.lock:
+            self.enabled = False
+            self.events = []
+            self.lanes = {}
+
+    def span(self, name: str, cat: str = "build", **args):
+        """Time a region of the build.
+
+        :param str name: Name of the span.
+        :param str cat: Category of the span.
+        :return: A context manager that records the span on exit.
+        """
+        if not self.enabled:
+            return self.null
+        return Span(self, name, cat, {k: str(v) for k, v in args.items() if v is not None})
+
+    def record(self, name: str, cat: str, start: int, end: int, args: dict):
+        """Record a complete event.
+
+        :param str name: Name of the event.
+        :param str cat: Category of the event.
+        :param int start: Start time, in nanoseconds.
+        :param int end: End time, in nanoseconds.
+        :param dict args: Extra values to attach to the event.
+        """
+        ident = get_ident()
+        with self.lock:
+            # give every thread its own lane
+            if ident not in self.lanes:
+                self.lanes[ident] = len(self.lanes)
+                self.events.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": self.lanes[ident], "args": {"name": current_thread().name}})
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": cat,
+                    "ph": "X",
+                    "ts": start / 1000,
+                    "dur": (end - start) / 1000,
+                    "pid": self.pid,
+                    "tid": self.lanes[ident],
+                    "args": args,
+                }
+            )
+
+    def save(self, path: str):
+        """Write the recorded events to a file.
+
+        :param str path: Path to write the trace to.
+        """
+        with self.lock:
+            with open(path, "w") as file:
+                dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+
+# the tracer used by the current process
+tracer = Tracer()
@@ -1,58 +1,175 @@
 # module imports
+from functools import lru_cache
 from hashlib import md5
-from os import environ, getcwd, mkdir
+from os import WEXITSTATUS, WIFSIGNALED, WTERMSIG, environ, getcwd, link, makedirs, mkdir, read, unlink, wait4, walk
 from pathlib import Path
-from pkg_resources import get_distribution
-from shutil import which
-from subprocess import check_output, getoutput
+from re import split as split_words
+from selectors import DefaultSelector, EVENT_READ
+from shutil import copy2, which
+from subprocess import PIPE, Popen, STDOUT
+import sys
+from time import perf_counter
 from typing import Union
 
+try:
+    from importlib.metadata import version
+except ImportError:
+    # python 3.7
+    from importlib_metadata import version
+
 # local imports
 from . import cfg
+from .logger import write
+from .output import JobOutput
+from .scheduler import scheduler
+
+
+class CommandError(Exception):
+    def __init__(self, cmd: str, returncode: int, output: str = "", log_path: Path = None):
+        """Raised when a command exits with a non-zero status.
+
+        :param str cmd: The command that failed.
+        :param int returncode: The exit status of the command.
+        :param str output: The buffered output of the command.
+        :param Path log_path: Path to the command's full output.
+        """
+        self.cmd = cmd
+        self.returncode = returncode
+        self.output = output
+        self.log_path = log_path
+        super().__init__(f"Command exited with status {returncode}." + (f" (log: {log_path})" if log_path is not None else ""))
+
+
+def wait_process(proc: Popen) -> tuple:
+    """Wait for a process to exit, and get the most memory it used.
+
+    :param Popen proc: The process.
+    :return: The exit status, and the peak resident memory of the process and its children in bytes, or None if it can't be measured.
+    """
+    try:
+        _, status, usage = wait4(proc.pid, 0)
+    except ChildProcessError:
+        return proc.wait(), None
+    # negative for processes killed by a signal, like Popen's returncode
+    proc.returncode = -WTERMSIG(status) if WIFSIGNALED(status) else WEXITSTATUS(status)
+    # macOS reports bytes, and other platforms kilobytes
+    return proc.returncode, usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
 
 
 class CMD:
-    def __init__(self, lock, show_messages: bool = False):
+    def __init__(self, lock, show_messages: bool = False, log_dir: Path = None):
         """Initialize the CMD class."""
         self.lock = lock
         self.show_messages = show_messages
+        self.log_dir = log_dir
 
-    def exec_no_output(self, cmd: str) -> str:
-        """Execute a command.
+    def __flush(self, text: str):
+        """Write text in one go, so that parallel jobs never interleave.
+
+        :param str text: The text to write.
+        """
+        write(text)
+
+    def exec_no_output(self, cmd: str, job: str = None, kind: str = "command") -> str:
+        """Execute a command, and get its output like subprocess.getoutput does.
 
         :param str cmd: The command to execute.
-        :param str cwd: The directory to execute the command in.
-        :param bool show_messages: Whether to show the command output.
-        :return: The output of the command.
+        :param str job: Name of the job, used to record what it used. (ex: logos/Tweak/Tweak.x)
+        :param str kind: Kind of job, used to schedule it. (ex: logos)
+        :return: The combined stdout and stderr of the command, without the trailing newline.
         """
         if self.show_messages:
-            if self.lock is not None:
-                with self.lock:
-                    print(cmd)
-            else:
-                print(cmd)
-        return getoutput(cmd)
-
-    def exec_output(self, cmd: str, cwd: str = None):
-        """Execute a command.
+            self.__flush(f"{cmd}\n")
+        with scheduler.slot(kind, job):
+            start = perf_counter()
+            proc = Popen(cmd, env=environ.copy(), shell=True, stdout=PIPE, stderr=STDOUT, text=True)
+            output = proc.stdout.read()
+            proc.stdout.close()
+            _, peak_rss = wait_process(proc)
+            duration = perf_counter() - start
+        if job is not None and peak_rss is not None:
+            scheduler.record(kind, job, peak_rss, duration)
+        return output[:-1] if output.endswith("\n") else output
+
+    def exec_output(self, cmd: str, cwd: str = None, job: str = None, kind: str = None):
+        """Execute a command, capturing its output as it is produced.
 
         :param str cmd: The command to execute.
         :param str cwd: The directory to execute the command in.
-        :param bool show_messages: Whether to show the command output.
+        :param str job: Name of the job, used for its log file. (ex: compile/Tweak/arm64/Tweak.x.m)
+        :param str kind: Kind of job, used to schedule it. (default: the first part of the job's name)
         """
         if cwd is None:
             cwd = getcwd()
-        if self.show_messages:
-            if self.lock is not None:
-                with self.lock:
-                    print(cmd)
-            else:
-                print(cmd)
-        if self.lock is not None:
-            with self.lock:
-                check_output(cmd, cwd=cwd, env=environ.copy(), shell=True)
-        else:
-            check_output(cmd, cwd=cwd, env=environ.copy(), shell=True)
+        # log file
+        log_path = None
+        if self.log_dir is not None and job is not None:
+            log_path = self.log_dir / f"{job}.log"
+        output = JobOutput(log_path)
+        if kind is None:
+            kind = job.split("/")[0] if job is not None else "command"
+        # run command, once there's room for it
+        with scheduler.slot(kind, job):
+            start = perf_counter()
+            proc = Popen(cmd, cwd=cwd, env=environ.copy(), shell=True, stdout=PIPE, stderr=PIPE)
+            with DefaultSelector() as selector:
+                selector.register(proc.stdout, EVENT_READ, False)
+                selector.register(proc.stderr, EVENT_READ, True)
+                while selector.get_map():
+                    for key, _ in selector.select():
+                        data = read(key.fd, 2**16)
+                        if not data:
+                            selector.unregister(key.fileobj)
+                            continue
+                        output.write(data, key.data)
+            proc.stdout.close()
+            proc.stderr.close()
+            returncode, peak_rss = wait_process(proc)
+            duration = perf_counter() - start
+        output.close()
+        if job is not None and peak_rss is not None:
+            scheduler.record(kind, job, peak_rss, duration)
+        self.__finish(cmd, returncode, output, log_path)
+
+    def report(self, cmd: str, returncode: int, stdout: bytes, stderr: bytes, job: str = None):
+        """Report the result of a command that was executed elsewhere, like it was executed locally.
+
+        :param str cmd: The command that was executed.
+        :param int returncode: The exit status of the command.
+        :param bytes stdout: The command's stdout.
+        :param bytes stderr: The command's stderr.
+        :param str job: Name of the job, used for its log file.
+        """
+        log_path = None
+        if self.log_dir is not None and job is not None:
+            log_path = self.log_dir / f"{job}.log"
+        output = JobOutput(log_path)
+        output.write(stdout, False)
+        output.write(stderr, True)
+        output.close()
+        self.__finish(cmd, returncode, output, log_path)
+
+    def __finish(self, cmd: str, returncode: int, output: JobOutput, log_path: Path):
+        """Flush a finished command's output, and raise if it failed.
+
+        :param str cmd: The command that was executed.
+        :param int returncode: The exit status of the command.
+        :param JobOutput output: The command's captured output.
+        :param Path log_path: Path to the command's full output.
+        """
+        # flush the job's output at once
+        text = f"{cmd}\n" if self.show_messages else ""
+        if returncode != 0:
+            text += output.getvalue()
+        elif self.show_messages:
+            text += output.getvalue()
+        elif output.warnings != []:
+            text += "\n".join(output.warnings) + "\n"
+        if text != "":
+            self.__flush(text)
+        # raise
+        if returncode != 0:
+            raise CommandError(cmd, returncode, output.getvalue(), log_path)
 
 
 def resolve_path(path: str):
@@ -71,6 +188,17 @@ def resolve_path(path: str):
     return p
 
 
+def resolve_relative(path, base: Path) -> Path:
+    """Resolve a path relative to a base directory, rather than the working directory.
+
+    :param str path: The path to resolve.
+    :param Path base: The directory that relative paths are relative to.
+    :return: The resolved path.
+    """
+    path = resolve_path(path)
+    return path if path.is_absolute() else Path(base) / path
+
+
 def chained_dict_get(dictionary, key: str):
     """Get a value nested in a dictionary by its nested path.
 
@@ -154,9 +282,57 @@ def get_hash(filepath: str):
     return md5sum.hexdigest()
 
 
+def read_depfile(path: Path) -> list:
+    """Read the dependencies from a Makefile-style depfile, like the ones clang and swift write.
+
+    :param Path path: Path to the depfile.
+    :return: The dependencies of every target in it.
+    """
+    deps = []
+    with open(path, "r") as file:
+        lines = file.read().replace("\\\n", " ").splitlines()
+    for line in lines:
+        _, separator, rest = line.partition(": ")
+        if separator != "":
+            deps.extend(dep.replace("\\ ", " ").replace("\\#", "#").replace("$$", "$") for dep in split_words(r"(?<!\\)\s+", rest.strip()) if dep != "")
+    # swift lists the same dependencies for each of its outputs
+    return list(dict.fromkeys(deps))
+
+
+def copy_tree(source: Path, destination: Path):
+    """Copy a directory into another one, replacing files that exist in both.
+
+    This is copytree(dirs_exist_ok=True), which needs Python 3.8.
+
+    :param Path source: The directory to copy.
+    :param Path destination: Where to copy it to.
+    """
+    for dir, _, files in walk(source, followlinks=True):
+        target = Path(destination) / Path(dir).relative_to(source)
+        makedirs(target, exist_ok=True)
+        for file in files:
+            copy2(Path(dir) / file, target / file)
+
+
+def link_file(source: Path, destination: Path):
+    """Hard link a file, or copy it if it can't be linked, such as across devices.
+
+    :param Path source: The file to link.
+    :param Path destination: Where to link it to. An existing file is replaced.
+    """
+    try:
+        unlink(destination)
+    except FileNotFoundError:
+        pass
+    try:
+        link(source, destination)
+    except OSError:
+        copy2(source, destination)
+
+
 def setup_luz_dir() -> Path:
     """Setup the tmp directory."""
-    luz_dir = resolve_path(f"{resolve_path(cfg.luzconf_path).parent}/.luz")
+    luz_dir = resolve_path(f"{resolve_path(cfg.state.luzconf_path).parent}/.luz")
     if not luz_dir.exists():
         mkdir(luz_dir)
 
@@ -184,5 +360,6 @@ def get_luz_storage() -> str:
     return storage_dir
 
 
+@lru_cache(maxsize=None)
 def get_version() -> str:
-    return get_distribution(__package__.split(".")[0]).version
+    return version(__package__.split(".")[0])
@@ -0,0 +1,196 @@
+# module imports
+from ctypes import CDLL, get_errno
+from ctypes.util import find_library
+from os import close, fsencode, fsdecode, read, scandir
+from pathlib import Path
+from platform import system
+from select import select
+from struct import calcsize, unpack_from
+from time import monotonic, sleep
+
+# inotify constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+EVENT_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = "iIII"
+
+# directories that never affect the build
+IGNORED_DIRS = [".luz", "packages", "__pycache__", ".git"]
+# editor temporary files
+IGNORED_SUFFIXES = ["~", ".swp", ".swx", ".tmp"]
+
+
+def is_ignored(path: Path) -> bool:
+    """Check whether a path in a watched directory should be ignored.
+
+    :param Path path: The path to check.
+    :return: Whether the path should be ignored.
+    """
+    return path.name in IGNORED_DIRS or path.name.endswith(tuple(IGNORED_SUFFIXES)) or path.name == "4913"
+
+
+def walk_dirs(root: Path):
+    """Walk directories below a root, skipping ignored ones.
+
+    :param Path root: The directory to walk.
+    :return: A generator of directories, including the root.
+    """
+    yield root
+    try:
+        entries = list(scandir(root))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False) and entry.name not in IGNORED_DIRS:
+            yield from walk_dirs(Path(entry.path))
+
+
+class InotifyWatcher:
+    def __init__(self, roots: list):
+        """Watch directories for changes using inotify.
+
+        :param list roots: Directories to watch recursively.
+        """
+        self.libc = CDLL(find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        for root in roots:
+            for path in walk_dirs(root):
+                self.__add(path)
+
+    def __add(self, path: Path):
+        """Add a watch for a directory."""
+        wd = self.libc.inotify_add_watch(self.fd, fsencode(str(path)), EVENT_MASK)
+        if wd >= 0:
+            self.watches[wd] = path
+
+    def poll(self, timeout: float = None) -> set:
+        """Wait for events.
+
+        :param float timeout: Time to wait for, in seconds. (default: forever)
+        :return: Set of changed paths.
+        """
+        changed = set()
+        ready, _, _ = select([self.fd], [], [], timeout)
+        if ready == []:
+            return changed
+        data = read(self.fd, 2**16)
+        offset = 0
+        header_size = calcsize(EVENT_HEADER)
+        while offset < len(data):
+            wd, mask, _, length = unpack_from(EVENT_HEADER, data, offset)
+            name = fsdecode(data[offset + header_size : offset + header_size + length].rstrip(b"\0"))
+            offset += header_size + length
+            if wd not in self.watches:
+                continue
+            path = self.watches[wd] / name if name != "" else self.watches[wd]
+            if mask & IN_DELETE_SELF:
+                del self.watches[wd]
+                continue
+            # watch new directories
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not is_ignored(path):
+                    for new in walk_dirs(path):
+                        self.__add(new)
+                continue
+            if not is_ignored(path):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        """Stop watching."""
+        close(self.fd)
+
+
+class PollingWatcher:
+    def __init__(self, roots: list, interval: float = 0.2):
+        """Watch directories for changes by polling modification times.
+
+        :param list roots: Directories to watch recursively.
+        :param float interval: Time between scans, in seconds.
+        """
+        self.roots = roots
+        self.interval = interval
+        self.mtimes = self.__scan()
+
+    def __scan(self) -> dict:
+        """Get the modification times of every watched file."""
+        mtimes = {}
+        for root in self.roots:
+            for path in walk_dirs(root):
+                try:
+                    for entry in scandir(path):
+                        if entry.is_file(follow_symlinks=False):
+                            mtimes[Path(entry.path)] = entry.stat().st_mtime_ns
+                except OSError:
+                    continue
+        return mtimes
+
+    def poll(self, timeout: float = None) -> set:
+        """Wait for changes.
+
+        :param float timeout: Time to wait for, in seconds. (default: forever)
+        :return: Set of changed paths.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            sleep(self.interval if deadline is None else max(0, min(self.interval, deadline - monotonic())))
+            mtimes = self.__scan()
+            changed = {path for path in set(mtimes) | set(self.mtimes) if mtimes.get(path) != self.mtimes.get(path) and not is_ignored(path)}
+            self.mtimes = mtimes
+            if changed != set() or (deadline is not None and monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        """Stop watching."""
+        pass
+
+
+class Watcher:
+    def __init__(self, roots: list, debounce: float = 0.1):
+        """Watch directories for changes, using inotify where available.
+
+        :param list roots: Directories to watch recursively.
+        :param float debounce: Time to wait for more events after a change, in seconds.
+        """
+        # don't watch directories twice
+        roots = sorted(set(Path(root).absolute() for root in roots), key=lambda x: len(x.parts))
+        self.roots = [root for i, root in enumerate(roots) if not any(other in root.parents for other in roots[:i])]
+        self.debounce = debounce
+        self.backend = None
+        if system() == "Linux":
+            try:
+                self.backend = InotifyWatcher(self.roots)
+            except (OSError, AttributeError):
+                self.backend = None
+        if self.backend is None:
+            self.backend = PollingWatcher(self.roots)
+
+    def wait(self) -> set:
+        """Wait for a burst of changes to finish.
+
+        :return: Set of changed paths.
+        """
+        changed = set()
+        while changed == set():
+            changed = self.backend.poll()
+        # debounce
+        while True:
+            more = self.backend.poll(self.debounce)
+            if more == set():
+                return changed
+            changed |= more
+
+    def close(self):
+        """Stop watching."""
+        self.backend.close()
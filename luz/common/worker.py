@@ -0,0 +1,127 @@
+# module imports
+from os import cpu_count
+from pathlib import Path
+from platform import platform as plat
+import socket
+from subprocess import run
+from tempfile import TemporaryDirectory
+from threading import BoundedSemaphore, Thread
+from zlib import compress
+
+# local imports
+from .logger import log, warn
+from .remote import DEFAULT_PORT, allowed_args, compiler_version, decompress_limited, encode_output, recv_message, send_message
+from .utils import cmd_in_path, get_luz_storage, resolve_path
+
+
+def default_compiler() -> str:
+    """Find the compiler to use, the same way projects do."""
+    if plat().startswith("Linux"):
+        luz_cc = resolve_path(f"{get_luz_storage()}/toolchain/linux/iphone/bin/clang")
+        if luz_cc.exists():
+            return str(luz_cc)
+    return str(cmd_in_path("clang") or "clang")
+
+
+class Worker:
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, cc: str = None, jobs: int = None):
+        """A worker that compiles preprocessed sources for other machines.
+
+        Jobs are run without a shell, with a fixed output path, and only with
+        code generation and target flags. Requests and sources have size limits.
+        Workers don't authenticate clients, so they should only be reachable from
+        trusted machines.
+
+        :param str host: Address to listen on.
+        :param int port: Port to listen on.
+        :param str cc: Compiler to use. (default: the luz toolchain, or clang)
+        :param int jobs: Amount of jobs to run at once. (default: amount of CPUs)
+        """
+        self.host = host
+        self.port = port
+        self.cc = cc or default_compiler()
+        self.version = compiler_version(self.cc)
+        self.jobs = jobs or cpu_count() or 1
+        self.slots = BoundedSemaphore(self.jobs)
+        self.running = True
+
+    def __compile(self, header: dict, payload: bytes) -> tuple:
+        """Compile a job.
+
+        :param dict header: The job's header.
+        :param bytes payload: The compressed, preprocessed source.
+        :return: A tuple of the response's header and payload.
+        """
+        if header.get("version") != self.version:
+            return {"error": f"compiler version mismatch ({self.version})"}, b""
+        args = [str(arg) for arg in header.get("args", [])]
+        if not allowed_args(args):
+            return {"error": "forbidden argument"}, b""
+        try:
+            data = decompress_limited(payload)
+        except ValueError as err:
+            return {"error": str(err)}, b""
+        with self.slots, TemporaryDirectory(prefix="luz-worker-") as tmp:
+            source = Path(tmp) / Path(header["name"]).name
+            out_name = Path(tmp) / "out.o"
+            with open(source, "wb") as file:
+                file.write(data)
+            result = run([self.cc, *args, "-c", str(source), "-o", str(out_name)], cwd=tmp, capture_output=True)
+            obj = b""
+            if result.returncode == 0:
+                with open(out_name, "rb") as file:
+                    obj = compress(file.read(), 1)
+        return {"returncode": result.returncode, "stdout": encode_output(result.stdout), "stderr": encode_output(result.stderr)}, obj
+
+    def __handle(self, conn):
+        """Handle a client's request.
+
+        :param socket conn: The client's connection.
+        """
+        with conn:
+            try:
+                header, payload = recv_message(conn.makefile("rb"))
+                if header.get("command") == "hello":
+                    send_message(conn, {"version": self.version, "slots": self.jobs})
+                elif header.get("command") == "compile":
+                    send_message(conn, *self.__compile(header, payload))
+                else:
+                    send_message(conn, {"error": f'unknown request "{header.get("command")}"'})
+            except (OSError, ValueError, KeyError):
+                return
+
+    def serve(self):
+        """Listen for jobs until stopped."""
+        # what socket.create_server does, which needs python 3.8
+        family = socket.getaddrinfo(self.host, self.port, type=socket.SOCK_STREAM)[0][0]
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.port))
+        self.server.listen()
+        # anyone who can reach the worker can send it jobs
+        if self.host not in ["127.0.0.1", "::1", "localhost"]:
+            warn(f"Listening on {self.host}, which other machines can reach. Workers don't authenticate clients, so only listen on trusted networks.", "🛰️")
+        log(f"Listening on {self.host}:{self.port} with {self.jobs} slots ({self.version})...", "🛰️")
+        try:
+            while self.running:
+                try:
+                    conn, _ = self.server.accept()
+                except OSError:
+                    break
+                Thread(target=self.__handle, args=(conn,), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            log("Worker stopped.", "🛰️")
+
+    def stop(self):
+        """Stop listening."""
+        if not self.running:
+            return
+        self.running = False
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server.close()
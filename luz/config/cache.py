@@ -0,0 +1,187 @@
+"""Cache evaluated luzconf files between runs."""
+
+# module imports
+from functools import lru_cache
+from hashlib import md5
+from importlib.util import MAGIC_NUMBER
+from marshal import dumps as marshal_dumps, loads as marshal_loads
+from os import environ, makedirs, replace, stat
+from pathlib import Path
+from pickle import HIGHEST_PROTOCOL, dumps, loads
+from re import compile as compile_regex
+
+# local imports
+from ..common import cfg
+from ..common.utils import get_luz_storage, get_version
+
+# bump when the cached values change shape
+CACHE_VERSION = 1
+# values read from a luzconf
+CONFIG_NAMES = ["meta", "control", "scripts", "modules", "submodules"]
+# environment variables that toolchain and sdk discovery read
+TOOLCHAIN_VARIABLES = ["PATH", "HOME", "DEVELOPER_DIR", "SDKROOT", "TOOLCHAINS"]
+# environment variables read by python files, as environ["NAME"], environ.get("NAME"), getenv("NAME") or $NAME in a path
+ENVIRONMENT_REFERENCE = compile_regex(rb"""(?:environ\s*(?:\[|\.get\(|\.setdefault\()|getenv\()\s*["']([^"']+)["']|\$(\w+)""")
+
+
+def write_atomic(path: Path, data: bytes):
+    """Write a file so that readers never see it half-written.
+
+    :param Path path: Path to write to.
+    :param bytes data: The data to write.
+    """
+    makedirs(path.parent, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "wb") as file:
+        file.write(data)
+    replace(tmp, path)
+
+
+def mtime(path: str):
+    """Get the modification time of a path, or None if it doesn't exist."""
+    try:
+        return stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=None)
+def components_hash() -> str:
+    """Hash the sources of the config components, as cached values are instances of them.
+
+    This keeps the cache valid across changes to luz itself, such as new options, even
+    when its version doesn't change.
+
+    :return: The hash.
+    """
+    key = md5()
+    for file in sorted((Path(__file__).parent / "components").glob("*.py")):
+        with open(file, "rb") as f:
+            key.update(md5(f.read()).digest())
+    return key.hexdigest()
+
+
+def load_code(source_path: Path, cache_path: Path):
+    """Compile a luzconf, reusing its bytecode from a previous run if the source didn't change.
+
+    :param Path source_path: Path to the luzconf.
+    :param Path cache_path: Path to keep the bytecode at.
+    :return: The code object.
+    """
+    with open(source_path, "rb") as file:
+        source = file.read()
+    header = MAGIC_NUMBER + md5(source).digest()
+    try:
+        with open(cache_path, "rb") as file:
+            data = file.read()
+        if data.startswith(header):
+            return marshal_loads(data[len(header) :])
+    except (OSError, ValueError, EOFError, TypeError):
+        pass
+    code = compile(source, str(source_path), "exec")
+    try:
+        write_atomic(cache_path, header + marshal_dumps(code))
+    except OSError:
+        pass
+    return code
+
+
+def environment_fingerprint(sources: list) -> list:
+    """Get the environment variables that evaluating a luzconf can depend on.
+
+    Only the variables read by toolchain discovery and referenced by the sources
+    are included, as the rest (like OLDPWD or the IDs of CI runs) change between
+    almost every run.
+
+    :param list sources: Contents of the luzconf and its helpers.
+    :return: A sorted list of the variables' names and values.
+    """
+    names = set(TOOLCHAIN_VARIABLES)
+    for source in sources:
+        for match in ENVIRONMENT_REFERENCE.finditer(source):
+            names.add((match.group(1) or match.group(2)).decode(errors="replace"))
+    return sorted((name, environ.get(name)) for name in names)
+
+
+def config_key(path: Path, parent_key: str = "") -> str:
+    """Get the key that the evaluation of a luzconf is valid for.
+
+    This covers every Python file in the project's directory (the luzconf, and
+    helpers it may import), values passed on the command line, the inherited
+    project, what toolchain discovery depends on, and the environment
+    variables that they read.
+
+    :param Path path: The project's directory.
+    :param str parent_key: Key of the project this one inherits from.
+    :return: The key.
+    """
+    key = md5()
+    key.update(f"{CACHE_VERSION}\0{get_version()}\0{components_hash()}\0{parent_key}\0{sorted(cfg.passed.items())!r}\0".encode())
+    storage = get_luz_storage()
+    key.update(f"{mtime(storage / 'sdks')}\0{mtime(storage / 'toolchain')}\0{mtime(storage / 'toolchain/linux/iphone/bin')}\0".encode())
+    sources = []
+    for file in sorted(Path(path).glob("*.py")):
+        with open(file, "rb") as f:
+            sources.append(f.read())
+        key.update(file.name.encode() + b"\0" + md5(sources[-1]).digest())
+    key.update(f"{environment_fingerprint(sources)!r}\0".encode())
+    return key.hexdigest()
+
+
+class ConfigCache:
+    def __init__(self, path: Path, build_dir: Path, module_name: str, parent_key: str = ""):
+        """The cached evaluation of a luzconf.
+
+        :param Path path: The project's directory.
+        :param Path build_dir: The build directory to keep the cache in.
+        :param str module_name: Name of the luzconf's module.
+        :param str parent_key: Key of the project this one inherits from.
+        """
+        self.module_name = module_name
+        self.file = build_dir / "config" / f"{module_name}.pickle"
+        self.pycache = build_dir / "pycache" / f"{module_name}.pyc"
+        self.key = config_key(path, parent_key)
+
+    def load(self) -> dict:
+        """Get the cached values, if they're still valid.
+
+        :return: A dict of luzconf values, or None.
+        """
+        try:
+            with open(self.file, "rb") as file:
+                cached = loads(file.read())
+        except Exception:
+            return None
+        if cached.get("key") != self.key:
+            return None
+        # added or removed files
+        if any(mtime(path) != value for path, value in cached["mtimes"].items()):
+            return None
+        return cached["values"]
+
+    def save(self, values: dict):
+        """Cache the values of an evaluated luzconf.
+
+        Values that refer to the luzconf itself (like functions defined in it) can't be
+        restored without evaluating it, so they aren't cached.
+
+        :param dict values: A dict of luzconf values.
+        """
+        # paths that decide the values
+        paths = set()
+        for module in values.get("modules") or []:
+            paths.update(getattr(module, "source_dirs", []))
+        for script in values.get("scripts") or []:
+            if getattr(script, "path", None) is not None:
+                paths.add(str(script.path))
+        mtimes = {path: mtime(path) for path in paths}
+        try:
+            data = dumps({"key": self.key, "mtimes": mtimes, "values": values}, HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        if self.module_name.encode() in data:
+            return
+        try:
+            write_atomic(self.file, data)
+        except OSError:
+            pass
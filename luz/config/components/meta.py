@@ -1,10 +1,12 @@
 # module imports
 from platform import platform as plat
+from re import fullmatch
 from subprocess import getoutput
 
 # local imports
 from ...common.utils import cmd_in_path, get_luz_storage, resolve_path, setup_luz_dir
 from ...common import cfg
+from ...common.trace import tracer
 
 
 class Meta:
@@ -26,6 +28,25 @@ class Meta:
         install_user: str = "root",
         install_ip: str = "localhost",
         install_port: int = 22,
+        install_sync: bool = False,
+        install_targets: list = None,
+        install_jobs: int = 4,
+        max_build_size: int = 0,
+        max_cache_size: int = 0,
+        workers: list = None,
+        local_jobs: int = -1,
+        lto: str = "",
+        lto_prune_after: int = 168,
+        lto_cache_size: int = 0,
+        single_driver: bool = False,
+        response_file_threshold: int = 32768,
+        max_jobs: int = 0,
+        max_memory: int = 0,
+        max_load: float = 0,
+        min_free_memory: int = 0,
+        job_weights: dict = None,
+        variants: dict = None,
+        overrides: dict = None,
     ):
         """Initialize Meta
 
@@ -46,7 +67,29 @@ class Meta:
             install_user (str, optional): User to install built packages to (default: 'root'),
             install_ip (str, optional): IP to install built packages to (default: 'localhost'),
             install_port (int, optional): Port to install built packages to (default: 22)
+            install_sync (bool, optional): Whether to only copy changed files when installing debug builds, installing with dpkg when the control file or scripts change (default: False)
+            install_targets (list, optional): Devices to install built packages to, as user@ip:port, overriding install_ip (default: [])
+            install_jobs (int, optional): Amount of devices to install to at once (default: 4)
+            max_build_size (int, optional): Size limit of the build directory in megabytes, 0 for no limit (default: 0)
+            max_cache_size (int, optional): Size limit of the shared cache in ~/.luz in megabytes, 0 for no limit (default: 0)
+            workers (list, optional): Addresses of `luz worker` instances to distribute compilation to (ex: ['192.168.1.2:7777'])
+            local_jobs (int, optional): Amount of compile jobs to keep on this machine when using workers, -1 for the amount of CPUs (default: -1)
+            lto (str, optional): Link-time optimization to use for release builds, thin or full (default: none)
+            lto_prune_after (int, optional): Hours after which unused ThinLTO cache entries are removed (default: 168)
+            lto_cache_size (int, optional): Size limit of the ThinLTO cache, in percent of the available disk space, 0 for the linker's default (default: 0)
+            single_driver (bool, optional): Compile every architecture of C, C++ and Objective-C files with one compiler invocation (default: False)
+            response_file_threshold (int, optional): Length of arguments, in characters, above which they're passed to the compiler and linker
+                through a response file, 0 to never use them (default: 32768)
+            max_jobs (int, optional): Amount of job slots, 0 for no limit (default: 0)
+            max_memory (int, optional): Memory that running jobs can use in total, in megabytes, 0 for no limit (default: 0)
+            max_load (float, optional): Load average above which no more jobs are started, 0 for no limit (default: 0)
+            min_free_memory (int, optional): Memory to keep available to the system while starting jobs, in megabytes, 0 for no limit (default: 0)
+            job_weights (dict, optional): Slots each kind of job takes, in addition to the defaults (ex: {'swift': 4, 'link': 2})
+            variants (dict, optional): Variants to build along with the project, by name, as the meta attributes they change (ex: {'rootful': {'rootless': False}, 'release': {'release': True}})
+            overrides (dict, optional): Attributes set after the values passed on the command line, such as the ones a variant changes (default: {})
         """
+        # arguments, used to make the meta of each variant
+        self.arguments = {key: value for key, value in locals().items() if key not in ["self", "overrides"]}
 
         # assign variables
         self.debug = debug
@@ -65,14 +108,36 @@ class Meta:
         self.install_user = install_user
         self.install_ip = install_ip
         self.install_port = install_port
+        self.install_sync = install_sync
+        self.install_targets = list(install_targets or [])
+        self.install_jobs = install_jobs
+        self.max_build_size = max_build_size
+        self.max_cache_size = max_cache_size
+        self.workers = list(workers or [])
+        self.local_jobs = local_jobs
+        self.lto = lto
+        self.lto_prune_after = lto_prune_after
+        self.lto_cache_size = lto_cache_size
+        self.single_driver = single_driver
+        self.response_file_threshold = response_file_threshold
+        self.max_jobs = max_jobs
+        self.max_memory = max_memory
+        self.max_load = max_load
+        self.min_free_memory = min_free_memory
+        self.job_weights = dict(job_weights or {})
+        self.variants = dict(variants or {})
 
         # handle passed config
         if cfg.passed != {}:
             for key, value in cfg.passed.items():
                 self.__setattr__(key, value)
 
-        if cfg.inherit is not None:
-            luz = cfg.inherit
+        # handle overrides, which win over passed config
+        for key, value in (overrides or {}).items():
+            self.__setattr__(key, value)
+
+        if cfg.state.inherit is not None:
+            luz = cfg.state.inherit
 
             # inherit
             for key, value in luz.meta.__dict__.items():
@@ -83,6 +148,34 @@ class Meta:
         if self.debug and self.release:
             self.debug = False
 
+        # check install jobs
+        if self.install_jobs < 1:
+            raise Exception("install_jobs must be at least 1.")
+
+        # check job limits
+        for key in ["max_jobs", "max_memory", "max_load", "min_free_memory"]:
+            if getattr(self, key) < 0:
+                raise Exception(f"{key} can't be negative.")
+        for kind, weight in self.job_weights.items():
+            if not isinstance(weight, int) or weight < 0:
+                raise Exception(f'Weight of "{kind}" jobs must be a number of slots, 0 or more.')
+
+        # check lto
+        if self.lto not in ["", "thin", "full"]:
+            raise Exception(f'Unknown LTO mode "{self.lto}". (thin, full)')
+
+        # check variants
+        for name, overrides in self.variants.items():
+            if fullmatch(r"[\w.-]+", name) is None:
+                raise Exception(f'Variant name "{name}" can only contain letters, numbers, ".", "_" and "-".')
+            for key in overrides:
+                if key not in self.arguments or key == "variants":
+                    raise Exception(f'Unknown meta attribute "{key}" in variant "{name}".')
+
+        # static verification stops here
+        if cfg.state.static:
+            return
+
         # storage
         self.storage = get_luz_storage()
 
@@ -95,73 +188,75 @@ class Meta:
         # root dir
         self.root_dir = self.staging_dir / ("var/jb" if self.rootless else "")
 
-        # attempt to fetch prefix
-        if self.prefix == "" and plat().startswith("Linux"):
-            luz_prefix = resolve_path(f"{self.storage}/toolchain/linux/iphone/bin")
-            if not luz_prefix.exists():
-                raise Exception("Running on Linux, and toolchain is not installed.")
-            self.prefix = luz_prefix
-
-        # ensure prefix exists
-        if self.prefix != "":
-            self.prefix = resolve_path(self.prefix)
-            if not self.prefix.exists():
-                raise Exception("Specified prefix does not exist.")
-
-        # get git
-        self.git = cmd_in_path("git")
-        if self.git is None:
-            raise Exception("Git is needed in order to use Luz.")
-
-        # format cc with prefix
-        if self.prefix != "" and not resolve_path(self.cc).is_relative_to("/"):
-            prefix_path = cmd_in_path(f"{self.prefix}/{self.cc}")
-            if not prefix_path:
-                raise Exception(f'C compiler "{self.cc}" not in prefix path.')
-            self.cc = prefix_path
-
-        # format swift with prefix
-        if self.prefix != "" and not resolve_path(self.swift).is_relative_to("/"):
-            prefix_path = cmd_in_path(f"{self.prefix}/{self.swift}")
-            if not prefix_path:
-                raise Exception(f'Swift compiler "{self.swift}" not in prefix path.')
-            self.swift = prefix_path
-
-        # format ldid with prefix
-        self.ldid = cmd_in_path(f'{(str(self.prefix) + "/") if self.prefix is not None else ""}ldid')
-        if self.ldid is None:
-            # fall back to path
-            self.ldid = cmd_in_path("ldid")
+        # discover toolchain
+        with tracer.span("discover toolchain", "config"):
+            # attempt to fetch prefix
+            if self.prefix == "" and plat().startswith("Linux"):
+                luz_prefix = resolve_path(f"{self.storage}/toolchain/linux/iphone/bin")
+                if not luz_prefix.exists():
+                    raise Exception("Running on Linux, and toolchain is not installed.")
+                self.prefix = luz_prefix
+
+            # ensure prefix exists
+            if self.prefix != "":
+                self.prefix = resolve_path(self.prefix)
+                if not self.prefix.exists():
+                    raise Exception("Specified prefix does not exist.")
+
+            # get git
+            self.git = cmd_in_path("git")
+            if self.git is None:
+                raise Exception("Git is needed in order to use Luz.")
+
+            # format cc with prefix
+            if self.prefix != "" and not resolve_path(self.cc).is_absolute():
+                prefix_path = cmd_in_path(f"{self.prefix}/{self.cc}")
+                if not prefix_path:
+                    raise Exception(f'C compiler "{self.cc}" not in prefix path.')
+                self.cc = prefix_path
+
+            # format swift with prefix
+            if self.prefix != "" and not resolve_path(self.swift).is_absolute():
+                prefix_path = cmd_in_path(f"{self.prefix}/{self.swift}")
+                if not prefix_path:
+                    raise Exception(f'Swift compiler "{self.swift}" not in prefix path.')
+                self.swift = prefix_path
+
+            # format ldid with prefix
+            self.ldid = cmd_in_path(f'{(str(self.prefix) + "/") if self.prefix is not None else ""}ldid')
             if self.ldid is None:
-                raise Exception("Could not find ldid.")
+                # fall back to path
+                self.ldid = cmd_in_path("ldid")
+                if self.ldid is None:
+                    raise Exception("Could not find ldid.")
 
-        # format ldid with prefix
-        self.strip = cmd_in_path(f'{(str(self.prefix) + "/") if self.prefix is not None else ""}strip')
-        if self.strip is None:
-            # fall back to path
-            self.strip = cmd_in_path("strip")
+            # format ldid with prefix
+            self.strip = cmd_in_path(f'{(str(self.prefix) + "/") if self.prefix is not None else ""}strip')
             if self.strip is None:
-                raise Exception("Could not find strip.")
+                # fall back to path
+                self.strip = cmd_in_path("strip")
+                if self.strip is None:
+                    raise Exception("Could not find strip.")
 
-        # format lipo with prefix
-        self.lipo = cmd_in_path(f'{(str(self.prefix) + "/") if self.prefix is not None else ""}lipo')
-        if self.lipo is None:
-            # fall back to path
-            self.lipo = cmd_in_path("lipo")
+            # format lipo with prefix
+            self.lipo = cmd_in_path(f'{(str(self.prefix) + "/") if self.prefix is not None else ""}lipo')
             if self.lipo is None:
-                raise Exception("Could not find lipo.")
+                # fall back to path
+                self.lipo = cmd_in_path("lipo")
+                if self.lipo is None:
+                    raise Exception("Could not find lipo.")
 
-        # attempt to manually find an sdk
-        if self.sdk == "":
-            self.sdk = self.__get_sdk()
-        else:
-            # ensure sdk exists
-            self.sdk = resolve_path(self.sdk)
-            if not self.sdk.exists():
-                if resolve_path(f"{self.storage}/sdks/{self.sdk}").exists():
-                    self.sdk = resolve_path(f"{self.storage}/sdks/{self.sdk}")
-                else:
-                    raise Exception("Specified SDK does not exist.")
+            # attempt to manually find an sdk
+            if self.sdk == "":
+                self.sdk = self.__get_sdk()
+            else:
+                # ensure sdk exists
+                self.sdk = resolve_path(self.sdk)
+                if not self.sdk.exists():
+                    if resolve_path(f"{self.storage}/sdks/{self.sdk}").exists():
+                        self.sdk = resolve_path(f"{self.storage}/sdks/{self.sdk}")
+                    else:
+                        raise Exception("Specified SDK does not exist.")
 
     def __xcrun(self):
         xcrun = cmd_in_path("xcrun")
@@ -1,11 +1,11 @@
 # module imports
-from inspect import stack
-from os import chdir
+from os import walk
 from pathlib import Path
+from sys import _getframe
 from typing import Callable, Union
 
 # local imports
-from ...common.utils import resolve_path
+from ...common.utils import resolve_path, resolve_relative
 
 # map of default values
 default_values = {
@@ -17,6 +17,26 @@ default_values = {
 }
 
 
+def glob_dirs(pattern: str) -> list:
+    """Get the directories that a file pattern's matches depend on.
+
+    :param str pattern: An absolute path, which may contain wildcards.
+    :return: The list of directories.
+    """
+    parts = Path(pattern).parts
+    wildcard = next((i for i, part in enumerate(parts) if any(c in part for c in "*?[")), None)
+    # plain file, or wildcards in the file name only
+    if wildcard is None or wildcard == len(parts) - 1:
+        return [str(Path(pattern).parent)]
+    # wildcards in directories, so every directory below the static prefix
+    root = Path(*parts[:wildcard])
+    dirs = [str(root)]
+    for dir, names, _ in walk(root):
+        names[:] = [name for name in names if not name.startswith(".")]
+        dirs.extend(f"{dir}/{name}" for name in names)
+    return dirs
+
+
 class Module:
     def __init__(
         self,
@@ -29,12 +49,16 @@ class Module:
         swift_flags: list = [],
         linker_flags: list = [],
         optimization: int = 0,
+        lto: str = None,
         warnings: list = ["-Wall"],
         codesign_flags: list = ["-S"],
         filter: dict = {"bundles": ["com.apple.SpringBoard"]},
         public_headers: list = [],
         use_arc: bool = True,
         only_compile_changed: bool = True,
+        unity_build: bool = False,
+        unity_size: int = 8,
+        unity_exclude: list = [],
         bridging_headers: list = [],
         include_dirs: list = [],
         framework_dirs: list = [],
@@ -58,11 +82,15 @@ class Module:
             swift_flags (list, optional): Swift flags
             linker_flags (list, optional): Linker flags
             optimization (int, optional): Optimization level (default: 0)
+            lto (str, optional): Link-time optimization to use for release builds, thin, full or "" for none (defaults to the meta's)
             warnings (list, optional): Warnings (default: -Wall)
             codesign_flags (list, optional): Entitlements flag (default: -S)
             filter (dict, optional): Filter
             use_arc (bool, optional): Use ARC (default: True)
             only_compile_changed (bool, optional): Only compile changed files (default: True)
+            unity_build (bool, optional): Compile C, C++ and Objective-C files in groups, through generated sources that include them (default: False)
+            unity_size (int, optional): Amount of files per group (default: 8)
+            unity_exclude (list, optional): Files to compile on their own in unity builds
             bridging_headers (list, optional): Bridging headers
             include_dirs (list, optional): Include directories
             framework_dirs (list, optional): Framework directories
@@ -78,23 +106,27 @@ class Module:
         self.files = files
         self.install_name = install_name
         self.install_dir = resolve_path(install_dir) if install_dir != "" else None
-        self.c_flags = c_flags
-        self.swift_flags = swift_flags
-        self.linker_flags = linker_flags
+        # lists are copied, as the defaults are shared by every module, and builders add to them
+        self.c_flags = list(c_flags)
+        self.swift_flags = list(swift_flags)
+        self.linker_flags = list(linker_flags)
         self.optimization = optimization
-        self.warnings = warnings
-        self.codesign_flags = codesign_flags
-        self.filter = filter
-        self.public_headers = public_headers
+        self.lto = lto
+        self.warnings = list(warnings)
+        self.codesign_flags = list(codesign_flags)
+        self.filter = dict(filter)
+        self.public_headers = list(public_headers)
         self.use_arc = use_arc
         self.only_compile_changed = only_compile_changed
-        self.bridging_headers = bridging_headers
-        self.include_dirs = include_dirs
-        self.framework_dirs = framework_dirs
-        self.library_dirs = library_dirs
-        self.frameworks = frameworks
-        self.private_frameworks = private_frameworks
-        self.libraries = libraries
+        self.unity_build = unity_build
+        self.unity_size = unity_size
+        self.bridging_headers = list(bridging_headers)
+        self.include_dirs = list(include_dirs)
+        self.framework_dirs = list(framework_dirs)
+        self.library_dirs = list(library_dirs)
+        self.frameworks = list(frameworks)
+        self.private_frameworks = list(private_frameworks)
+        self.libraries = list(libraries)
         self.before_stage = before_stage
         self.after_stage = after_stage
 
@@ -121,15 +153,35 @@ class Module:
         # resolve files
         new_files = []
 
-        # stack
-        ins_stack = stack()[1]
-        path = resolve_path(ins_stack.filename).parent
-        chdir(path)
+        # relative paths are relative to the file that defines the module
+        path = resolve_path(_getframe(1).f_code.co_filename).absolute().parent
         for f in self.files:
             if not str(f).startswith("/"):
                 f = f"{path}/{f}"
             new_files.append(f)
 
+        # unity build exclusions
+        exclude_files = [f if str(f).startswith("/") else f"{path}/{f}" for f in unity_exclude]
+
+        # directories whose contents decide the file list, used to tell when it's out of date
+        self.source_dirs = set()
+        for f in new_files + exclude_files:
+            self.source_dirs.update(glob_dirs(f))
+
+        # resolve unity build exclusions
+        self.unity_exclude = []
+        for f in exclude_files:
+            f = resolve_path(f)
+            self.unity_exclude.extend(f if isinstance(f, list) else [f])
+
+        # check lto
+        if self.lto not in [None, "", "thin", "full"]:
+            raise Exception(f'Unknown LTO mode "{self.lto}". (thin, full)')
+
+        # check unity size
+        if self.unity_size < 1:
+            raise Exception("Unity size must be at least 1")
+
         # b_files
         b_files = [resolve_path(f) for f in new_files]
         self.files = []
@@ -168,10 +220,13 @@ class Module:
                 self.install_dir = resolve_path(f"/Library/Frameworks/{self.name}.framework")
 
         # resolve bridging headers
-        self.bridging_headers = [resolve_path(f) for f in self.bridging_headers]
+        self.bridging_headers = [resolve_relative(f, path) for f in self.bridging_headers]
+
+        # resolve public headers
+        self.public_headers = [resolve_relative(f, path) for f in self.public_headers]
 
         # resources dir
-        self.resources_dir = resolve_path(resources_dir)
+        self.resources_dir = resolve_relative(resources_dir, path)
 
         # see if bridging headers exist
         for f in self.bridging_headers:
@@ -179,19 +234,18 @@ class Module:
                 raise FileNotFoundError(f'Bridging header "{f}" not found')
 
         # resolve include dirs
-        self.include_dirs = [str(resolve_path(f).absolute()) for f in self.include_dirs]
+        self.include_dirs = [str(resolve_relative(f, path)) for f in self.include_dirs]
 
         # resolve framework dirs
-        self.framework_dirs = [str(resolve_path(f).absolute()) for f in self.framework_dirs]
+        self.framework_dirs = [str(resolve_relative(f, path)) for f in self.framework_dirs]
 
         # resolve library dirs
-        self.library_dirs = [str(resolve_path(f).absolute()) for f in self.library_dirs]
+        self.library_dirs = [str(resolve_relative(f, path)) for f in self.library_dirs]
 
-        # add default values
+        # add default values, without repeating ones that were passed
         if self.type in default_values:
             for key in default_values[self.type]:
-                # add keys in array to array
-                self.__dict__[key].extend(default_values[self.type][key])
+                self.__dict__[key] = list(dict.fromkeys([*self.__dict__[key], *default_values[self.type][key]]))
 
     @property
     def abbreviated_name(self):
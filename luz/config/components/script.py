@@ -1,5 +1,5 @@
 # module imports
-from inspect import stack
+from sys import _getframe
 
 # local imports
 from ...common.utils import resolve_path
@@ -17,9 +17,8 @@ class Script:
         # type
         self.type = script_type
 
-        # stack
-        ins_stack = stack()[1]
-        cwd = resolve_path(ins_stack.filename).parent
+        # relative paths are relative to the file that defines the script
+        cwd = resolve_path(_getframe(1).f_code.co_filename).absolute().parent
 
         # path
         if path is not None:
@@ -0,0 +1,225 @@
+"""Keep projects loaded between builds."""
+
+# module imports
+from argparse import Namespace
+from json import dumps, loads
+from os import chdir, environ, getcwd, unlink
+from pathlib import Path
+import socket
+from threading import Lock, Thread
+
+# local imports
+from .cache import config_key
+from .luz import Luz
+from .watch import get_projects
+from ..common import cfg
+from ..common.client import get_socket_path, send_request
+from ..common.logger import error, log, logger
+from ..common.explain import explainer
+from ..common.trace import tracer
+
+
+class SocketWriter:
+    def __init__(self, conn):
+        """A file-like object that sends everything written to it to a client.
+
+        :param socket conn: The client's connection.
+        """
+        self.conn = conn
+        self.lock = Lock()
+        self.connected = True
+
+    def send(self, message: dict):
+        """Send a message to the client.
+
+        :param dict message: The message to send.
+        """
+        if not self.connected:
+            return
+        with self.lock:
+            try:
+                self.conn.sendall((dumps(message) + "\n").encode())
+            except OSError:
+                # the client went away, keep building anyway
+                self.connected = False
+
+    def write(self, text: str) -> int:
+        if text != "":
+            self.send({"type": "output", "data": text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+def fingerprint(luz: Luz) -> dict:
+    """Get what invalidates a loaded project.
+
+    This covers the config cache key of every project (their Python files, and the
+    toolchain and environment variables they depend on), the directories containing
+    module files (so that added or removed files are noticed), and the build state
+    database (so that builds outside of the daemon are noticed).
+
+    :param Luz luz: The loaded project.
+    :return: The fingerprint.
+    """
+    paths = {resolve(luz.build_dir / "state.db"), resolve(luz.build_dir / "state.db-wal")}
+    keys = {}
+    for project in get_projects(luz):
+        keys[str(resolve(project.path))] = config_key(project.path)
+        for module in project.modules:
+            paths.update(resolve(Path(file).parent) for file in module.files)
+    return {**{str(path): mtime(path) for path in paths}, **keys}
+
+
+def resolve(path: Path) -> Path:
+    """Get the absolute version of a path."""
+    return Path(path).absolute()
+
+
+def mtime(path: Path):
+    """Get the modification time of a path, or None if it doesn't exist."""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class Daemon:
+    def __init__(self, socket_path: Path = None):
+        """A daemon that keeps projects, their toolchain and their state loaded between builds.
+
+        :param Path socket_path: Path to listen on. (default: ~/.luz/daemon.sock)
+        """
+        self.socket_path = socket_path or get_socket_path()
+        # luzconf path -> (fingerprint, meta args, working directory, Luz)
+        self.projects = {}
+        # one build at a time, as builds change the environment and working directory of the process
+        self.build_lock = Lock()
+        self.running = True
+
+    def __build(self, args: Namespace, writer: SocketWriter, env: dict = None, cwd: str = None) -> int:
+        """Build a project, reusing its loaded state if it's still valid.
+
+        :param Namespace args: The arguments passed to `luz build`.
+        :param SocketWriter writer: Where to write the build's output.
+        :param dict env: The client's environment variables.
+        :param str cwd: The client's working directory.
+        :return: The exit status.
+        """
+        luzconf_path = f"{args.path}/luzconf.py"
+        cached = self.projects.pop(luzconf_path, None)
+        # builds run in the client's environment and working directory, as they would in its process
+        # (clients from before these were sent build in the daemon's)
+        environment = dict(environ)
+        directory = getcwd()
+        if args.trace is not None:
+            tracer.reset()
+            tracer.enable()
+        if args.explain is not None:
+            explainer.reset()
+            explainer.enable()
+        # clients from before these options were added don't send them
+        logger.configure(getattr(args, "log_format", "text"), getattr(args, "quiet", False), getattr(args, "tty", False), writer)
+        try:
+            if env is not None:
+                environ.clear()
+                environ.update(env)
+            if cwd is not None:
+                chdir(cwd)
+            # projects are loaded again when the environment variables they depend on change, as they decide their toolchain and paths
+            if cached is not None and not args.clean and cached[1] == args.meta and cached[2] == getcwd() and cached[0] == fingerprint(cached[3]):
+                luz = cached[3]
+                luz.install = args.install
+                luz.funny_time = args.funny_time
+                luz.rebuild()
+            else:
+                if cached is not None:
+                    cached[3].close()
+                cfg.passed = {}
+                luz = Luz(luzconf_path, args=args)
+                luz.build_project()
+            self.projects[luzconf_path] = (fingerprint(luz), args.meta, getcwd(), luz)
+            return 0
+        except SystemExit as err:
+            return err.code if isinstance(err.code, int) else 1
+        except Exception as err:
+            error(err)
+            return 1
+        finally:
+            if args.trace is not None:
+                tracer.save(args.trace)
+                tracer.reset()
+            if args.explain is not None:
+                if args.explain:
+                    explainer.save(args.explain)
+                explainer.reset()
+            environ.clear()
+            environ.update(environment)
+            chdir(directory)
+            # write everything before output goes back to the daemon's stdout
+            logger.configure()
+
+    def __handle(self, conn):
+        """Handle a client's request.
+
+        :param socket conn: The client's connection.
+        """
+        writer = SocketWriter(conn)
+        with conn:
+            try:
+                request = loads(conn.makefile("r", encoding="utf-8").readline())
+            except ValueError:
+                return
+            if request.get("command") == "stop":
+                writer.send({"type": "exit", "status": 0})
+                self.stop()
+            elif request.get("command") == "status":
+                writer.send({"type": "output", "data": f"Daemon is running with {len(self.projects)} project{'s' if len(self.projects) != 1 else ''} loaded.\n"})
+                writer.send({"type": "exit", "status": 0})
+            elif request.get("command") == "build":
+                with self.build_lock:
+                    status = self.__build(Namespace(**request["args"]), writer, request.get("env"), request.get("cwd"))
+                writer.send({"type": "exit", "status": status})
+            else:
+                writer.send({"type": "output", "data": f'Unknown request "{request.get("command")}".\n'})
+                writer.send({"type": "exit", "status": 1})
+
+    def serve(self):
+        """Listen for requests until stopped."""
+        if send_request({"command": "status"}, self.socket_path) is not None:
+            raise Exception(f"A daemon is already listening on {self.socket_path}.")
+        if self.socket_path.exists():
+            unlink(self.socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(str(self.socket_path))
+        self.server.listen()
+        log(f"Listening on {self.socket_path}...", "🛰️")
+        try:
+            while self.running:
+                try:
+                    conn, _ = self.server.accept()
+                except OSError:
+                    break
+                Thread(target=self.__handle, args=(conn,), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            log("Daemon stopped.", "🛰️")
+
+    def stop(self):
+        """Stop listening."""
+        if not self.running:
+            return
+        self.running = False
+        try:
+            self.server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.server.close()
+        if self.socket_path.exists():
+            unlink(self.socket_path)
@@ -2,28 +2,46 @@
 
 # module imports
 from argparse import Namespace
-from atexit import register
+from atexit import register, unregister
+from hashlib import md5, sha256
 from concurrent.futures import ThreadPoolExecutor
+from copy import copy, deepcopy
 from importlib.util import module_from_spec, spec_from_file_location
-from json import dump, loads
+from json import dump, dumps, loads
 from multiprocessing import Lock
-from os import makedirs
+from os import makedirs, unlink, walk
+from pathlib import Path
 from pydeb import Control as pControl, Pack
-from shutil import copytree, rmtree
 from sys import modules
 from time import time
+from types import SimpleNamespace
 
 # local imports
 from ..build.assign import assign
+from ..common.deb import hash_staged, replace_control
+from ..common.deploy import Deployer, parse_target
+from ..common.explain import explainer
+from ..common.gc import empty_trash, move_to_trash, remove_stale, trim
 from ..common.logger import error, log, warn
+from ..common.output import setup_log_dir
+from ..common.remote import Distributor
+from ..common.scheduler import scheduler
+from ..common.state import BuildState
+from ..common.trace import tracer
 from ..common.time import Ctime
-from ..common.utils import CMD, resolve_path, setup_luz_dir
+from ..common.utils import CMD, copy_tree, get_luz_storage, resolve_path, setup_luz_dir
 from ..common import cfg
 
+# local imports
+from .cache import CONFIG_NAMES, ConfigCache, load_code
+
 # import components
 from .components.control import Control
 from .components.meta import Meta
 
+# suffixes of files that can be included by any source
+HEADER_SUFFIXES = [".h", ".hh", ".hpp", ".hxx", ".pch", ".inc"]
+
 
 class Luz:
     def __init__(self, file_path: str = "luzconf.py", args: Namespace = None, inherit=None):
@@ -31,9 +49,10 @@ class Luz:
 
         :param str file_path: Path to luz.py
         """
-        cfg.inherit = inherit
-        if inherit is None:
-            cfg.luzconf_path = file_path
+        cfg.state.inherit = inherit
+        # absolute, as commands run in the directory of the project they're for
+        cfg.state.luzconf_path = resolve_path(file_path).absolute() if inherit is None else inherit.luzconf_path
+        self.luzconf_path = cfg.state.luzconf_path
 
         if inherit is None:
             # handle passed meta config
@@ -53,11 +72,11 @@ class Luz:
             raise FileNotFoundError(f"File {file_path} not found")
 
         # path
-        self.path = resolve_path(file_path).parent if inherit is None else inherit.path
+        self.path = resolve_path(file_path).absolute().parent
 
         # nuke build dir if clean
         if args is not None and args.clean:
-            rmtree(resolve_path(file_path).absolute().parent / ".luz", ignore_errors=True)
+            move_to_trash(self.path / ".luz", self.path / ".luz" / "trash")
 
         # funnytime
         self.funny_time = args.funny_time if args is not None else False
@@ -68,20 +87,33 @@ class Luz:
         # install
         self.install = args.install if args is not None else False
 
-        # convert absolute file path to python import path
-        spec = spec_from_file_location("build", resolve_path(file_path).absolute())
-        luz = module_from_spec(spec)
-        modules["build"] = luz
-        spec.loader.exec_module(luz)
-
-        # remove pycache
-        rmtree(resolve_path(f"{self.path}/__pycache__").absolute(), ignore_errors=True)
-
-        # import file
-        self.raw = luz
+        # every luzconf gets its own module, so that projects can be loaded in parallel
+        module_name = f"luzconf_{md5(str(self.path).encode()).hexdigest()}"
+        # cached evaluation of the luzconf
+        self.config_cache = ConfigCache(self.path, resolve_path(self.luzconf_path).absolute().parent / ".luz", module_name, inherit.config_cache.key if inherit is not None else "")
+        values = self.config_cache.load()
+
+        if values is None:
+            # convert absolute file path to python import path
+            with tracer.span("load config", "config", file=file_path):
+                spec = spec_from_file_location(module_name, resolve_path(file_path).absolute())
+                luz = module_from_spec(spec)
+                modules[module_name] = luz
+                exec(load_code(resolve_path(file_path).absolute(), self.config_cache.pycache), luz.__dict__)
+                values = {name: getattr(luz, name) for name in CONFIG_NAMES if hasattr(luz, name)}
+                # default meta
+                if values.get("meta") is None and inherit is None:
+                    values["meta"] = Meta()
+            self.config_cache.save(values)
+            # import file
+            self.raw = luz
+        else:
+            self.raw = SimpleNamespace(**values)
 
         # meta
-        self.meta = getattr(self.raw, "meta", Meta() if inherit is None else inherit.meta)
+        self.meta = getattr(self.raw, "meta", None)
+        if self.meta is None:
+            self.meta = values.get("meta") or inherit.meta
 
         # inherit values
         if inherit is not None:
@@ -102,6 +134,15 @@ class Luz:
         else:
             self.cmd = CMD(lock=self.lock, show_messages=self.meta.messages)
 
+        # workers
+        if inherit is not None:
+            self.distributor = inherit.distributor
+        elif self.meta.workers != []:
+            with tracer.span("connect to workers", "config"):
+                self.distributor = Distributor(self.meta.workers, self.meta.cc, self.meta.local_jobs if self.meta.local_jobs >= 0 else None)
+        else:
+            self.distributor = None
+
         # control
         self.control = getattr(self.raw, "control", None if inherit is None else inherit.control)
 
@@ -152,39 +193,58 @@ class Luz:
         # luz dir
         self.build_dir = setup_luz_dir() if inherit is None else inherit.build_dir
 
-        # initialize atexit
-        register(self.pool.shutdown)
+        # variant this project builds, and the directory of its outputs
+        self.variant = None
+        self.output_dir = self.build_dir
+
+        # project this project inherits from, if it's a submodule that inherits
+        self.parent = inherit
+
+        # hashes of sources, and of the sources of logos output, shared by every variant during a build
+        self.file_hashes = {}
+        self.logos_hashes = {}
+
+        # log dir
+        if inherit is None:
+            self.cmd.log_dir = setup_log_dir(self.build_dir, self.now)
+            # finish deleting previously cleaned files
+            empty_trash(self.build_dir / "trash")
+
+        # initialize atexit, once for every pool
+        if inherit is None:
+            register(self.pool.shutdown)
 
-        # hashlist
+        # build state
         if inherit is not None:
-            self.build_info = getattr(inherit, "build_info")
+            self.state = inherit.state
         else:
-            hash_file = resolve_path(f"{self.build_dir}/build_info.json")
-            # check if hashlist exists
-            if hash_file.exists():
-                with open(hash_file, "r") as file:
-                    self.build_info = loads(file.read())
-            else:
-                self.build_info = {}
+            self.state = BuildState(self.build_dir / "state.db")
+            self.state.import_build_info(self.build_dir / "build_info.json")
+
+        # version without the build number
+        self.version = self.control.version if self.control is not None else None
 
         if self.meta.debug and self.meta.pack:
             # get build number
             if inherit is None:
-                if self.build_info != {} and "build_number" in self.build_info:
-                    self.build_info["build_number"] += 1
-                    self.build_number = self.build_info["build_number"]
-                else:
-                    self.build_info["build_number"] = 1
-                    self.build_number = 1
-                # update control with build number
-                self.control.version = f"{self.control.version}-{self.build_number}+debug"
-                self.control.raw = self.control.__str__()
+                self.__bump_build_number()
             else:
                 self.build_number = getattr(inherit, "build_number")
 
+        # module builders, kept between builds
+        self.builders = None
+
         # assign submodules
-        submodules = self.pool.map(self.__assign_submodule, self.submodules)
-        self.submodules = submodules
+        # submodules are loaded on their own threads, as the build pool may be busy loading their parents
+        with tracer.span("assign submodules", "config", file=file_path):
+            with ThreadPoolExecutor(max_workers=max(len(self.submodules), 1), thread_name_prefix="luz-load") as loader:
+                self.submodules = list(loader.map(self.__assign_submodule, self.submodules))
+
+        # variants, built along with the project
+        self.variants = []
+        if inherit is None:
+            with tracer.span("assign variants", "config", file=file_path):
+                self.variants = [self.__variant(name, overrides) for name, overrides in self.meta.variants.items()]
 
     def __assign_passed_value(self, value):
         """Assign a key from the passed config."""
@@ -192,6 +252,8 @@ class Luz:
             return value.lower() == "true"
         elif value.isdigit():
             return int(value)
+        elif value.replace(".", "", 1).isdigit():
+            return float(value)
         elif value.startswith("[") and value.endswith("]"):
             arr = []
             for v in value[1:-1].split(","):
@@ -210,29 +272,159 @@ class Luz:
 
         return Luz(f"{submodule.path}/luzconf.py", inherit=self if submodule.inherit else None)
 
-    def update_hashlist(self, keys):
-        """Update the hashlist with a list of keys."""
-        self.build_info["hashlist"].update(keys)
+    def __variant(self, name: str, overrides: dict, parent=None):
+        """Make a copy of the project that builds one of its variants.
+
+        The copy shares the project's state, pool and logos output, but has its own meta,
+        modules, objects and staging directory.
+
+        :param str name: Name of the variant.
+        :param dict overrides: Meta attributes that the variant changes.
+        :param Luz parent: The variant of the project this project inherits from, for submodules.
+        :return: The copy.
+        """
+        variant = copy(self)
+        variant.variant = name
+        variant.output_dir = self.build_dir / "variants" / name
+        if self.parent is not None:
+            variant.meta = copy(parent.meta)
+            variant.control = parent.control
+        else:
+            # the meta is made again, so that the toolchain and sdk are found for the variant's values
+            inherit, luzconf_path = cfg.state.inherit, cfg.state.luzconf_path
+            cfg.state.inherit, cfg.state.luzconf_path = None, self.luzconf_path
+            try:
+                variant.meta = Meta(**{**self.meta.arguments, **overrides, "variants": {}}, overrides=overrides)
+            finally:
+                cfg.state.inherit, cfg.state.luzconf_path = inherit, luzconf_path
+            variant.meta.staging_dir = variant.output_dir / "_"
+            variant.meta.root_dir = variant.meta.staging_dir / ("var/jb" if variant.meta.rootless else "")
+            variant.control = copy(self.control)
+            if variant.control is None:
+                variant.meta.pack = False
+        # modules are changed by their builders
+        variant.modules = deepcopy(self.modules)
+        variant.builders = None
+        variant.variants = []
+        variant.submodules = [submodule.__variant(name, overrides, variant) for submodule in self.submodules]
+        return variant
+
+    def __sync_variant(self, project):
+        """Update a variant with the build number and time of the build.
+
+        :param Luz project: The project the variant is of.
+        """
+        self.now = project.now
+        if self.control is None:
+            return
+        if self.meta.debug and self.meta.pack:
+            self.control.version = f"{project.version}-{project.build_number}+debug" if hasattr(project, "build_number") else f"{project.version}+debug"
+        else:
+            self.control.version = project.version
+        self.control.raw = self.control.__str__()
+
+    def __bump_build_number(self):
+        """Increment the build number, and add it to the control's version.
+
+        The new build number is only stored once the build succeeds.
+        """
+        self.build_number = int(self.state.get_info("build_number", 0)) + 1
+        # update control with build number
+        self.control.version = f"{self.version}-{self.build_number}+debug"
+        self.control.raw = self.control.__str__()
+
+    def __owns(self, path) -> bool:
+        """Check whether a path belongs to this project, rather than one of its submodules.
+
+        :param Path path: The path to check.
+        :return: Whether the path belongs to this project.
+        """
+        return self.path in [path, *path.parents] and not any(submodule.path in [path, *path.parents] for submodule in self.submodules)
+
+    def __projects(self) -> list:
+        """Get this project and its submodules, recursively.
+
+        :return: The list of projects.
+        """
+        projects = [self]
+        for submodule in self.submodules:
+            projects.extend(submodule.__projects())
+        return projects
+
+    def __collect_garbage(self):
+        """Remove outputs that the current build no longer produces, such as objects of deleted sources."""
+        # projects sharing an output dir
+        groups = {}
+        for project in self.__projects():
+            groups.setdefault(project.output_dir, []).append(project)
+        for output_dir, projects in groups.items():
+            outputs = set()
+            staged = set()
+            for project in projects:
+                for builder in project.builders or []:
+                    outputs.update(builder.outputs())
+                    staged.update(builder.staged())
+            # logos output is shared by variants, and collected with the project's outputs
+            remove_stale([output_dir / "obj", output_dir / "dylib", output_dir / "bin", *([output_dir / "logos-processed"] if self.variant is None else [])], outputs)
+            if output_dir != self.output_dir or not self.meta.pack:
+                continue
+            # layouts
+            for project in [self, *self.submodules]:
+                layout_path = project.path / "layout"
+                for dir, _, files in walk(layout_path):
+                    staged.update(self.meta.root_dir / Path(dir).relative_to(layout_path) / file for file in files)
+            # control and scripts
+            staged.add(self.meta.staging_dir / "DEBIAN" / "control")
+            staged.update(self.meta.staging_dir / "DEBIAN" / script.type for script in self.scripts)
+            # only remove what was staged by luz, as stage hooks can add their own files
+            staged = {str(path) for path in staged}
+            for path in set(loads(self.state.get_info(self.__info_key("staged"), "[]"))) - staged:
+                try:
+                    unlink(path)
+                except OSError:
+                    pass
+            self.state.set_info(self.__info_key("staged"), dumps(sorted(staged)))
+
+    def __info_key(self, key: str) -> str:
+        """Get the key a value of the project is stored with, as variants share the project's state.
+
+        :param str key: The key.
+        :return: The key for the project's variant.
+        """
+        return key if self.variant is None else f"variants/{self.variant}/{key}"
+
+    def __limit_size(self):
+        """Keep the build directory and the shared cache below their size limits."""
+        if self.meta.max_build_size > 0:
+            evictable = [self.build_dir / "logs", self.build_dir / "obj", self.build_dir / "logos-processed", self.build_dir / "lto", self.build_dir / "rsp"]
+            for variant in self.variants:
+                evictable.extend([variant.output_dir / "obj", variant.output_dir / "lto", variant.output_dir / "rsp"])
+            trim(self.build_dir, self.meta.max_build_size * 1024 * 1024, evictable, exclude=[self.build_dir / "trash"])
+        if self.meta.max_cache_size > 0:
+            cache_dir = get_luz_storage() / "cache"
+            trim(cache_dir, self.meta.max_cache_size * 1024 * 1024, [cache_dir])
 
     def __pack(self):
-        """Package the project."""
+        """Package the project, reusing the last package if its contents didn't change."""
         # deb file name
         deb_file_name = f"{self.control.id}_{self.control.version}_{self.control.architecture}.deb"
+        # variants are packed to their own directory
+        packages = "packages" if self.variant is None else f"packages/{self.variant}"
+        package_path = self.path.absolute() / packages / deb_file_name
         # log
         if self.path.absolute() == self.path.cwd().absolute():
             dir_to_log = "."
         else:
             dir_to_log = str(self.path.absolute()).replace(str(self.path.cwd().absolute()), ".")
-        log(f"Packing to '{dir_to_log}/packages/{deb_file_name}'...", "📦")
         # layout
-        layout_path = resolve_path("layout")
+        layout_path = resolve_path(f"{self.path}/layout")
         if layout_path.exists():
-            copytree(layout_path, self.meta.root_dir, dirs_exist_ok=True)
+            copy_tree(layout_path, self.meta.root_dir)
         # submodule layout paths
         for submodule in self.submodules:
             layout_path = resolve_path(f"{submodule.path}/layout")
             if layout_path.exists():
-                copytree(layout_path, self.meta.root_dir, dirs_exist_ok=True)
+                copy_tree(layout_path, self.meta.root_dir)
         # makedirs
         makedirs(f"{self.meta.staging_dir}/DEBIAN", exist_ok=True)
         # add control
@@ -242,17 +434,68 @@ class Luz:
         for script in self.scripts:
             with open(f"{self.meta.staging_dir}/DEBIAN/{script.type}", "w") as file:
                 file.write(script.content)
+        # fingerprint of the package, which doesn't change with the build number
+        hashes = hash_staged(self.meta.staging_dir)
+        fingerprint = md5(f"{self.meta.compression}\0{dumps(hashes, sort_keys=True)}".encode()).hexdigest()
+        previous = loads(self.state.get_info(self.__info_key("package"), "{}"))
+        previous_path = Path(previous.get("path", ""))
+        unchanged = previous.get("fingerprint") == fingerprint and previous_path.is_file()
         # pack
-        Pack(
-            self.meta.staging_dir,
-            algorithm=self.meta.compression,
-            outdir=f"{self.path}/packages/",
-        )
-
-    def __build(self):
-        """Build the project."""
-        # assign modules
-        mod_map = [assign(m, self) for m in self.modules]
+        makedirs(package_path.parent, exist_ok=True)
+        with tracer.span("pack", "pack", file=deb_file_name):
+            if unchanged and previous_path == package_path:
+                explainer.record("pack", self.control.id, False, "its files and control didn't change")
+                log(f"'{dir_to_log}/{packages}/{deb_file_name}' is up to date.", "📦")
+            elif unchanged and replace_control(previous_path, package_path, self.meta.staging_dir / "DEBIAN"):
+                explainer.record("pack", self.control.id, True, "only its version changed, so only the control was updated", previous=previous_path.name)
+                log(f"Updated the control of '{dir_to_log}/{packages}/{previous_path.name}' to '{deb_file_name}'.", "📦")
+            else:
+                explainer.record("pack", self.control.id, True, "its files or control changed" if previous != {} else "it wasn't packed yet")
+                log(f"Packing to '{dir_to_log}/{packages}/{deb_file_name}'...", "📦")
+                Pack(
+                    self.meta.staging_dir,
+                    algorithm=self.meta.compression,
+                    outdir=f"{self.path}/{packages}/",
+                )
+        self.state.set_info(self.__info_key("package"), dumps({"fingerprint": fingerprint, "path": str(package_path)}))
+        self.__write_artifacts(package_path, hashes)
+
+    def __write_artifacts(self, package_path: Path, hashes: dict):
+        """Write a manifest of what the build produced, with their hashes.
+
+        :param Path package_path: Path to the package.
+        :param dict hashes: Hashes of the package's files.
+        """
+        package_hash = sha256()
+        with open(package_path, "rb") as file:
+            for chunk in iter(lambda: file.read(2**20), b""):
+                package_hash.update(chunk)
+        artifacts = {
+            "package": {"path": str(package_path), "version": self.control.version, "size": package_path.stat().st_size, "sha256": package_hash.hexdigest()},
+            "files": {name: {"md5": value} for name, value in sorted(hashes.items()) if not name.startswith("DEBIAN/")},
+        }
+        with open(self.output_dir / "artifacts.json", "w") as file:
+            dump(artifacts, file, indent=4)
+
+    def __build(self, changed: set = None):
+        """Build the project.
+
+        :param set changed: Paths that changed since the last build.
+        """
+        if self.builders is None:
+            # assign modules
+            self.builders = [assign(m, self) for m in self.modules]
+            mod_map = self.builders
+        else:
+            # headers can affect any file in the project, and files are compiled again if one they include changed
+            headers = [path for path in changed or [] if path.suffix in HEADER_SUFFIXES and self.__owns(path)]
+            mod_map = []
+            for builder in self.builders:
+                if changed is None or headers != [] or not changed.isdisjoint(builder.module.files):
+                    builder.refresh()
+                    mod_map.append(builder)
+                else:
+                    explainer.record("compile", builder.module.name, False, "none of its files changed", builder.module.abbreviated_name, module=builder.module.name)
 
         # build modules
         results = self.pool.map(lambda m: m.compile(), mod_map)
@@ -261,40 +504,129 @@ class Luz:
                 return result
 
         # submodule results
-        submodule_results = self.pool.map(lambda s: s.__build(), self.submodules)
+        submodule_results = self.pool.map(lambda s: s.__build(changed), self.submodules)
         for result in submodule_results:
             if result is not None:
                 return result
 
-    def build_project(self):
-        """Build the project."""
+    def close(self):
+        """Release what the project keeps open, when it's replaced by a reloaded one.
+
+        This shuts down its pool, and closes its build state and workers, along with
+        those of its submodules that don't inherit them.
+        """
+        for submodule in self.submodules:
+            submodule.close()
+        if self.parent is not None:
+            return
+        unregister(self.pool.shutdown)
+        self.pool.shutdown()
+        self.state.close()
+        if self.distributor is not None:
+            self.distributor.close()
+
+    def rebuild(self, changed: set = None):
+        """Build the project again, reusing the configuration and state loaded in memory.
+
+        :param set changed: Paths that changed since the last build. Only modules affected by them are rebuilt. (default: check every module)
+        """
+        self.now = time()
+        self.cmd.log_dir = setup_log_dir(self.build_dir, self.now)
+        if self.distributor is not None:
+            self.distributor.reconnect()
+        if self.meta.debug and self.meta.pack:
+            self.__bump_build_number()
+        self.build_project(changed)
+
+    def build_project(self, changed: set = None):
+        """Build the project.
+
+        :param set changed: Paths that changed since the last build. (default: check every module)
+        """
+        # limit the jobs that run at once, with what they used in earlier builds
+        meta = self.meta
+        scheduler.configure(meta.max_jobs, meta.max_memory, meta.max_load, meta.min_free_memory, meta.job_weights, self.state)
+
+        # sources are hashed, and processed with logos, once for every variant
+        file_hashes = {}
+        logos_hashes = {}
+        for project in [*self.__projects(), *[x for variant in self.variants for x in variant.__projects()]]:
+            project.file_hashes = file_hashes
+            project.logos_hashes = logos_hashes
+
         # assign modules
-        build_results = self.__build()
+        build_results = self.__build(changed)
 
         if build_results is not None:
             raise Exception(build_results)
 
-        if self.meta.pack:
-            self.__pack()
+        # variants are built after the project, so that they can reuse its objects
+        for variant in self.variants:
+            variant.__sync_variant(self)
+            log(f'Building variant "{variant.variant}"...')
+            with tracer.span("build variant", "build", file=variant.variant):
+                build_results = variant.__build(changed)
+            if build_results is not None:
+                raise Exception(f'Failed to build variant "{variant.variant}". {build_results}')
+
+        with tracer.span("collect garbage", "gc"):
+            for project in [self, *self.variants]:
+                project.__collect_garbage()
+
+        for project in [self, *self.variants]:
+            if project.meta.pack:
+                project.__pack()
+            else:
+                explainer.record("pack", project.control.id if project.control is not None else project.path.name, False, "pack is disabled")
+
+        with tracer.span("limit size", "gc"):
+            self.__limit_size()
 
-        with open(resolve_path(f"{self.build_dir}/build_info.json"), "w") as file:
-            dump(self.build_info, file)
+        if self.meta.debug and self.meta.pack:
+            self.state.set_info("build_number", self.build_number)
 
         t = time() - self.now
         log(f"Build completed in {round(t, 2)} seconds.{f' ({Ctime(t).get_random()})' if self.funny_time else ''}")
         if self.install:
-            if self.meta.platform is not "iphoneos":
+            if self.meta.platform != "iphoneos":
                 error("Installation is currently not supported for platforms other than iOS.")
                 exit(1)
-            # deb file name
-            deb_file_name = f"{self.control.id}_{self.control.version}_{self.control.architecture}.deb"
-            # log
-            log(f"Installing...")
-            # full path to package
-            package_path = self.path.absolute() / "packages" / deb_file_name
-            # copy package
-            self.cmd.exec_no_output(f"scp -P {self.meta.install_port} {package_path} {self.meta.install_user}@{self.meta.install_ip}:/tmp/luz.deb")
-            # ssh in and install package
-            self.cmd.exec_output(f"ssh {self.meta.install_user}@{self.meta.install_ip} -p {self.meta.install_port} 'dpkg -I /tmp/luz.deb && rm -rf /tmp/luz.deb'")
-            # log
-            log(f"Installed!")
+            self.__install()
+
+    def __install(self):
+        """Install the package to every install target at once."""
+        # deb file name
+        deb_file_name = f"{self.control.id}_{self.control.version}_{self.control.architecture}.deb"
+        # full path to package
+        package_path = self.path.absolute() / "packages" / deb_file_name
+        # targets
+        targets = self.meta.install_targets if self.meta.install_targets != [] else [f"{self.meta.install_user}@{self.meta.install_ip}:{self.meta.install_port}"]
+        deployers = [Deployer(*parse_target(target, self.meta.install_user, self.meta.install_port), self.cmd, self.state) for target in targets]
+        # log
+        log(f"Installing to {len(deployers)} devices..." if len(deployers) > 1 else "Installing...")
+
+        def deploy(deployer: Deployer) -> tuple:
+            start = time()
+            try:
+                with tracer.span("install", "install", file=deb_file_name, target=str(deployer)):
+                    # only dev builds are synced, release builds are always installed with dpkg
+                    result = deployer.deploy(package_path, self.meta.staging_dir, sync=self.meta.install_sync and self.meta.debug)
+                return True, result, time() - start
+            except Exception as e:
+                return False, str(e), time() - start
+
+        # a failing device doesn't stop the others
+        with ThreadPoolExecutor(max_workers=self.meta.install_jobs) as pool:
+            results = list(pool.map(deploy, deployers))
+        if len(deployers) == 1:
+            if not results[0][0]:
+                raise Exception(f"Failed to install to {deployers[0]}. {results[0][1]}")
+            log(results[0][1])
+            return
+        # summary
+        for deployer, (success, result, duration) in zip(deployers, results):
+            (log if success else error)(f"{deployer}: {result} ({round(duration, 2)} seconds)", "✅" if success else "❌")
+        failed = [str(deployer) for deployer, result in zip(deployers, results) if not result[0]]
+        if failed != []:
+            raise Exception(f"Failed to install to {len(failed)} of {len(deployers)} devices. ({', '.join(failed)})")
+        log(f"Installed to {len(deployers)} devices!")
@@ -1,64 +1,382 @@
 """Verify the luzconf config."""
 
 # module imports
-from argparse import Namespace
+import ast
+from concurrent.futures import ThreadPoolExecutor
+from difflib import get_close_matches
+from hashlib import md5
+from importlib.util import module_from_spec, spec_from_file_location
 from inspect import Parameter, signature
+from os import cpu_count
+from pathlib import Path
+import sys
+from traceback import extract_tb
+from typing import Union
 
 # local imports
-from . import Luz, Meta, Module, Submodule
+from ..common import cfg
 from ..common.logger import error, log, warn
+from ..common.utils import resolve_path
+from .components.control import Control
+from .components.meta import Meta
+from .components.module import Module, default_values
+from .components.script import Script
+from .components.submodule import Submodule
 
+# components that can be used in a luzconf
+COMPONENTS = {"Control": Control, "Meta": Meta, "Module": Module, "Script": Script, "Submodule": Submodule}
+# modules that the components can be imported from
+COMPONENT_MODULES = ["luz", "luz.config"]
+# valid types of maintainer scripts
+SCRIPT_TYPES = ["preinst", "postinst", "prerm", "postrm"]
 
-def get_default_args(func):
-    sig = signature(func)
-    return {k: v.default for k, v in sig.parameters.items() if v.default is not Parameter.empty}
 
+def literal_type(node: ast.AST):
+    """Get the type of a literal argument.
 
-class Verify(Luz):
-    def __init__(self, file_path: str = "luzconf.py", args: Namespace = None):
-        """Verify the Luz.py config.
+    :param ast.AST node: The argument.
+    :return: The type of the argument, or None if it isn't a literal.
+    """
+    if isinstance(node, ast.Constant):
+        return type(node.value)
+    # python 3.7 parses literals to these instead
+    elif sys.version_info < (3, 8) and isinstance(node, (ast.Num, ast.Str, ast.Bytes, ast.NameConstant)):
+        return type(ast.literal_eval(node))
+    elif isinstance(node, (ast.List, ast.ListComp)):
+        return list
+    elif isinstance(node, (ast.Dict, ast.DictComp)):
+        return dict
+    elif isinstance(node, ast.Tuple):
+        return tuple
+    elif isinstance(node, ast.JoinedStr):
+        return str
+    return None
+
+
+def dotted_name(node: ast.AST) -> str:
+    """Get the dotted name an expression refers to, such as luz.config.
+
+    :param ast.AST node: The expression.
+    :return: The name, or None if it isn't a name or an attribute of one.
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    elif isinstance(node, ast.Attribute):
+        parent = dotted_name(node.value)
+        return f"{parent}.{node.attr}" if parent is not None else None
+    return None
+
+
+def accepts(parameter: Parameter, value_type: type) -> bool:
+    """Check whether a parameter accepts a literal of a type.
+
+    :param Parameter parameter: The parameter.
+    :param type value_type: The type of the literal.
+    :return: Whether the literal is accepted. Parameters without an annotation accept anything.
+    """
+
+    def check(annotation) -> bool:
+        if getattr(annotation, "__origin__", None) is Union:
+            return any(check(x) for x in annotation.__args__)
+        # other typing constructs, such as Callable, aren't checked
+        if not isinstance(annotation, type):
+            return True
+        # paths can be passed as strings
+        if annotation is Path:
+            return value_type in [str, Path]
+        if annotation is float:
+            return value_type in [int, float]
+        # bool is a subclass of int
+        if annotation is int and value_type is bool:
+            return False
+        return issubclass(value_type, annotation)
+
+    if value_type is type(None):
+        return parameter.default is None
+    return parameter.annotation is Parameter.empty or check(parameter.annotation)
+
+
+class Verify:
+    def __init__(self, file_path: str = "luzconf.py"):
+        """Verify a luzconf and those of its submodules.
+
+        The luzconf is evaluated without discovering the toolchain, creating the build directory or
+        bumping the build number, so it can be verified on any machine, and many projects at once.
 
         :param str file_path: The path to the file to verify.
-        :param Namespace args: The arguments passed to the program.
         """
-        warnings = 0
-        errors = 0
+        self.file_path = resolve_path(file_path).absolute()
+        # messages, as tuples of their level and text
+        self.messages = []
+        self.warnings = 0
+        self.errors = 0
+        self.__verify(self.file_path, inherit=False, seen=set())
+
+    def report(self):
+        """Log the messages of the verification."""
+        for level, message in self.messages:
+            if level == "error":
+                error(message)
+            elif level == "warn":
+                warn(message)
+            else:
+                log(message)
+
+    def __display(self, path: Path, line: int = None) -> str:
+        """Get the location of a message, relative to the working directory if it's in it.
+
+        :param Path path: Path to the luzconf.
+        :param int line: Line of the luzconf.
+        :return: The location.
+        """
+        try:
+            path = path.relative_to(Path.cwd())
+        except ValueError:
+            pass
+        return f"{path}:{line}" if line is not None else str(path)
+
+    def __error(self, path: Path, message: str, line: int = None):
+        self.errors += 1
+        self.messages.append(("error", f"{self.__display(path, line)}: {message}"))
+
+    def __warn(self, path: Path, message: str, line: int = None, level: str = "warn"):
+        self.warnings += 1
+        self.messages.append((level, f"{self.__display(path, line)}: {message}"))
+
+    def __verify(self, path: Path, inherit: bool, seen: set):
+        """Verify a luzconf, then the luzconfs of its submodules.
+
+        :param Path path: Path to the luzconf.
+        :param bool inherit: Whether the project inherits from its parent.
+        :param set seen: Luzconfs that were already verified.
+        """
+        if path in seen:
+            return
+        seen.add(path)
+        try:
+            with open(path, "r") as file:
+                source = file.read()
+        except OSError as err:
+            self.__error(path, f"Failed to read the file. {err}")
+            return
+        try:
+            tree = ast.parse(source, str(path))
+        except SyntaxError as err:
+            self.__error(path, f"Failed to parse the file. {err.msg}", err.lineno)
+            return
+
+        # arguments of each component
+        errors = self.errors
+        self.__check_calls(path, tree, inherit)
+        # running the file would fail on the same errors
+        if self.errors != errors:
+            return
+
+        # values
+        values = self.__evaluate(path, tree)
+        if values is None:
+            return
+        self.__check_values(path, values, inherit)
+
+        # submodules
+        for submodule in values["submodules"]:
+            if not isinstance(submodule, Submodule):
+                continue
+            submodule_path = str(submodule.path)
+            if submodule_path.startswith("./"):
+                submodule_path = submodule_path[2:]
+            if not submodule_path.startswith("/"):
+                submodule_path = f"{path.parent}/{submodule_path}"
+            luzconf_path = resolve_path(f"{submodule_path}/luzconf.py").absolute()
+            if not luzconf_path.exists():
+                self.__error(path, f"Submodule '{submodule.name}' has no luzconf.py.")
+                continue
+            self.__verify(luzconf_path, submodule.inherit, seen)
+
+    def __check_calls(self, path: Path, tree: ast.AST, inherit: bool):
+        """Check the arguments passed to components against their signatures.
+
+        :param Path path: Path to the luzconf.
+        :param ast.AST tree: The parsed luzconf.
+        :param bool inherit: Whether the project inherits from its parent.
+        """
+        # names the components are imported as
+        names = {}
+        modules = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module in COMPONENT_MODULES:
+                for alias in node.names:
+                    if alias.name in COMPONENTS:
+                        names[alias.asname or alias.name] = alias.name
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.name in COMPONENT_MODULES:
+                        modules.add(alias.asname or alias.name)
+
+        has_meta = False
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Call):
+                continue
+            # get the component
+            if isinstance(node.func, ast.Name) and node.func.id in names:
+                name = names[node.func.id]
+            elif isinstance(node.func, ast.Attribute) and node.func.attr in COMPONENTS and dotted_name(node.func.value) in modules:
+                name = node.func.attr
+            else:
+                continue
+            if name == "Meta":
+                has_meta = True
+            parameters = list(signature(COMPONENTS[name].__init__).parameters.values())[1:]
+            by_name = {parameter.name: parameter for parameter in parameters}
+
+            # positional arguments
+            if not any(isinstance(arg, ast.Starred) for arg in node.args) and len(node.args) > len(parameters):
+                self.__error(path, f"{name} takes at most {len(parameters)} positional arguments, but {len(node.args)} were given.", node.lineno)
+            passed = set()
+            for arg, parameter in zip(node.args, parameters):
+                if isinstance(arg, ast.Starred):
+                    break
+                passed.add(parameter.name)
+                self.__check_argument(path, name, parameter, arg)
+
+            # keyword arguments
+            for keyword in node.keywords:
+                # **kwargs
+                if keyword.arg is None:
+                    continue
+                if keyword.arg not in by_name:
+                    matches = get_close_matches(keyword.arg, by_name, n=1)
+                    self.__error(path, f"{name} has no attribute '{keyword.arg}'.{f' Did you mean {matches[0]}?' if matches != [] else ''}", keyword.lineno)
+                    continue
+                if keyword.arg in passed:
+                    self.__error(path, f"{name} attribute '{keyword.arg}' is passed more than once.", keyword.lineno)
+                passed.add(keyword.arg)
+                self.__check_argument(path, name, by_name[keyword.arg], keyword.value)
+                # defaults
+                try:
+                    value = ast.literal_eval(keyword.value)
+                # values that aren't literals, or can't be built (like {[1]})
+                except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                    continue
+                default = by_name[keyword.arg].default
+                if default is not Parameter.empty and type(value) is type(default) and value == default:
+                    self.__warn(path, f"{name} attribute '{keyword.arg}' is set to default value. You can remove it from the file.", keyword.lineno)
+
+            # required arguments
+            if not any(isinstance(arg, ast.Starred) for arg in node.args) and not any(keyword.arg is None for keyword in node.keywords):
+                for parameter in parameters:
+                    if parameter.default is Parameter.empty and parameter.name not in passed:
+                        self.__error(path, f"{name} is missing the required attribute '{parameter.name}'.", node.lineno)
+
+        # projects that inherit use their parent's meta
+        if not has_meta and not inherit:
+            self.__warn(path, "Meta() not found in file. Add it to the file to speed up build time.", level="info")
+
+    def __check_argument(self, path: Path, name: str, parameter: Parameter, node: ast.AST):
+        """Check the type of a literal argument.
+
+        :param Path path: Path to the luzconf.
+        :param str name: Name of the component.
+        :param Parameter parameter: The parameter the argument is passed to.
+        :param ast.AST node: The argument.
+        """
+        value_type = literal_type(node)
+        if value_type is None or accepts(parameter, value_type):
+            return
+        annotation = getattr(parameter.annotation, "__name__", str(parameter.annotation).replace("typing.", ""))
+        self.__error(path, f"{name} attribute '{parameter.name}' should be {annotation}, not {value_type.__name__}.", node.lineno)
+
+    def __evaluate(self, path: Path, tree: ast.AST):
+        """Run a luzconf without the side effects of loading it for a build.
+
+        :param Path path: Path to the luzconf.
+        :param ast.AST tree: The parsed luzconf.
+        :return: The values read from the luzconf, or None if it failed to run.
+        """
+        spec = spec_from_file_location(f"luzconf_verify_{md5(str(path).encode()).hexdigest()}", path)
+        luz = module_from_spec(spec)
+        cfg.state.inherit = None
+        cfg.state.luzconf_path = path
+        cfg.state.static = True
         try:
-            super().__init__(file_path, args)
+            exec(compile(tree, str(path), "exec"), luz.__dict__)
         except Exception as err:
-            error(f"Failed to parse '{file_path}'.")
-            error(f"Error: {err}")
-            errors += 1
-
-        if self.scripts != []:
-            for script in self.scripts:
-                if not script.type in ["preinst", "postinst", "prerm", "postrm"]:
-                    warnings += 1
-                    warn(f"Script type '{script.type}' is unknown. Valid scripts are 'preinst', 'postinst', 'prerm', and 'postrm'.")
-
-        if "raw" in self.__dict__:
-            # default meta
-            default_meta = get_default_args(Meta.__init__)
-
-            # default module
-            default_module = get_default_args(Module.__init__)
-
-            # default submodule
-            default_submodule = get_default_args(Submodule.__init__)
-
-            # contents
-            with open(file_path, "r") as file:
-                file_contents = file.read()
-
-                # verify meta
-                if not "Meta(" in file_contents:
-                    warnings += 1
-                    log("Meta() not found in file. Add it to the file to speed up build time.")
-                else:
-                    for attr in default_meta:
-                        if getattr(self.meta, attr) == default_meta[attr]:
-                            if f"{attr}={getattr(self.meta, attr)}" in file_contents:
-                                warnings += 1
-                                warn(f"Meta attribute '{attr}' is set to default value. You can remove it from the file.")
-
-        log(f"Verification complete. {warnings} warning{'s' if warnings != 1 else ''} and {errors} error{'s' if errors != 1 else ''}.")
+            # line of the luzconf that failed
+            lines = [frame.lineno for frame in extract_tb(err.__traceback__) if frame.filename == str(path)]
+            self.__error(path, f"Failed to evaluate the file. {type(err).__name__}: {err}", lines[-1] if lines != [] else None)
+            return None
+        finally:
+            cfg.state.static = False
+        return {
+            "meta": getattr(luz, "meta", None),
+            "control": getattr(luz, "control", None),
+            "scripts": getattr(luz, "scripts", []),
+            "modules": getattr(luz, "modules", []),
+            "submodules": getattr(luz, "submodules", []),
+        }
+
+    def __check_values(self, path: Path, values: dict, inherit: bool):
+        """Check the values read from a luzconf.
+
+        :param Path path: Path to the luzconf.
+        :param dict values: The values.
+        :param bool inherit: Whether the project inherits from its parent.
+        """
+        meta = values["meta"]
+        if meta is not None and not isinstance(meta, Meta):
+            self.__error(path, "'meta' must be a Meta.")
+            meta = None
+
+        # control
+        control = values["control"]
+        if control is not None and not isinstance(control, Control):
+            self.__error(path, "'control' must be a Control.")
+        elif control is None and not inherit and (meta is None or meta.pack):
+            if not (path.parent / "control").exists() and not (path.parent / "layout" / "DEBIAN" / "control").exists():
+                self.__error(path, "No control file found. Please create a control file or use the Control class to create a control file.")
+
+        # lists
+        for key, component in [("scripts", Script), ("modules", Module), ("submodules", Submodule)]:
+            if not isinstance(values[key], list):
+                self.__error(path, f"'{key}' must be a list.")
+                values[key] = []
+                continue
+            for value in values[key]:
+                if not isinstance(value, component):
+                    self.__error(path, f"'{key}' must only contain {component.__name__} instances, not {type(value).__name__}.")
+        values["submodules"] = [x for x in values["submodules"] if isinstance(x, Submodule)]
+
+        # scripts
+        for script in values["scripts"]:
+            if isinstance(script, Script) and script.type not in SCRIPT_TYPES:
+                self.__warn(path, f"Script type '{script.type}' is unknown. Valid scripts are 'preinst', 'postinst', 'prerm', and 'postrm'.")
+
+        # modules
+        names = set()
+        for module in values["modules"]:
+            if not isinstance(module, Module):
+                continue
+            if module.type not in default_values:
+                self.__error(path, f"Module '{module.name}' has an unknown type '{module.type}'. ({', '.join(default_values)})")
+            if module.name in names:
+                self.__error(path, f"Module name '{module.name}' is used more than once.")
+            names.add(module.name)
+
+
+def verify_projects(paths: list, jobs: int = None) -> int:
+    """Verify several projects at once.
+
+    :param list paths: Paths to the luzconf of each project.
+    :param int jobs: Amount of projects to verify at once. (default: amount of CPUs)
+    :return: The amount of errors.
+    """
+    with ThreadPoolExecutor(max_workers=max(min(jobs or cpu_count() or 1, len(paths)), 1), thread_name_prefix="luz-verify") as pool:
+        results = list(pool.map(Verify, paths))
+    # messages are logged in the order of the projects
+    for result in results:
+        result.report()
+    warnings = sum(result.warnings for result in results)
+    errors = sum(result.errors for result in results)
+    projects = f" in {len(results)} projects" if len(results) > 1 else ""
+    log(f"Verification complete{projects}. {warnings} warning{'s' if warnings != 1 else ''} and {errors} error{'s' if errors != 1 else ''}.")
+    return errors
@@ -0,0 +1,91 @@
+"""Rebuild a project when its files change."""
+
+# module imports
+from argparse import Namespace
+
+# local imports
+from .luz import Luz
+from ..common.logger import error, log
+from ..common.watcher import Watcher
+
+# suffixes of files that can be compiled
+SOURCE_SUFFIXES = [".c", ".cc", ".cpp", ".cxx", ".m", ".mm", ".x", ".xm", ".xi", ".swift", ".s", ".S"]
+
+
+def get_projects(luz: Luz) -> list:
+    """Get a project and all of its submodules.
+
+    :param Luz luz: The project.
+    :return: List of projects.
+    """
+    projects = [luz]
+    for submodule in luz.submodules:
+        projects.extend(get_projects(submodule))
+    return projects
+
+
+class Watch:
+    def __init__(self, file_path: str = "luzconf.py", args: Namespace = None, debounce: float = 0.1):
+        """Keep a project loaded, and rebuild it whenever its files change.
+
+        :param str file_path: Path to luzconf.py
+        :param Namespace args: The arguments passed to the program.
+        :param float debounce: Time to wait for more changes before rebuilding, in seconds.
+        """
+        self.file_path = file_path
+        self.args = args
+        self.debounce = debounce
+        self.luz = Luz(file_path, args=args)
+        # only clean once
+        if args is not None:
+            args.clean = False
+
+    def __needs_reload(self, changed: set) -> bool:
+        """Check whether the configuration has to be evaluated again.
+
+        :param set changed: Paths that changed.
+        :return: Whether to reload the configuration.
+        """
+        projects = get_projects(self.luz)
+        files = set()
+        for project in projects:
+            for module in project.modules:
+                files.update(module.files)
+        for path in changed:
+            # luzconf changes
+            if path.name == "luzconf.py":
+                return True
+            # new sources might match a glob
+            if path.suffix in SOURCE_SUFFIXES and path not in files and path.exists():
+                return True
+        return False
+
+    def run(self):
+        """Build the project, then rebuild it whenever its files change."""
+        try:
+            self.luz.build_project()
+        except Exception as err:
+            error(err)
+        watcher = Watcher([project.path for project in get_projects(self.luz)], self.debounce)
+        log("Watching for changes...", "👀")
+        try:
+            while True:
+                changed = watcher.wait()
+                try:
+                    if self.__needs_reload(changed):
+                        log("Configuration changed, reloading...", "👀")
+                        luz = Luz(self.file_path, args=self.args)
+                        self.luz.close()
+                        self.luz = luz
+                        self.luz.build_project()
+                        # submodules might have changed
+                        watcher.close()
+                        watcher = Watcher([project.path for project in get_projects(self.luz)], self.debounce)
+                    else:
+                        self.luz.rebuild(changed)
+                except Exception as err:
+                    error(err)
+                log("Watching for changes...", "👀")
+        except KeyboardInterrupt:
+            watcher.close()
+            log("Stopped watching.", "👀")
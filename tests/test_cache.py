@@ -0,0 +1,36 @@
+"""Tests of the luzconf cache key."""
+
+# module imports
+import pytest
+
+pytest.importorskip("pydeb")
+
+# local imports
+from luz.config.cache import ConfigCache, config_key
+
+LUZCONF = """from os import environ
+
+name = environ.get("LUZ_TEST_NAME", "Tweak")
+"""
+
+
+def test_unrelated_variable(tmp_path, monkeypatch):
+    # variables that change between almost every run don't invalidate the cache
+    (tmp_path / "luzconf.py").write_text(LUZCONF)
+    monkeypatch.setenv("OLDPWD", "/one")
+    ConfigCache(tmp_path, tmp_path / ".luz", "luzconf_test").save({"scripts": [], "modules": []})
+    monkeypatch.setenv("OLDPWD", "/two")
+    monkeypatch.setenv("TERM_SESSION_ID", "session")
+    assert ConfigCache(tmp_path, tmp_path / ".luz", "luzconf_test").load() == {"scripts": [], "modules": []}
+
+
+def test_referenced_variable(tmp_path, monkeypatch):
+    # variables that the luzconf or toolchain discovery read do
+    (tmp_path / "luzconf.py").write_text(LUZCONF)
+    key = config_key(tmp_path)
+    monkeypatch.setenv("LUZ_TEST_NAME", "Other")
+    assert config_key(tmp_path) != key
+    monkeypatch.delenv("LUZ_TEST_NAME")
+    assert config_key(tmp_path) == key
+    monkeypatch.setenv("PATH", "/nowhere")
+    assert config_key(tmp_path) != key
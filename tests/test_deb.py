@@ -0,0 +1,41 @@
+"""Tests of reading and writing debs."""
+
+# module imports
+from io import BytesIO
+import tarfile
+
+# local imports
+from luz.common.deb import read_ar, replace_control, write_ar
+
+
+def test_ar_round_trip(tmp_path):
+    # members of odd sizes are padded, and the padding isn't part of them
+    members = [("debian-binary", b"2.0\n"), ("control.tar.gz", b"\x1f\x8b odd"), ("data.tar.xz", bytes(range(256)) * 3)]
+    write_ar(tmp_path / "test.deb", members)
+    assert read_ar(tmp_path / "test.deb") == members
+
+
+def test_replace_control(tmp_path):
+    data = bytes(range(255)) * 17
+    write_ar(tmp_path / "old.deb", [("debian-binary", b"2.0\n"), ("control.tar.xz", b"old control"), ("data.tar.lzma", data)])
+    debian_dir = tmp_path / "DEBIAN"
+    debian_dir.mkdir()
+    (debian_dir / "control").write_text("Package: com.test.deb\nVersion: 1.0.0-2+debug\n")
+    assert replace_control(tmp_path / "old.deb", tmp_path / "new.deb", debian_dir)
+    members = read_ar(tmp_path / "new.deb")
+    # only the control archive changes, and the data archive is kept byte for byte
+    assert [name for name, _ in members] == ["debian-binary", "control.tar.xz", "data.tar.lzma"]
+    assert members[0][1] == b"2.0\n"
+    assert members[2][1] == data
+    with tarfile.open(fileobj=BytesIO(members[1][1]), mode="r:xz") as tar:
+        control = tar.extractfile("./control").read()
+        assert tar.getmember("./control").uid == 0
+    assert control == b"Package: com.test.deb\nVersion: 1.0.0-2+debug\n"
+
+
+def test_replace_unsupported(tmp_path):
+    # controls compressed with zstd can't be written, so the deb is packed again instead
+    write_ar(tmp_path / "old.deb", [("debian-binary", b"2.0\n"), ("control.tar.zst", b"control"), ("data.tar.zst", b"data")])
+    (tmp_path / "DEBIAN").mkdir()
+    assert not replace_control(tmp_path / "old.deb", tmp_path / "new.deb", tmp_path / "DEBIAN")
+    assert not (tmp_path / "new.deb").exists()
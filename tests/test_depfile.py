@@ -0,0 +1,24 @@
+"""Tests of reading the depfiles that compilers write."""
+
+# local imports
+from luz.common.utils import read_depfile
+
+
+def test_continuations(tmp_path):
+    depfile = tmp_path / "Tweak.x.m.d"
+    depfile.write_text("Tweak.o: Tweak.x.m \\\n  Headers/Tweak.h \\\n  Headers/Shared.h\n")
+    assert read_depfile(depfile) == ["Tweak.x.m", "Headers/Tweak.h", "Headers/Shared.h"]
+
+
+def test_escapes(tmp_path):
+    # spaces and # are escaped with a backslash, and $ is doubled
+    depfile = tmp_path / "Tweak.m.d"
+    depfile.write_text("Tweak.o: My\\ Headers/A\\ B.h Price$$.h Issue\\#1.h\n")
+    assert read_depfile(depfile) == ["My Headers/A B.h", "Price$.h", "Issue#1.h"]
+
+
+def test_multiple_targets(tmp_path):
+    # swift lists the dependencies of each of its outputs, which mostly repeat
+    depfile = tmp_path / "Tweak.swift.d"
+    depfile.write_text("Tweak.o : Tweak.swift Bridge.h\nTweak.swiftmodule : Tweak.swift Bridge.h\n")
+    assert read_depfile(depfile) == ["Tweak.swift", "Bridge.h"]
@@ -0,0 +1,44 @@
+"""Tests of the flags that workers compile with."""
+
+# module imports
+import pytest
+
+# local imports
+from luz.common.remote import allowed_args, strip_preprocessor_flags
+
+
+def test_allowed():
+    assert allowed_args(["-target", "arm64-apple-ios15.0", "-arch", "arm64", "-O2", "-g", "-fobjc-arc", "-Wall", "-Wno-unused-variable", "-std=c11", "-miphoneos-version-min=15.0"])
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        # loading code into the compiler
+        ["-Xclang", "-load", "-Xclang", "/tmp/plugin.so"],
+        ["-load", "/tmp/plugin.so"],
+        ["-fplugin=/tmp/plugin.so"],
+        ["-mllvm", "-debug"],
+        # reading arguments from files
+        ["@/etc/passwd"],
+        # writing files outside of the job's directory
+        ["-o", "/tmp/out.o"],
+        ["-MF", "../deps.d"],
+        ["-fprofile-generate=/tmp/profile"],
+        ["-Wl,-o,/tmp/out"],
+        ["-Wp,-MD,/tmp/deps.d"],
+        # values that aren't plain names
+        ["-target", "../../etc/passwd"],
+        ["-arch", "arm64;touch /tmp/x"],
+        ["-target"],
+    ],
+)
+def test_refused(args):
+    assert not allowed_args(args)
+
+
+def test_preprocessor_flags():
+    # flags that only affect preprocessing aren't sent, so they can't read files on the worker
+    args = strip_preprocessor_flags(["-I/usr/include", "-include", "/etc/passwd", "-DDEBUG=1", "-O2"])
+    assert args == ["-O2"]
+    assert allowed_args(args)
@@ -0,0 +1,21 @@
+"""Tests of unity builds, run against the benchmark generator and fake toolchain."""
+
+# module imports
+from pathlib import Path
+import sys
+
+import pytest
+
+pytest.importorskip("pydeb")
+
+# local imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+from generate import generate
+from run import build
+
+
+def test_unity_logos(tmp_path):
+    # every processed logos file defines the same constructor, so logos files can't share a group
+    project = generate(tmp_path / "project", tmp_path / "home", modules=1, files=8, logos=0.5, unity=8)
+    assert len(list(project.glob("Mod0/*.x"))) >= 2
+    build(project, tmp_path / "home", ["-n"])
@@ -0,0 +1,22 @@
+"""Tests of meta variants, run against the benchmark generator and fake toolchain."""
+
+# module imports
+from pathlib import Path
+import sys
+
+import pytest
+
+pytest.importorskip("pydeb")
+
+# local imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+from generate import generate
+from run import build
+
+
+def test_variant_overrides_passed(tmp_path):
+    # values passed with -m apply to the project, but the variant's own values win
+    project = generate(tmp_path / "project", tmp_path / "home", modules=1, files=2, meta={"variants": {"debug": {"release": False}}})
+    build(project, tmp_path / "home", ["-n", "-m", "release=True"])
+    assert [path.name for path in project.glob("packages/*.deb")] == ["dev.luz.bench_1.0.0_iphoneos-arm64.deb"]
+    assert [path.name for path in project.glob("packages/debug/*.deb")] == ["dev.luz.bench_1.0.0+debug_iphoneos-arm64.deb"]